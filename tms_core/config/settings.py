@@ -33,6 +33,7 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'corsheaders',
     'rest_framework',
     'rest_framework.authtoken',
@@ -50,7 +51,17 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # orjson-backed JSON that decodes to the same values as JSONRenderer (see core/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 MIDDLEWARE = [
@@ -61,6 +72,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'core.middleware.RequestMiddleware',
+    'core.middleware.AuditBufferMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,6 +95,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -140,6 +153,8 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
+# Let the frontend read conditional-GET and delta-sync headers
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Sync-Cursor']
 
 # Allow React to talk to Django
 CORS_ALLOWED_ORIGINS = [
@@ -157,12 +172,72 @@ CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
 CELERY_TIMEZONE = TIME_ZONE
 
+# CACHE (Redis) - shared counters, version stamps and response caches
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/1')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+
+# CHANNELS (Live fleet WebSocket fan-out)
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('CHANNEL_LAYER_URL', 'redis://redis:6379/2')],
+        },
+    }
+}
+
 CELERY_BEAT_SCHEDULE = {
-    'sync-device-statuses-15m': {
+    # Dispatcher only: queues per-organization syncs whose interval has elapsed.
+    'sync-device-statuses-dispatch-1m': {
         'task': 'core.tasks.sync_device_statuses',
-        'schedule': crontab(minute='*/15'),
+        'schedule': crontab(minute='*'),
+    },
+    'mark-stale-vehicles-offline-1m': {
+        'task': 'core.tasks.mark_stale_vehicles_offline_task',
+        'schedule': crontab(minute='*'),
+    },
+    'drain-traccar-outbox-1m': {
+        'task': 'core.tasks.drain_traccar_outbox_task',
+        'schedule': crontab(minute='*'),
+    },
+    'compute-geofence-dwells-10m': {
+        'task': 'core.tasks.compute_geofence_dwells_task',
+        'schedule': crontab(minute='*/10'),
+    },
+    'prune-vehicle-tombstones-daily': {
+        'task': 'core.tasks.prune_vehicle_tombstones_task',
+        'schedule': crontab(hour=2, minute=45),
+    },
+    'archive-old-logs-daily': {
+        'task': 'core.tasks.archive_old_logs_task',
+        'schedule': crontab(hour=2, minute=15),
+    },
+    'reconcile-geofence-permissions-hourly': {
+        'task': 'core.tasks.reconcile_geofence_permissions_task',
+        'schedule': crontab(minute=30),
     },
 }
 
+# Evaluate geofence enter/exit locally from incoming fixes; Traccar's own
+# geofence events are ignored while this is on.
+GEOFENCE_ENGINE_ENABLED = os.environ.get('GEOFENCE_ENGINE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# ActivityLog/DeviceLog rows older than this many days are moved into gzip
+# JSONL archives (one file per organization, month and run) under LOG_ARCHIVE_ROOT.
+LOG_RETENTION_DAYS = {
+    'ACTIVITY': int(os.environ.get('ACTIVITY_LOG_RETENTION_DAYS', 90)),
+    'DEVICE': int(os.environ.get('DEVICE_LOG_RETENTION_DAYS', 30)),
+}
+LOG_ARCHIVE_ROOT = os.environ.get('LOG_ARCHIVE_ROOT', os.path.join(BASE_DIR, 'log_archive'))
+
+# Vehicle deletion markers for ?since= delta sync are kept this long; older
+# cursors get a full resync.
+VEHICLE_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('VEHICLE_TOMBSTONE_RETENTION_DAYS', 30))
+
 # Optional webhook token for Traccar -> Django pushes
 TRACCAR_WEBHOOK_TOKEN = os.environ.get('TRACCAR_WEBHOOK_TOKEN')
@@ -4,8 +4,10 @@ from rest_framework.routers import DefaultRouter
 from core.views import (
     VehicleViewSet, TripViewSet, GPSForwardView, DriverViewSet, 
     CustomerViewSet, RouteViewSet, OriginViewSet, OrganizationViewSet, UserViewSet,
-    NotificationViewSet, ActivityLogViewSet, TraccarEventView
+    NotificationViewSet, ActivityLogViewSet, TraccarEventView, NearbyPlacesView,
+    GeofenceDwellViewSet, LogArchiveViewSet,
 )
+from core.streams import event_stream
 from core.api.views import CustomTokenObtainPairView, OrganizationRenewView, OrganizationImpersonateView
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.conf import settings
@@ -22,6 +24,8 @@ router.register(r'organizations', OrganizationViewSet, basename='organization')
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'logs', ActivityLogViewSet, basename='activitylog')
+router.register(r'dwells', GeofenceDwellViewSet, basename='geofencedwell')
+router.register(r'log-archives', LogArchiveViewSet, basename='logarchive')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,6 +40,8 @@ urlpatterns = [
     path('api/admin/organizations/<int:id>/impersonate/', OrganizationImpersonateView.as_view(), name='organization_impersonate'),
     path('api/finance/', include('finance.urls')),
     path('api/integrations/', include('integrations.urls')),
+    path('api/stream/', event_stream, name='event-stream'),
+    path('api/nearby/', NearbyPlacesView.as_view(), name='nearby-places'),
     
     # The Bridge for Traccar
     path('api/forward-gps/', GPSForwardView.as_view(), name='gps-forward'),
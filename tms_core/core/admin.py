@@ -1,7 +1,8 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Organization, Vehicle, Customer, Route, Origin, Trip
+from .models import Organization, Vehicle, Customer, Route, Origin, Trip, TraccarOutbox
 
 # Get the custom user model (core_user)
 User = get_user_model()
@@ -110,3 +111,19 @@ class OrganizationAdmin(admin.ModelAdmin):
         
     def has_delete_permission(self, request, obj=None):
         return False
+
+# ==========================================
+# 5. TRACCAR OUTBOX (Dead letters, retries)
+# ==========================================
+@admin.register(TraccarOutbox)
+class TraccarOutboxAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'kind')
+    actions = ['retry_entries']
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    @admin.action(description='Retry selected entries')
+    def retry_entries(self, request, queryset):
+        queryset.update(status='PENDING', available_at=timezone.now(), claimed_at=None)
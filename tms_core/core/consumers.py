@@ -0,0 +1,52 @@
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .services.fleet import FLEET_ALL_GROUP, fleet_group
+
+
+class FleetConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws://<host>/ws/fleet/?token=<access>
+    Pushes vehicle-state deltas for the caller's organization. Super admins
+    receive every organization unless they pass ?organization=<id>.
+    """
+    group_name = None
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None:
+            await self.close(code=4401)
+            return
+
+        if user.is_superuser:
+            organization_id = self._requested_organization()
+            self.group_name = fleet_group(organization_id) if organization_id else FLEET_ALL_GROUP
+        elif user.organization_id:
+            self.group_name = fleet_group(user.organization_id)
+        else:
+            await self.close(code=4403)
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Read-only feed; client messages are ignored.
+        return
+
+    async def fleet_delta(self, event):
+        await self.send_json({
+            'type': 'vehicles',
+            'organization_id': event['organization_id'],
+            'vehicles': event['vehicles'],
+        })
+
+    def _requested_organization(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        value = (query.get('organization') or [None])[0]
+        return int(value) if value and value.isdigit() else None
@@ -0,0 +1,113 @@
+import io
+import json
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.renderers import ORJSONParser, ORJSONRenderer
+
+
+def _trip_rows(count, now):
+    # Shaped like TripListSerializer output: DecimalFields already rendered to
+    # strings, nested lists/dicts, plus the raw Decimal/datetime/UUID values
+    # that aggregate endpoints hand straight to the renderer.
+    rows = ReturnList(serializer=None)
+    for index in range(count):
+        rows.append(ReturnDict({
+            'id': index + 1,
+            'surat_jalan_number': f"SJ-{index:06d}",
+            'status': ('PLANNED', 'OTW', 'ARRIVED', 'COMPLETED')[index % 4],
+            'vehicle': index % 500 + 1,
+            'vehicle_plate': f"B {index % 9000 + 1000} XY",
+            'driver': index % 300 + 1,
+            'driver_name': f"Driver {index % 300}",
+            'origin': 'Gudang Cikarang',
+            'destination': f"Customer {index % 200}",
+            'destinations': [f"Customer {index % 200}", f"Customer {(index + 1) % 200}"],
+            'customers': [index % 200 + 1, (index + 1) % 200 + 1],
+            'revenue': f"{1_500_000 + index}",
+            'price': f"{2_250_000 + index}.50",
+            'driver_cost': f"{350_000 + index}.00",
+            'actual_expenses': '125000.00',
+            'cash_returned': '0.00',
+            'margin': Decimal(f"{1_900_000 + index}.50"),
+            'start_time': now - timedelta(minutes=index),
+            'end_time': None,
+            'reference': uuid.UUID(int=index),
+            'notes': 'Bongkar di dock 3 — hubungi PIC',
+        }, serializer=None))
+    return rows
+
+
+def _position_rows(count, now):
+    return [
+        {
+            'vehicle_id': index % 2000 + 1,
+            'latitude': -6.2 + index * 1e-6,
+            'longitude': 106.8 + index * 1e-6,
+            'speed': float(index % 90),
+            'course': index % 360,
+            'ignition': bool(index % 2),
+            'fix_time': now - timedelta(seconds=index),
+            'attributes': {'odometer': 120_000 + index, 'fuel': Decimal('42.5')},
+        }
+        for index in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer/JSONParser with the orjson-backed classes "
+        "on synthetic trip and position payloads, and check both outputs decode to the same values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=10_000, help='Rows in the trip list payload.')
+        parser.add_argument('--positions', type=int, default=50_000, help='Rows in the position payload.')
+        parser.add_argument('--rounds', type=int, default=5, help='Timed rounds per case (best is reported).')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        payloads = (
+            (f"{options['trips']} trips", {'next': None, 'previous': None, 'results': _trip_rows(options['trips'], now)}),
+            (f"{options['positions']} positions", _position_rows(options['positions'], now)),
+        )
+        for label, data in payloads:
+            self._bench(label, data, options['rounds'])
+
+    def _bench(self, label, data, rounds):
+        drf_bytes, drf_render = self._time(rounds, lambda: JSONRenderer().render(data))
+        fast_bytes, fast_render = self._time(rounds, lambda: ORJSONRenderer().render(data))
+        # Float formatting differs (1e-06 vs 1e-6), so compare decoded values.
+        if json.loads(drf_bytes) != json.loads(fast_bytes):
+            raise CommandError(f"{label}: ORJSONRenderer output decodes differently from JSONRenderer")
+
+        _, drf_parse = self._time(rounds, lambda: JSONParser().parse(io.BytesIO(drf_bytes)))
+        _, fast_parse = self._time(rounds, lambda: ORJSONParser().parse(io.BytesIO(drf_bytes)))
+
+        self.stdout.write(f"{label} ({len(drf_bytes) / 1_000_000:.1f} MB, same decoded values)")
+        self.stdout.write(
+            f"  render: json {drf_render * 1000:.1f} ms, orjson {fast_render * 1000:.1f} ms "
+            f"({drf_render / fast_render:.1f}x)"
+        )
+        self.stdout.write(
+            f"  parse:  json {drf_parse * 1000:.1f} ms, orjson {fast_parse * 1000:.1f} ms "
+            f"({drf_parse / fast_parse:.1f}x)"
+        )
+
+    def _time(self, rounds, func):
+        best = None
+        result = None
+        for _ in range(max(1, rounds)):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
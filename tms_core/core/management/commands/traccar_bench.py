@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Organization, Vehicle, Origin
+from core.services.traccar import sync_devices_from_traccar, reconcile_geofence_permissions
+from core.testing.fake_traccar import FakeTraccar, use_fake_traccar
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the Traccar sync paths against an in-process fake Traccar. "
+        "Fixture rows are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=10_000, help='Fleet size served by the fake.')
+        parser.add_argument('--geofences', type=int, default=5, help='Origin geofences for the permission reconcile.')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every REST call.')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra delay per REST call.')
+        parser.add_argument('--rounds', type=int, default=3, help='Device sync rounds to time.')
+        parser.add_argument('--serve', action='store_true',
+                            help='Only run the fake server (for traccar_socket --url) until interrupted.')
+
+    def handle(self, *args, **options):
+        fake = FakeTraccar(
+            fleet_size=options['devices'],
+            latency=options['latency_ms'] / 1000,
+            jitter=options['jitter_ms'] / 1000,
+            seed=1,
+        )
+        with fake:
+            self.stdout.write(f"Fake Traccar on {fake.base_url} (socket {fake.socket_url}), {options['devices']} devices")
+            if options['serve']:
+                try:
+                    while True:
+                        time.sleep(1)
+                except KeyboardInterrupt:
+                    return
+            with use_fake_traccar(fake):
+                self._bench(fake, options)
+
+    def _bench(self, fake, options):
+        with transaction.atomic():
+            organization = Organization.objects.create(name='Traccar benchmark')
+            Vehicle.objects.bulk_create(
+                [
+                    Vehicle(organization=organization, license_plate=f"BENCH{index:07d}",
+                            vehicle_type='Bench', gps_device_id=unique_id)
+                    for index, unique_id in enumerate(fake.unique_ids)
+                ],
+                batch_size=1000,
+            )
+
+            for index in range(options['rounds']):
+                fake.reset_calls()
+                result = sync_devices_from_traccar()
+                self._report(f"sync_devices_from_traccar #{index + 1}", result, fake)
+                for device_id in list(fake.devices)[: max(1, len(fake.devices) // 5)]:
+                    fake.move_device(device_id)
+
+            with fake.lock:
+                geofence_ids = [
+                    fake.dispatch('POST', '/api/geofences', {}, {'name': f"bench-{index}", 'area': ''})[1]['id']
+                    for index in range(options['geofences'])
+                ]
+            Origin.objects.bulk_create(
+                [
+                    Origin(organization=organization, name=f"Bench origin {index}", address='-',
+                           latitude=0, longitude=0, traccar_id=geofence_id)
+                    for index, geofence_id in enumerate(geofence_ids)
+                ]
+            )
+            for label in ('initial', 'steady state'):
+                fake.reset_calls()
+                result = reconcile_geofence_permissions(organization.id)
+                self._report(f"reconcile_geofence_permissions ({label})", result, fake)
+
+            transaction.set_rollback(True)
+
+    def _report(self, label, result, fake):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for key, value in result.items():
+            self.stdout.write(f"  {key}: {value}")
+        calls = ', '.join(f"{route}={count}" for route, count in sorted(fake.calls.items()))
+        self.stdout.write(f"  calls: {calls or 'none'}")
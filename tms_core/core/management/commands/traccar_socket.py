@@ -0,0 +1,37 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from core.services.traccar_socket import (
+    TraccarSocketIngest,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_MAX_BACKOFF,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream positions, device statuses and events from Traccar's WebSocket into the TMS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Flush once this many messages are buffered.')
+        parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL,
+                            help='Seconds between flushes of buffered messages.')
+        parser.add_argument('--max-backoff', type=int, default=DEFAULT_MAX_BACKOFF,
+                            help='Upper bound in seconds for the reconnect delay.')
+        parser.add_argument('--url', default=None,
+                            help='Override the socket URL (defaults to TRACCAR_URL + /api/socket).')
+
+    def handle(self, *args, **options):
+        ingest = TraccarSocketIngest(
+            batch_size=options['batch_size'],
+            flush_interval=options['flush_interval'],
+            max_backoff=options['max_backoff'],
+            url=options['url'],
+        )
+        self.stdout.write(f"Listening on {ingest.url}")
+        try:
+            asyncio.run(ingest.run())
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -1,4 +1,9 @@
 import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
 _thread_locals = threading.local()
 
@@ -21,3 +26,46 @@ class RequestMiddleware:
         if hasattr(_thread_locals, 'request'):
             del _thread_locals.request
         return response
+
+class AuditBufferMiddleware:
+    """
+    Collects the request's ActivityLog entries and writes them in one bulk
+    insert once the response is ready. Entries recorded inside a transaction
+    that rolled back are dropped (see buffered_activity).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .services.audit import buffered_activity
+
+        with buffered_activity():
+            return self.get_response(request)
+
+
+def get_user_from_token(raw_token):
+    """
+    Resolve a SimpleJWT access token to an active user, or None.
+    """
+    if not raw_token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        user = auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        return None
+    return user if user.is_active else None
+
+class JWTQueryAuthMiddleware:
+    """
+    Channels middleware: browsers cannot set headers on WebSocket handshakes,
+    so the access token is read from ?token= and the user placed in scope.
+    """
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        raw_token = (query.get('token') or [None])[0]
+        scope = dict(scope, user=await sync_to_async(get_user_from_token)(raw_token))
+        return await self.inner(scope, receive, send)
@@ -0,0 +1,31 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_vehicle_change_version_vehicletombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraccarOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('VEHICLE_DEVICE', 'Vehicle device'), ('ORIGIN_GEOFENCE', 'Origin geofence'), ('CUSTOMER_GEOFENCE', 'Customer geofence'), ('GEOFENCE_PERMISSIONS', 'Geofence permissions')], max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('DONE', 'Done'), ('DEAD', 'Dead letter')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='core_outbox_status_avail_idx'), models.Index(fields=['kind', 'object_id'], name='core_outbox_kind_object_idx')],
+            },
+        ),
+    ]
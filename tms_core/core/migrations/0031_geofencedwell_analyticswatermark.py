@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_traccaroutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GeofenceDwell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('place_type', models.CharField(choices=[('CUSTOMER', 'Customer'), ('ORIGIN', 'Origin')], max_length=20)),
+                ('entered_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField()),
+                ('exited_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_minutes', models.FloatField(default=0)),
+                ('position_count', models.PositiveIntegerField(default=0)),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dwells', to='core.customer')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofence_dwells', to='core.organization')),
+                ('origin', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dwells', to='core.origin')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofence_dwells', to='core.vehicle')),
+            ],
+            options={
+                'ordering': ['-entered_at'],
+                'indexes': [models.Index(fields=['organization', 'entered_at'], name='core_dwell_org_entered_idx'), models.Index(fields=['customer', 'entered_at'], name='core_dwell_customer_idx'), models.Index(fields=['origin', 'entered_at'], name='core_dwell_origin_idx'), models.Index(fields=['vehicle', 'exited_at'], name='core_dwell_vehicle_open_idx')],
+            },
+        ),
+    ]
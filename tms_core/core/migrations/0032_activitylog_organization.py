@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BACKFILL_BATCH = 5000
+
+
+def backfill_organization(apps, schema_editor):
+    ActivityLog = apps.get_model('core', 'ActivityLog')
+    User = apps.get_model('core', 'User')
+    Organization = apps.get_model('core', 'Organization')
+
+    # Entries written by a user belong to that user's organization.
+    ActivityLog.objects.filter(organization__isnull=True, user__isnull=False).update(
+        organization_id=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('organization_id')[:1])
+    )
+
+    # System entries carry it in details; the JSON key has to be read row by row.
+    known = set(Organization.objects.values_list('id', flat=True))
+    last_id = 0
+    while True:
+        rows = list(
+            ActivityLog.objects.filter(organization__isnull=True, id__gt=last_id)
+            .order_by('id').values_list('id', 'details')[:BACKFILL_BATCH]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        by_org = {}
+        for row_id, details in rows:
+            organization_id = (details or {}).get('organization_id') if isinstance(details, dict) else None
+            if organization_id in known:
+                by_org.setdefault(organization_id, []).append(row_id)
+        for organization_id, ids in by_org.items():
+            ActivityLog.objects.filter(id__in=ids).update(organization_id=organization_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_geofencedwell_analyticswatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='organization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_logs', to='core.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['organization', '-created_at', '-id'], name='core_actlog_org_created_idx'),
+        ),
+        migrations.RunPython(backfill_organization, migrations.RunPython.noop),
+    ]
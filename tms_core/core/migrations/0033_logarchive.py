@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_activitylog_organization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ACTIVITY', 'Activity Log'), ('DEVICE', 'Device Log')], max_length=10)),
+                ('month', models.DateField(help_text='First day of the month the rows were created in')),
+                ('path', models.CharField(help_text='Relative to LOG_ARCHIVE_ROOT', max_length=255, unique=True)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('first_at', models.DateTimeField()),
+                ('last_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='log_archives', to='core.organization')),
+            ],
+            options={
+                'ordering': ['-month', '-first_at'],
+                'indexes': [models.Index(fields=['organization', 'kind', 'month'], name='core_logarch_org_kind_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Mirrors core.services.fleet at the time of writing; the offline scheduler
+# applies per-organization thresholds within a minute of deploy.
+OFFLINE_MINUTES = 10
+MOVING_SPEED_THRESHOLD = 10
+
+
+def backfill_computed_status(apps, schema_editor):
+    Vehicle = apps.get_model('core', 'Vehicle')
+    stale_before = timezone.now() - timedelta(minutes=OFFLINE_MINUTES)
+    vehicles = Vehicle.objects.only('id', 'device_status', 'last_gps_sync', 'last_speed', 'last_ignition')
+    updated = []
+    for vehicle in vehicles.iterator(chunk_size=1000):
+        if vehicle.device_status == 'OFFLINE' or (vehicle.last_gps_sync and vehicle.last_gps_sync < stale_before):
+            vehicle.computed_status = 'OFFLINE'
+        elif vehicle.last_speed > MOVING_SPEED_THRESHOLD:
+            vehicle.computed_status = 'MOVING'
+        elif vehicle.last_ignition:
+            vehicle.computed_status = 'IDLE'
+        else:
+            vehicle.computed_status = 'STOPPED'
+        updated.append(vehicle)
+    Vehicle.objects.bulk_update(updated, ['computed_status'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_logarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='computed_status',
+            field=models.CharField(choices=[('MOVING', 'Moving'), ('IDLE', 'Idle'), ('STOPPED', 'Stopped'), ('OFFLINE', 'Offline')], default='STOPPED', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['organization', 'computed_status'], name='core_vehicle_org_status_idx'),
+        ),
+        migrations.RunPython(backfill_computed_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_vehicle_computed_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(max_length=20)),
+                ('period', models.CharField(help_text='e.g. 20250131 for daily series, 2025 for yearly ones', max_length=20)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_counters', to='core.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('organization__isnull', False)), fields=('organization', 'series', 'period'), name='core_doccounter_org_series_uniq'), models.UniqueConstraint(condition=models.Q(('organization__isnull', True)), fields=('series', 'period'), name='core_doccounter_series_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_document_counter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicletombstone',
+            index=models.Index(fields=['organization', 'change_version'], name='core_tombstone_org_version_idx'),
+        ),
+    ]
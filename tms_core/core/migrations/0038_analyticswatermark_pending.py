@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_vehicleposition_fix_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticswatermark',
+            name='pending',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
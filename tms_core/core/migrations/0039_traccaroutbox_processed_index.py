@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_analyticswatermark_pending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traccaroutbox',
+            index=models.Index(fields=['status', 'processed_at'], name='core_outbox_status_done_idx'),
+        ),
+    ]
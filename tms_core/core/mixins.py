@@ -1,15 +1,14 @@
-from .models import ActivityLog
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .services.audit import record_activity
+from .services.master_cache import ALL_SCOPE, RESPONSE_TTL_SECONDS, master_response_key
 
 class LoggingMixin:
     def log_activity(self, action, details=None):
         user = self.request.user if self.request.user.is_authenticated else None
         # details can be a dict
-        ActivityLog.objects.create(
-            user=user,
-            action=action,
-            details=details or {},
-            ip_address=self.request.META.get('REMOTE_ADDR')
-        )
+        record_activity(action, details, user=user, ip_address=self.request.META.get('REMOTE_ADDR'))
 
     def perform_create(self, serializer):
         instance = serializer.save()
@@ -26,3 +25,35 @@ class LoggingMixin:
         details = {'id': instance.id, 'str': str(instance)}
         instance.delete()
         self.log_activity(f'{model_name}_DELETED', details)
+
+
+class OrganizationCachedListMixin:
+    """
+    Scopes the viewset to the caller's organization and serves list pages
+    from the cache, keyed by organization, URL and the resource version
+    that core.signals bumps on every save/delete.
+    """
+    cache_resource = None
+
+    def get_cache_scope(self):
+        user = self.request.user
+        if user.is_authenticated and not user.is_superuser and user.organization_id:
+            return user.organization_id
+        return ALL_SCOPE
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        scope = self.get_cache_scope()
+        if scope != ALL_SCOPE:
+            queryset = queryset.filter(organization_id=scope)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        key = master_response_key(self.cache_resource, self.get_cache_scope(), request.build_absolute_uri())
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RESPONSE_TTL_SECONDS)
+        return response
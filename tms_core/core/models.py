@@ -1,10 +1,9 @@
+import time
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-import requests
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
-from requests.auth import HTTPBasicAuth
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
@@ -17,11 +16,24 @@ DEVICE_STATUS_CHOICES = (
     ('UNKNOWN', 'Unknown'),
 )
 
+VEHICLE_STATUS_CHOICES = (
+    ('MOVING', 'Moving'),
+    ('IDLE', 'Idle'),
+    ('STOPPED', 'Stopped'),
+    ('OFFLINE', 'Offline'),
+)
+
 GEOFENCE_TYPE_CHOICES = (
     ('CIRCLE', 'Circle'),
     ('RECTANGLE', 'Rectangle'),
 )
 
+def next_change_version():
+    """
+    Monotonic-ish change stamp (server clock in microseconds) for delta sync cursors.
+    """
+    return time.time_ns() // 1000
+
 # 1. THE TENANT (The Client Company)
 class Organization(models.Model):
     name = models.CharField(max_length=100)
@@ -127,6 +139,8 @@ class Vehicle(models.Model):
     device_status_changed_at = models.DateTimeField(null=True, blank=True)
     stopped_since = models.DateTimeField(null=True, blank=True)
     last_gps_sync = models.DateTimeField(null=True, blank=True)
+    # Map status, kept current by ingest/sync and the offline scheduler (core.services.fleet)
+    computed_status = models.CharField(max_length=10, choices=VEHICLE_STATUS_CHOICES, default='STOPPED')
 
     # FLEET HEALTH (Module 3)
     current_odometer = models.IntegerField(default=0) # Total Km
@@ -136,9 +150,38 @@ class Vehicle(models.Model):
     kir_expiry = models.DateField(null=True, blank=True)
     tax_expiry = models.DateField(null=True, blank=True) # Pajak
 
+    # DELTA SYNC: bumped on every save so clients can fetch only changed rows
+    change_version = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'computed_status'], name='core_vehicle_org_status_idx'),
+        ]
+
     def __str__(self):
         return self.license_plate
 
+    def save(self, *args, **kwargs):
+        self.change_version = next_change_version()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'change_version'}
+        super().save(*args, **kwargs)
+
+class VehicleTombstone(models.Model):
+    """
+    Marker left behind when a vehicle is deleted so delta-sync clients can drop it.
+    """
+    vehicle_id = models.BigIntegerField()
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True)
+    change_version = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'change_version'], name='core_tombstone_org_version_idx'),
+        ]
+
 # HISTORY LOG (For Playback)
 class VehiclePosition(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='positions')
@@ -147,7 +190,7 @@ class VehiclePosition(models.Model):
     speed = models.FloatField(default=0)
     heading = models.FloatField(default=0)
     ignition = models.BooleanField(default=False)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # Fix time reported by the device
 
     class Meta:
         ordering = ['timestamp']
@@ -235,6 +278,12 @@ class Notification(models.Model):
     alert_key = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='core_notif_user_created_idx'),
+            models.Index(fields=['user', 'is_read'], name='core_notif_user_read_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:30]}"
 
@@ -257,44 +306,32 @@ class SuratJalanHistory(models.Model):
     class Meta:
         ordering = ['-changed_at']
 
+TRACCAR_DEVICE_FIELDS = ('license_plate', 'gps_device_id', 'organization_id')
+
+def _traccar_device_state(vehicle):
+    return tuple(getattr(vehicle, field) for field in TRACCAR_DEVICE_FIELDS)
+
+@receiver(post_init, sender=Vehicle)
+def remember_traccar_device_state(sender, instance, **kwargs):
+    instance._traccar_device_state = _traccar_device_state(instance)
+
 @receiver(post_save, sender=Vehicle)
 def sync_vehicle_to_traccar(sender, instance, created, **kwargs):
     """
-    Automatically creates/updates the device in Traccar 
-    whenever a Vehicle is saved in Django.
+    Queues a Traccar device create/update (via the outbox) whenever a Vehicle
+    is created or its name/uniqueId/organization changes. Position updates
+    from the ingest path do not touch Traccar.
     """
     if not instance.gps_device_id:
         return
 
-    # 1. Prepare Data for Traccar
-    device_data = {
-        "name": instance.license_plate,
-        "uniqueId": instance.gps_device_id,
-        # 'category': 'truck' # Optional
-    }
+    state = _traccar_device_state(instance)
+    if not created and state == getattr(instance, '_traccar_device_state', None):
+        return
+    instance._traccar_device_state = state
 
-    # 2. Check if device exists first (to decide: Create or Update?)
-    auth = HTTPBasicAuth(settings.TRACCAR_USER, settings.TRACCAR_PASSWORD)
-    search_url = f"{settings.TRACCAR_URL}/api/devices?uniqueId={instance.gps_device_id}"
-    
-    try:
-        response = requests.get(search_url, auth=auth)
-        if response.status_code == 200 and len(response.json()) > 0:
-            # Device exists -> UPDATE it
-            traccar_id = response.json()[0]['id']
-            device_data['id'] = traccar_id
-            requests.put(f"{settings.TRACCAR_URL}/api/devices/{traccar_id}", json=device_data, auth=auth)
-            print(f"Updated Traccar Device: {instance.license_plate}")
-        else:
-            # Device does not exist -> CREATE it
-            requests.post(f"{settings.TRACCAR_URL}/api/devices", json=device_data, auth=auth)
-            print(f"Created Traccar Device: {instance.license_plate}")
-
-        from .services.traccar import sync_vehicle_geofence_permissions
-        sync_vehicle_geofence_permissions(instance)
-            
-    except Exception as e:
-        print(f"Error syncing to Traccar: {e}")
+    from .services.outbox import enqueue_traccar_sync
+    enqueue_traccar_sync('VEHICLE_DEVICE', instance.pk)
 
 @receiver(post_save, sender=User)
 def assign_default_permissions(sender, instance, created, **kwargs):
@@ -346,6 +383,8 @@ def notify_subscription_warning(sender, instance, **kwargs):
 
 class ActivityLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Denormalized from user / details['organization_id'] so org feeds use an index.
+    organization = models.ForeignKey(Organization, on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_logs')
     action = models.CharField(max_length=255)
     details = models.JSONField(default=dict, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -353,6 +392,22 @@ class ActivityLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', '-created_at', '-id'], name='core_actlog_org_created_idx'),
+        ]
+
+    def resolve_organization(self):
+        """
+        Fill organization from the acting user, else from details['organization_id'].
+        """
+        if self.organization_id is None:
+            organization_id = self.user.organization_id if self.user_id else None
+            self.organization_id = organization_id or (self.details or {}).get('organization_id')
+        return self.organization_id
+
+    def save(self, *args, **kwargs):
+        self.resolve_organization()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         user_str = self.user.username if self.user else "System"
@@ -389,3 +444,153 @@ class VehicleEvent(models.Model):
 
     def __str__(self):
         return f"{self.vehicle.license_plate} - {self.event_type} ({self.duration_minutes} mins)"
+
+class TraccarOutbox(models.Model):
+    """
+    Pending Traccar side effect, written in the same transaction as the model save
+    and drained by a Celery worker (see core.services.outbox).
+    """
+    KIND_CHOICES = (
+        ('VEHICLE_DEVICE', 'Vehicle device'),
+        ('ORIGIN_GEOFENCE', 'Origin geofence'),
+        ('CUSTOMER_GEOFENCE', 'Customer geofence'),
+        ('GEOFENCE_PERMISSIONS', 'Geofence permissions'),
+    )
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('DONE', 'Done'),
+        ('DEAD', 'Dead letter'),
+    )
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='core_outbox_status_avail_idx'),
+            models.Index(fields=['kind', 'object_id'], name='core_outbox_kind_object_idx'),
+            models.Index(fields=['status', 'processed_at'], name='core_outbox_status_done_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} ({self.status})"
+
+
+class GeofenceDwell(models.Model):
+    """
+    One visit of a vehicle to a customer or origin geofence, derived from
+    VehiclePosition history by core.services.dwell. exited_at stays empty while
+    the vehicle is still inside.
+    """
+    PLACE_CHOICES = (
+        ('CUSTOMER', 'Customer'),
+        ('ORIGIN', 'Origin'),
+    )
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='geofence_dwells')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='geofence_dwells')
+    place_type = models.CharField(max_length=20, choices=PLACE_CHOICES)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, blank=True, related_name='dwells')
+    origin = models.ForeignKey(Origin, on_delete=models.CASCADE, null=True, blank=True, related_name='dwells')
+    entered_at = models.DateTimeField()
+    last_seen_at = models.DateTimeField()
+    exited_at = models.DateTimeField(null=True, blank=True)
+    duration_minutes = models.FloatField(default=0)
+    position_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-entered_at']
+        indexes = [
+            models.Index(fields=['organization', 'entered_at'], name='core_dwell_org_entered_idx'),
+            models.Index(fields=['customer', 'entered_at'], name='core_dwell_customer_idx'),
+            models.Index(fields=['origin', 'entered_at'], name='core_dwell_origin_idx'),
+            models.Index(fields=['vehicle', 'exited_at'], name='core_dwell_vehicle_open_idx'),
+        ]
+
+    def __str__(self):
+        place = self.customer_id or self.origin_id
+        return f"{self.vehicle_id} @ {self.place_type}:{place} {self.entered_at}"
+
+
+class AnalyticsWatermark(models.Model):
+    """
+    High-water mark of an incremental batch job (e.g. the last VehiclePosition
+    id folded into GeofenceDwell). ``pending`` holds ids below the mark that
+    were missing when it passed them (a transaction still in flight), mapped
+    to when they were first missed, so a late commit is still picked up.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    pending = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class LogArchive(models.Model):
+    """
+    One gzip JSONL file of ActivityLog/DeviceLog rows moved out of the hot
+    table by the retention job; rows of one organization and month.
+    """
+    KIND_CHOICES = (
+        ('ACTIVITY', 'Activity Log'),
+        ('DEVICE', 'Device Log'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True, related_name='log_archives')
+    month = models.DateField(help_text="First day of the month the rows were created in")
+    path = models.CharField(max_length=255, unique=True, help_text="Relative to LOG_ARCHIVE_ROOT")
+    entry_count = models.PositiveIntegerField(default=0)
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month', '-first_at']
+        indexes = [
+            models.Index(fields=['organization', 'kind', 'month'], name='core_logarch_org_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.organization_id} {self.month:%Y-%m} ({self.entry_count})"
+
+
+class DocumentCounter(models.Model):
+    """
+    Last number handed out for a document series (e.g. SJ per day, INV per
+    year), incremented in place by core.services.numbering. A null
+    organization is a counter shared by all organizations.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True, related_name='document_counters')
+    series = models.CharField(max_length=20)
+    period = models.CharField(max_length=20, help_text="e.g. 20250131 for daily series, 2025 for yearly ones")
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'series', 'period'],
+                condition=models.Q(organization__isnull=False),
+                name='core_doccounter_org_series_uniq',
+            ),
+            # NULLs never collide in a unique index, so shared counters get their own.
+            models.UniqueConstraint(
+                fields=['series', 'period'],
+                condition=models.Q(organization__isnull=True),
+                name='core_doccounter_series_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.series} {self.period} ({self.organization_id or 'shared'}): {self.value}"
@@ -0,0 +1,56 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TripCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pages for the trip list. Trip ids grow with
+    created_at, so the primary key gives a stable, indexed order and new
+    trips never shift the pages behind the first one.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+
+
+class PositionCursorPagination(CursorPagination):
+    """
+    Oldest-first cursor pages for a vehicle's position history (playback).
+    """
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 2000
+    ordering = ('timestamp', 'id')
+
+
+class GeofenceDwellCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pages of completed visits, served by the
+    (organization, entered_at) index.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-entered_at', '-id')
+
+
+class NotificationCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pages for the notification feed. The id tiebreaker keeps
+    pages stable when several notifications share a created_at timestamp.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class ActivityLogCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pages for the activity feed, served by the
+    (organization, created_at, id) index.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
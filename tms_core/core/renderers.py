@@ -0,0 +1,91 @@
+import math
+from decimal import Decimal
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson does not handle natively (Decimal, lazy strings, querysets...)
+# and datetimes, whose DRF formatting differs from orjson's (millisecond
+# precision, 'Z' suffix), go through DRF's own encoder so the values match
+# JSONRenderer: DecimalField values stay strings, raw Decimals floats.
+_drf_encoder = JSONEncoder()
+
+RENDER_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    return _drf_encoder.default(obj)
+
+
+def _has_non_finite(data):
+    """
+    True if a NaN/Infinity float or Decimal is anywhere in ``data``; orjson
+    writes those as null where JSONRenderer rejects them (STRICT_JSON).
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal):
+            if not value.is_finite():
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Replacement for rest_framework.renderers.JSONRenderer backed by orjson.
+    The output decodes to the same JSON values but is not byte-identical:
+    floats use the shortest repr (1e-6, not 1e-06) and ``?indent`` pretty
+    printing (browsable API) uses two spaces. Payloads orjson cannot encode
+    (integers beyond 64 bits) or would silently change (NaN/Infinity become
+    null) are handed to JSONRenderer, which raises under STRICT_JSON.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = RENDER_OPTIONS
+        renderer_context = renderer_context or {}
+        if renderer_context.get('indent') or (accepted_media_type and 'indent=' in accepted_media_type):
+            options |= orjson.OPT_INDENT_2
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=options)
+        except (TypeError, orjson.JSONEncodeError):
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        # Non-finite floats are the only values orjson turns into null unasked.
+        if b'null' in ret and _has_non_finite(data):
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+
+        # Same as JSONRenderer: these are valid JSON but break inline <script>.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(BaseParser):
+    """
+    orjson-backed JSON request parser (UTF-8 bodies, NaN/Infinity rejected).
+    """
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -1,51 +1,61 @@
 from rest_framework import serializers
-from django.utils import timezone
+from django.db import IntegrityError, transaction
 from .models import Organization, User, Vehicle, Trip, Customer, Route, Origin, VehiclePosition, SuratJalanHistory, DeliveryProof, Notification
+from .services.numbering import SURAT_NUMBER_TAKEN, generate_surat_number
 
 
-def generate_surat_number():
+class SparseFieldsMixin:
     """
-    Generate incrementing Surat Jalan number per day.
-    Format: SJ-YYYYMMDD-XXXX
+    ``?fields=id,name`` on a GET trims the response to those fields so list
+    screens only pay for the columns they render. Unknown names are ignored.
     """
-    today = timezone.localdate()
-    prefix = today.strftime("SJ-%Y%m%d")
-    last_trip = Trip.objects.filter(surat_jalan_number__startswith=prefix).order_by('-id').first()
-    next_seq = 1
-    if last_trip and last_trip.surat_jalan_number:
-        parts = last_trip.surat_jalan_number.split('-')
-        if parts and parts[-1].isdigit():
-            next_seq = int(parts[-1]) + 1
-    return f"{prefix}-{next_seq:04d}"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        raw = request.query_params.get('fields')
+        if not raw:
+            return
+        wanted = {name.strip() for name in raw.split(',') if name.strip()}
+        if not wanted & set(self.fields):
+            return
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+def active_conflict_message(conflicts):
+    return f"Active trip already exists for this {', '.join(conflicts)}. Complete or cancel it first."
 
 
 # 1. Organization Serializer
-class OrganizationSerializer(serializers.ModelSerializer):
+class OrganizationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Organization
         fields = ['id', 'name', 'address', 'subscription_end_date', 'is_active', 'driver_limit', 'vehicle_limit']
 
 # 2. Master Data Serializers
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
 
-class RouteSerializer(serializers.ModelSerializer):
+class RouteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Route
         fields = '__all__'
 
 # 3. Origin Serializer
-class OriginSerializer(serializers.ModelSerializer):
+class OriginSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Origin
         fields = '__all__'
 
 # 3. Vehicle Serializer
-class VehicleSerializer(serializers.ModelSerializer):
-    # Calculated Status for Frontend (Green, Yellow, Red)
-    computed_status = serializers.SerializerMethodField()
+class VehicleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Map status for the frontend, maintained by core.services.fleet
+    computed_status = serializers.CharField(read_only=True)
 
     class Meta:
         model = Vehicle
@@ -60,31 +70,6 @@ class VehicleSerializer(serializers.ModelSerializer):
             'computed_status'
         ]
 
-    def get_computed_status(self, obj):
-        # Webhook-driven status overrides other heuristics
-        if obj.device_status == 'OFFLINE':
-            return 'OFFLINE'
-
-        # 1. Check Offline first
-        if obj.last_gps_sync:
-            # Use user config or default 10 minutes
-            threshold_minutes = obj.user.offline_alert_minutes if (hasattr(obj, 'user') and obj.user) else 10
-            # If vehicle organization owner overrides default
-            if not getattr(obj, 'user', None) and obj.organization:
-                 # Try to find owner config - optional, for now hardcode 10 or check if obj has a related user config
-                 pass
-            
-            elapsed = (timezone.now() - obj.last_gps_sync).total_seconds() / 60
-            if elapsed > threshold_minutes:
-                return 'OFFLINE'
-
-        if obj.last_speed > 10:
-            return 'MOVING'
-        elif obj.last_ignition and obj.last_speed <= 10:
-            return 'IDLE'
-        else:
-            return 'STOPPED'
-
 class VehiclePositionSerializer(serializers.ModelSerializer):
     class Meta:
         model = VehiclePosition
@@ -96,7 +81,7 @@ class DeliveryProofSerializer(serializers.ModelSerializer):
         fields = ['id', 'destination', 'proof_of_delivery', 'latitude', 'longitude', 'timestamp']
 
 # 4. Trip Serializer (The Money)
-class TripSerializer(serializers.ModelSerializer):
+class TripSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Include the calculated fields (Read Only)
     total_expense = serializers.ReadOnlyField()
     balance = serializers.ReadOnlyField()
@@ -119,6 +104,9 @@ class TripSerializer(serializers.ModelSerializer):
     driver_name = serializers.CharField(source='driver.username', read_only=True)
     customer_name = serializers.CharField(source='customer.name', read_only=True)
 
+    # Bulk dispatch checks active-trip conflicts for the whole batch at once.
+    check_active_conflicts = True
+
     class Meta:
         model = Trip
         fields = '__all__'
@@ -134,21 +122,20 @@ class TripSerializer(serializers.ModelSerializer):
             destinations = [legacy_dest]
         completed = attrs.get('completed_destinations') or (instance.completed_destinations if instance else [])
 
-        active_statuses = ['PLANNED', 'OTW', 'ARRIVED']
-        qs = Trip.objects.filter(status__in=active_statuses)
-        if instance:
-            qs = qs.exclude(pk=instance.pk)
+        if self.check_active_conflicts:
+            active_statuses = ['PLANNED', 'OTW', 'ARRIVED']
+            qs = Trip.objects.filter(status__in=active_statuses)
+            if instance:
+                qs = qs.exclude(pk=instance.pk)
 
-        conflicts = []
-        if vehicle and qs.filter(vehicle=vehicle).exists():
-            conflicts.append('vehicle')
-        if driver and qs.filter(driver=driver).exists():
-            conflicts.append('driver')
+            conflicts = []
+            if vehicle and qs.filter(vehicle=vehicle).exists():
+                conflicts.append('vehicle')
+            if driver and qs.filter(driver=driver).exists():
+                conflicts.append('driver')
 
-        if conflicts:
-            raise serializers.ValidationError(
-                f"Active trip already exists for this {', '.join(conflicts)}. Complete or cancel it first."
-            )
+            if conflicts:
+                raise serializers.ValidationError(active_conflict_message(conflicts))
 
         # Completed destinations must be subset of destinations
         if completed and destinations:
@@ -165,7 +152,11 @@ class TripSerializer(serializers.ModelSerializer):
 
         return super().validate(attrs)
 
-    def create(self, validated_data):
+    @staticmethod
+    def prepare_create_data(validated_data):
+        """
+        Normalize destinations for a new trip (shared with bulk dispatch).
+        """
         destinations = validated_data.pop('destinations', [])
         if isinstance(destinations, str):
             destinations = [destinations]
@@ -179,16 +170,33 @@ class TripSerializer(serializers.ModelSerializer):
             validated_data['destination'] = destinations[0]
         validated_data['destinations'] = destinations
         validated_data['completed_destinations'] = [d for d in completed_dest if d in destinations] if destinations else []
+        return validated_data
 
-        # Autogenerate surat jalan number when empty
-        sj_number = validated_data.get('surat_jalan_number')
-        if not sj_number:
-            validated_data['surat_jalan_number'] = generate_surat_number()
-
-        trip = super().create(validated_data)
-        SuratJalanHistory.objects.create(trip=trip, surat_jalan_number=trip.surat_jalan_number)
+    def create(self, validated_data):
+        validated_data = self.prepare_create_data(validated_data)
+
+        # One transaction, so a failed insert gives the reserved number back
+        try:
+            with transaction.atomic():
+                # Autogenerate surat jalan number when empty
+                sj_number = validated_data.get('surat_jalan_number')
+                if not sj_number:
+                    validated_data['surat_jalan_number'] = generate_surat_number()
+
+                trip = super().create(validated_data)
+                SuratJalanHistory.objects.create(trip=trip, surat_jalan_number=trip.surat_jalan_number)
+        except IntegrityError:
+            self._raise_if_surat_number_taken(validated_data['surat_jalan_number'])
+            raise
         return trip
 
+    @staticmethod
+    def _raise_if_surat_number_taken(number):
+        # A typed-in number and an allocated one can collide after validation
+        # (the counter does not know about hand-entered numbers): 400, not 500.
+        if number and Trip.objects.filter(surat_jalan_number=number).exists():
+            raise serializers.ValidationError({'surat_jalan_number': [SURAT_NUMBER_TAKEN]})
+
     def update(self, instance, validated_data):
         destinations = validated_data.pop('destinations', None)
         if destinations is not None:
@@ -209,7 +217,12 @@ class TripSerializer(serializers.ModelSerializer):
         if new_sj_number == '':
             validated_data.pop('surat_jalan_number', None)
             new_sj_number = None
-        instance = super().update(instance, validated_data)
+        try:
+            with transaction.atomic():
+                instance = super().update(instance, validated_data)
+        except IntegrityError:
+            self._raise_if_surat_number_taken(new_sj_number)
+            raise
 
         if new_sj_number and new_sj_number != old_sj_number:
             SuratJalanHistory.objects.create(trip=instance, surat_jalan_number=new_sj_number)
@@ -238,12 +251,69 @@ class TripSerializer(serializers.ModelSerializer):
         return bool(getattr(obj, 'invoice_id', None))
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids from ``context['preloaded_relations'][field_name]`` (an
+    in_bulk() dict) so a batch of rows does not look up each id separately.
+    Ids missing there fall back to the normal lookup and its errors.
+    """
+
+    def to_internal_value(self, data):
+        field_name = self.parent.field_name if isinstance(self.parent, serializers.ManyRelatedField) else self.field_name
+        preloaded = self.context.get('preloaded_relations', {}).get(field_name, {})
+        if str(data).isdigit() and int(data) in preloaded:
+            return preloaded[int(data)]
+        return super().to_internal_value(data)
+
+
+class BulkTripSerializer(TripSerializer):
+    """
+    Validates one row of a bulk dispatch; core.services.trip_dispatch
+    preloads the related rows and runs the active-trip conflict checks for
+    all rows in one query.
+    """
+    check_active_conflicts = False
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+    customers = PreloadedPrimaryKeyRelatedField(queryset=Customer.objects.all(), many=True, required=False)
+    origin_location = PreloadedPrimaryKeyRelatedField(queryset=Origin.objects.all(), allow_null=True, required=False)
+
+    @classmethod
+    def preload_relations(cls, rows):
+        """
+        One in_bulk() query per relation field for every id used in ``rows``.
+        """
+        preloaded = {}
+        for name, field in cls().fields.items():
+            if field.read_only:
+                continue
+            if isinstance(field, serializers.ManyRelatedField):
+                field = field.child_relation
+            elif not isinstance(field, serializers.PrimaryKeyRelatedField):
+                continue
+            ids = set()
+            for row in rows:
+                value = row.get(name) if isinstance(row, dict) else None
+                for item in (value if isinstance(value, list) else [value]):
+                    if str(item).isdigit():
+                        ids.add(int(item))
+            preloaded[name] = field.get_queryset().in_bulk(ids) if ids else {}
+        return preloaded
+
+
+class TripListSerializer(TripSerializer):
+    """
+    List rows: TripSerializer without the nested delivery proofs. Every other
+    relation is read from the joins/prefetches in TripViewSet.get_queryset.
+    """
+    delivery_proofs = None
+
+
 class SuratJalanHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = SuratJalanHistory
         fields = ['surat_jalan_number', 'changed_at']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     computed_role = serializers.SerializerMethodField()
     organization_status = serializers.SerializerMethodField()
@@ -365,9 +435,30 @@ class NotificationSerializer(serializers.ModelSerializer):
 
 from .models import ActivityLog
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
         model = ActivityLog
         fields = ['id', 'user', 'user_name', 'action', 'details', 'ip_address', 'created_at']
+
+from .models import GeofenceDwell
+
+class GeofenceDwellSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    vehicle_plate = serializers.CharField(source='vehicle.license_plate', read_only=True)
+    customer_name = serializers.CharField(source='customer.name', read_only=True, default=None)
+    origin_name = serializers.CharField(source='origin.name', read_only=True, default=None)
+
+    class Meta:
+        model = GeofenceDwell
+        fields = [
+            'id', 'vehicle', 'vehicle_plate', 'place_type', 'customer', 'customer_name', 'origin', 'origin_name',
+            'entered_at', 'last_seen_at', 'exited_at', 'duration_minutes', 'position_count',
+        ]
+
+from .models import LogArchive
+
+class LogArchiveSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LogArchive
+        fields = ['id', 'kind', 'organization', 'month', 'entry_count', 'first_at', 'last_at', 'created_at']
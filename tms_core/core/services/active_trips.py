@@ -0,0 +1,201 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import Trip, User, Notification, ActivityLog
+from .dwell import MIN_DWELL_MINUTES
+
+ACTIVE_STATUSES = ('PLANNED', 'OTW', 'ARRIVED')
+ACTIVE_TRIP_KEY = 'trip:active:vehicle:{}'
+ACTIVE_TRIP_TIMEOUT = 24 * 60 * 60  # idle vehicles cache an empty list, so they do not query on every event
+VISIT_KEY = 'trip:visit:vehicle:{}:customer:{}'
+VISIT_TIMEOUT = 24 * 60 * 60
+
+
+def _destinations(trip):
+    return list(trip.destinations or ([trip.destination] if trip.destination else []))
+
+
+def build_entry(trip):
+    """
+    What the geofence hot path needs to know about one active trip.
+    ``customers`` maps customer id -> name for every customer on the trip;
+    a customer is pending while its name is an uncompleted destination.
+    """
+    customers = {str(customer.id): customer.name for customer in trip.customers.all()}
+    if trip.customer_id and trip.customer:
+        customers.setdefault(str(trip.customer_id), trip.customer.name)
+    return {
+        'id': trip.id,
+        'organization_id': trip.organization_id,
+        'surat_jalan_number': trip.surat_jalan_number,
+        'status': trip.status,
+        'origin_location_id': trip.origin_location_id,
+        'destinations': _destinations(trip),
+        'completed_destinations': list(trip.completed_destinations or []),
+        'customers': customers,
+    }
+
+
+def refresh_active_trips(vehicle_id):
+    trips = (
+        Trip.objects.filter(vehicle_id=vehicle_id, status__in=ACTIVE_STATUSES)
+        .select_related('customer').prefetch_related('customers')
+        .order_by('created_at', 'id')
+    )
+    entries = [build_entry(trip) for trip in trips]
+    cache.set(ACTIVE_TRIP_KEY.format(vehicle_id), entries, ACTIVE_TRIP_TIMEOUT)
+    return entries
+
+
+def schedule_active_trip_refresh(*vehicle_ids):
+    """
+    Rebuild the cached entries once the current transaction commits.
+    """
+    vehicle_ids = {vehicle_id for vehicle_id in vehicle_ids if vehicle_id}
+    if not vehicle_ids:
+        return
+
+    def _refresh():
+        for vehicle_id in vehicle_ids:
+            try:
+                refresh_active_trips(vehicle_id)
+            except Exception as exc:
+                cache.delete(ACTIVE_TRIP_KEY.format(vehicle_id))
+                print(f"Active trip refresh failed for vehicle {vehicle_id}: {exc}")
+
+    transaction.on_commit(_refresh)
+
+
+def get_active_trips(vehicle_id):
+    """
+    The vehicle's active trip entries, oldest first. Reads the cache; the
+    database is only consulted on a cold key.
+    """
+    entries = cache.get(ACTIVE_TRIP_KEY.format(vehicle_id))
+    if entries is None:
+        entries = refresh_active_trips(vehicle_id)
+    return entries
+
+
+def _first(entries, predicate):
+    return next((entry for entry in entries if predicate(entry)), None)
+
+
+def _pending_customer(entry, customer_id):
+    """
+    The customer's destination name when it is still pending on the trip.
+    """
+    name = entry['customers'].get(str(customer_id))
+    if name and name in entry['destinations'] and name not in entry['completed_destinations']:
+        return name
+    return None
+
+
+def notify_trip_completed(organization_id, label):
+    org_users = User.objects.filter(organization_id=organization_id, role__in=['OWNER', 'ADMIN'])
+    message = f"Trip {label} completed."
+    for u in org_users:
+        Notification.objects.create(user=u, message=message)
+
+
+def _apply(vehicle, entries, entry, changes, log_action, log_details, ip_address):
+    """
+    Write the transition guarded by the status we based it on, then update the
+    cached entries in place. Returns False when the trip changed underneath us.
+    """
+    updated = Trip.objects.filter(pk=entry['id'], status=entry['status']).update(**changes)
+    if not updated:
+        refresh_active_trips(vehicle.id)
+        return False
+
+    new_entry = dict(entry, status=changes.get('status', entry['status']))
+    if 'completed_destinations' in changes:
+        new_entry['completed_destinations'] = changes['completed_destinations']
+    remaining = [
+        new_entry if other['id'] == entry['id'] else other
+        for other in entries
+        if other['id'] != entry['id'] or new_entry['status'] in ACTIVE_STATUSES
+    ]
+    cache.set(ACTIVE_TRIP_KEY.format(vehicle.id), remaining, ACTIVE_TRIP_TIMEOUT)
+
+    ActivityLog.objects.create(
+        action=log_action,
+        details=dict(log_details, organization_id=vehicle.organization_id, trip_id=entry['id'], vehicle=vehicle.license_plate),
+        user=None,
+        ip_address=ip_address
+    )
+    return True
+
+
+def advance_trip_on_geofence(vehicle, event_type, fence, event_time, ip_address=None):
+    """
+    Move the vehicle's matching active trip forward on a geofence transition.
+    Entering a trip's origin depot marks the oldest such PLANNED/OTW trip
+    ARRIVED and leaving it marks it OTW again. A customer destination is only
+    completed on leaving the customer after staying at least MIN_DWELL_MINUTES
+    (drive-throughs do not count); the trip completes once every destination
+    is done. Returns the action taken or None.
+    """
+    entries = get_active_trips(vehicle.id)
+    if not entries:
+        return None
+
+    geofence_type = fence['geofence_type']
+    ref_id = fence['ref_id']
+
+    if geofence_type == 'origin':
+        if event_type == 'geofenceEnter':
+            entry = _first(entries, lambda e: e['origin_location_id'] == ref_id and e['status'] in ('PLANNED', 'OTW'))
+            new_status, action, log_action, verb = 'ARRIVED', 'arrived', 'TRIP_ARRIVED_AUTO', 'arrival at'
+        else:
+            entry = _first(entries, lambda e: e['origin_location_id'] == ref_id and e['status'] == 'ARRIVED')
+            new_status, action, log_action, verb = 'OTW', 'departed', 'TRIP_DEPARTED_AUTO', 'departure from'
+        if entry is None:
+            return None
+        details = {
+            'origin': fence['name'],
+            'previous_status': entry['status'],
+            'message': f"Auto-detected {verb} {fence['name']}",
+        }
+        if _apply(vehicle, entries, entry, {'status': new_status}, log_action, details, ip_address):
+            return action
+        return None
+
+    if geofence_type != 'customer':
+        return None
+
+    visit_key = VISIT_KEY.format(vehicle.id, ref_id)
+    if event_type == 'geofenceEnter':
+        if _first(entries, lambda e: _pending_customer(e, ref_id)):
+            cache.set(visit_key, event_time.timestamp(), VISIT_TIMEOUT)
+        return None
+
+    entered_at = cache.get(visit_key)
+    cache.delete(visit_key)
+    if entered_at is None or (event_time.timestamp() - entered_at) / 60 < MIN_DWELL_MINUTES:
+        return None
+
+    entry = _first(entries, lambda e: _pending_customer(e, ref_id))
+    if entry is None:
+        return None
+    name = _pending_customer(entry, ref_id)
+    status = entry['status']
+    completed = entry['completed_destinations'] + [name]
+    changes = {'completed_destinations': completed}
+    if set(completed).issuperset(entry['destinations']):
+        changes['status'] = 'COMPLETED'
+        changes['completed_at'] = event_time
+    elif status in ('PLANNED', 'ARRIVED'):
+        changes['status'] = 'OTW'
+
+    details = {
+        'customer': name,
+        'previous_status': status,
+        'message': f"Auto-detected delivery at {name}",
+    }
+    if not _apply(vehicle, entries, entry, changes, 'TRIP_DESTINATION_ARRIVED_AUTO', details, ip_address):
+        return None
+    if changes.get('status') == 'COMPLETED':
+        notify_trip_completed(entry['organization_id'], entry['surat_jalan_number'] or entry['id'])
+        return 'completed'
+    return 'destination_arrived'
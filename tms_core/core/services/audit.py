@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.db import connection, transaction
+
+from ..models import ActivityLog
+from .events import publish_event, org_channel
+
+FLUSH_BATCH_SIZE = 500
+
+_local = Local()  # per request/task context, also correct under ASGI
+
+
+def publish_activity(entry):
+    """
+    Push a saved ActivityLog to its organization's live event stream.
+    """
+    from ..serializers import ActivityLogSerializer
+
+    organization_id = entry.resolve_organization()
+    if not organization_id:
+        return
+    publish_event(org_channel(organization_id), 'activity', ActivityLogSerializer(entry).data)
+
+
+def record_activity(action, details=None, user=None, ip_address=None):
+    """
+    Audit one action. Inside buffered_activity() the entry is queued and
+    written with the rest of the scope's entries; otherwise it is saved now.
+    A queued entry recorded inside a transaction only joins the buffer once
+    that transaction commits, so rolled-back writes leave no audit trail.
+    """
+    entry = ActivityLog(user=user, action=action, details=details or {}, ip_address=ip_address)
+    entry.resolve_organization()  # bulk_create skips save()
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        entry.save()
+    elif connection.in_atomic_block:
+        transaction.on_commit(lambda: buffer.append(entry))
+    else:
+        buffer.append(entry)
+    return entry
+
+
+def flush_activity(entries):
+    """
+    bulk_create the queued entries and publish them (bulk_create sends no
+    post_save, so publish_activity_log does not see them).
+    """
+    if not entries:
+        return []
+    try:
+        created = ActivityLog.objects.bulk_create(entries, batch_size=FLUSH_BATCH_SIZE)
+    except Exception as e:
+        print(f"Error writing activity logs: {e}")
+        return []
+    for entry in created:
+        try:
+            publish_activity(entry)
+        except Exception as e:
+            print(f"Error publishing activity: {e}")
+    return created
+
+
+@contextmanager
+def buffered_activity():
+    """
+    Queue record_activity() calls made inside the block and write them in one
+    bulk insert when it exits. Nested scopes defer to the outermost one.
+    Only entries whose transaction committed are written; when the block exits
+    inside an open transaction the flush waits for it to commit.
+    """
+    if getattr(_local, 'buffer', None) is not None:
+        yield
+        return
+    _local.buffer = entries = []
+    try:
+        yield
+    finally:
+        _local.buffer = None
+        if connection.in_atomic_block:
+            # Runs after the on_commit appends registered inside the block.
+            transaction.on_commit(lambda: flush_activity(entries))
+        else:
+            flush_activity(entries)
@@ -0,0 +1,189 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import VehiclePosition, Vehicle, GeofenceDwell, AnalyticsWatermark
+from .geofence_engine import GeofenceIndex, load_fences
+
+WATERMARK_NAME = 'geofence_dwell'
+BATCH_SIZE = 20000
+MAX_GAP = timedelta(hours=2)  # silence longer than this inside a fence splits the visit
+MIN_DWELL_MINUTES = 2  # shorter visits are drive-throughs and are dropped
+GAP_GRACE_SECONDS = 15 * 60  # how long an id skipped by the watermark is re-read for
+MAX_PENDING_GAPS = 5000
+
+
+def _fence_fields(fence):
+    if fence.kind == 'customer':
+        return {'place_type': 'CUSTOMER', 'customer_id': fence.ref_id}
+    return {'place_type': 'ORIGIN', 'origin_id': fence.ref_id}
+
+
+def _row_key(row):
+    if row.place_type == 'CUSTOMER':
+        return f"customer:{row.customer_id}"
+    return f"origin:{row.origin_id}"
+
+
+def _close(row, exited_at):
+    row.exited_at = exited_at
+    row.duration_minutes = round((row.last_seen_at - row.entered_at).total_seconds() / 60.0, 2)
+
+
+def _pending_gaps(watermark, now):
+    """
+    Ids the watermark skipped that are still inside the grace window.
+    """
+    return {
+        int(position_id): missed_at
+        for position_id, missed_at in (watermark.pending or {}).items()
+        if now - missed_at < GAP_GRACE_SECONDS
+    }
+
+
+def process_dwell_batch(batch_size=BATCH_SIZE, indexes=None):
+    """
+    Fold the next ``batch_size`` positions after the watermark into
+    GeofenceDwell rows. Visits still open at the end of the batch are saved
+    with exited_at empty and continued by the next batch. Returns stats.
+
+    Ids are allocated before their transaction commits, so the watermark can
+    pass an id that only shows up later. Ids missing below the mark are kept
+    on the watermark and re-read for GAP_GRACE_SECONDS; each position is
+    still folded exactly once.
+    """
+    indexes = {} if indexes is None else indexes
+    watermark, _ = AnalyticsWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    now = time.time()
+    pending = _pending_gaps(watermark, now)
+    query = Q(id__gt=watermark.position)
+    if pending:
+        query |= Q(id__in=list(pending))
+    positions = list(
+        VehiclePosition.objects.filter(query)
+        .order_by('id')
+        .values_list('id', 'vehicle_id', 'latitude', 'longitude', 'timestamp')[:batch_size]
+    )
+    if not positions:
+        if len(pending) != len(watermark.pending or {}):
+            AnalyticsWatermark.objects.filter(pk=watermark.pk).update(pending={str(k): v for k, v in pending.items()})
+        return {'positions': 0}
+
+    seen = {row[0] for row in positions}
+    new_ids = [position_id for position_id in seen if position_id > watermark.position]
+    high = max(new_ids) if new_ids else watermark.position
+    for position_id in seen:
+        pending.pop(position_id, None)
+    # A fresh watermark has nothing in flight below the first row it reads.
+    floor = watermark.position if watermark.position or not new_ids else min(new_ids) - 1
+    for position_id in range(floor + 1, high):
+        if position_id not in seen:
+            pending[position_id] = now
+    if len(pending) > MAX_PENDING_GAPS:
+        pending = dict(sorted(pending.items())[-MAX_PENDING_GAPS:])
+    # Late rows can be older than ones already folded; fold each vehicle in time order.
+    positions.sort(key=lambda row: (row[4], row[0]))
+
+    vehicle_ids = {vehicle_id for _, vehicle_id, _, _, _ in positions}
+    org_by_vehicle = dict(Vehicle.objects.filter(id__in=vehicle_ids).values_list('id', 'organization_id'))
+    for organization_id in set(org_by_vehicle.values()) - set(indexes):
+        indexes[organization_id] = GeofenceIndex(load_fences(organization_id))
+
+    open_visits = {}  # (vehicle_id, fence key) -> GeofenceDwell
+    for row in GeofenceDwell.objects.filter(vehicle_id__in=vehicle_ids, exited_at__isnull=True):
+        open_visits[(row.vehicle_id, _row_key(row))] = row
+
+    touched = {}  # id(row) -> row
+    open_by_vehicle = {}
+    for (vehicle_id, key), row in open_visits.items():
+        open_by_vehicle.setdefault(vehicle_id, set()).add(key)
+
+    for _, vehicle_id, latitude, longitude, timestamp in positions:
+        organization_id = org_by_vehicle.get(vehicle_id)
+        if organization_id is None:
+            continue
+        inside = {fence.key: fence for fence in indexes[organization_id].containing(latitude, longitude)}
+        current_open = open_by_vehicle.setdefault(vehicle_id, set())
+
+        for key in list(current_open):
+            row = open_visits[(vehicle_id, key)]
+            if timestamp < row.last_seen_at:
+                continue  # a late fix from before the visit's latest sighting cannot end it
+            if key not in inside or timestamp - row.last_seen_at > MAX_GAP:
+                _close(row, timestamp if key not in inside else row.last_seen_at)
+                touched[id(row)] = row
+                del open_visits[(vehicle_id, key)]
+                current_open.discard(key)
+
+        for key, fence in inside.items():
+            row = open_visits.get((vehicle_id, key))
+            if row is None:
+                row = GeofenceDwell(
+                    organization_id=organization_id, vehicle_id=vehicle_id,
+                    entered_at=timestamp, last_seen_at=timestamp, **_fence_fields(fence),
+                )
+                open_visits[(vehicle_id, key)] = row
+                current_open.add(key)
+            row.entered_at = min(row.entered_at, timestamp)
+            row.last_seen_at = max(row.last_seen_at, timestamp)
+            row.position_count += 1
+            row.duration_minutes = round((row.last_seen_at - row.entered_at).total_seconds() / 60.0, 2)
+            touched[id(row)] = row
+
+    to_create, to_update, to_delete = [], [], []
+    for row in touched.values():
+        too_short = row.exited_at is not None and row.duration_minutes < MIN_DWELL_MINUTES
+        if row.pk is None:
+            if not too_short:
+                to_create.append(row)
+        elif too_short:
+            to_delete.append(row.pk)
+        else:
+            to_update.append(row)
+
+    with transaction.atomic():
+        if to_create:
+            GeofenceDwell.objects.bulk_create(to_create, batch_size=1000)
+        if to_update:
+            GeofenceDwell.objects.bulk_update(
+                to_update, ['entered_at', 'last_seen_at', 'exited_at', 'duration_minutes', 'position_count'],
+                batch_size=500,
+            )
+        if to_delete:
+            GeofenceDwell.objects.filter(pk__in=to_delete).delete()
+        AnalyticsWatermark.objects.filter(pk=watermark.pk).update(
+            position=high, pending={str(k): v for k, v in pending.items()},
+        )
+
+    return {
+        'positions': len(positions),
+        'created': len(to_create),
+        'updated': len(to_update),
+        'dropped': len(to_delete),
+        'watermark': high,
+        'pending': len(pending),
+    }
+
+
+def compute_geofence_dwells(batch_size=BATCH_SIZE, max_batches=50):
+    """
+    Advance the dwell watermark until caught up (or ``max_batches`` ran).
+    Fence indexes are built once per run and shared by its batches.
+    """
+    started = time.perf_counter()
+    indexes = {}
+    totals = {'positions': 0, 'created': 0, 'updated': 0, 'dropped': 0, 'batches': 0}
+    for _ in range(max_batches):
+        stats = process_dwell_batch(batch_size, indexes)
+        if not stats['positions']:
+            break
+        totals['batches'] += 1
+        for key in ('positions', 'created', 'updated', 'dropped'):
+            totals[key] += stats[key]
+        totals['watermark'] = stats['watermark']
+        if stats['positions'] < batch_size:
+            break
+    totals['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return totals
@@ -0,0 +1,45 @@
+import json
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+CHANNEL_PREFIX = 'tms:events'
+
+_client = None
+
+
+def org_channel(organization_id):
+    return f"{CHANNEL_PREFIX}:org:{organization_id}"
+
+
+def user_channel(user_id):
+    return f"{CHANNEL_PREFIX}:user:{user_id}"
+
+
+def all_orgs_pattern():
+    return f"{CHANNEL_PREFIX}:org:*"
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def _publish(channel, message):
+    try:
+        get_redis().publish(channel, message)
+    except redis.RedisError as exc:
+        print(f"Event publish error: {exc}")
+
+
+def publish_event(channel, event, data):
+    """
+    Publish an event to a Redis pub/sub channel once the current transaction commits,
+    so subscribers never see rows that end up rolled back.
+    """
+    message = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+    transaction.on_commit(lambda: _publish(channel, message))
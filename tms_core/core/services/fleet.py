@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Organization, User, Vehicle, VehicleTombstone, next_change_version
+
+MOVING_SPEED_THRESHOLD = 10  # km/h above which a vehicle counts as moving
+DEFAULT_OFFLINE_STATUS_MINUTES = 10
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+
+FLEET_ALL_GROUP = 'fleet.all'
+
+
+def fleet_group(organization_id):
+    return f"fleet.org.{organization_id}"
+
+
+def organization_offline_minutes(organization_ids):
+    """
+    Minutes without a fix after which an organization's vehicles count as
+    offline, taken from the org OWNER's alert settings.
+    """
+    thresholds = {}
+    owners = User.objects.filter(organization_id__in=organization_ids, role='OWNER').order_by('id')
+    for org_id, minutes in owners.values_list('organization_id', 'offline_alert_minutes'):
+        thresholds.setdefault(org_id, minutes or DEFAULT_OFFLINE_STATUS_MINUTES)
+    return thresholds
+
+
+def compute_vehicle_status(vehicle, now=None, offline_minutes=DEFAULT_OFFLINE_STATUS_MINUTES):
+    """
+    MOVING / IDLE / STOPPED / OFFLINE as shown on the map.
+    """
+    # Webhook-driven status overrides other heuristics
+    if vehicle.device_status == 'OFFLINE':
+        return 'OFFLINE'
+
+    if vehicle.last_gps_sync:
+        elapsed = ((now or timezone.now()) - vehicle.last_gps_sync).total_seconds() / 60
+        if elapsed > offline_minutes:
+            return 'OFFLINE'
+
+    if vehicle.last_speed > MOVING_SPEED_THRESHOLD:
+        return 'MOVING'
+    if vehicle.last_ignition:
+        return 'IDLE'
+    return 'STOPPED'
+
+
+def refresh_computed_status(vehicles, now=None, thresholds=None):
+    """
+    Recompute Vehicle.computed_status in memory (callers persist it with the
+    rest of their update). ``thresholds`` maps organization id -> offline
+    minutes and is looked up when not given.
+    """
+    now = now or timezone.now()
+    if thresholds is None:
+        thresholds = organization_offline_minutes({vehicle.organization_id for vehicle in vehicles})
+    for vehicle in vehicles:
+        offline_minutes = thresholds.get(vehicle.organization_id, DEFAULT_OFFLINE_STATUS_MINUTES)
+        vehicle.computed_status = compute_vehicle_status(vehicle, now, offline_minutes)
+
+
+def mark_stale_vehicles_offline(now=None):
+    """
+    Offline scheduler: flip vehicles whose last fix is older than their
+    organization's threshold to OFFLINE. One indexed UPDATE per distinct
+    threshold; fresh fixes bring them back through the ingest path.
+    Returns the vehicles that changed.
+    """
+    now = now or timezone.now()
+    thresholds = organization_offline_minutes(Organization.objects.values_list('id', flat=True))
+    orgs_by_minutes = defaultdict(list)
+    for organization_id, minutes in thresholds.items():
+        if minutes != DEFAULT_OFFLINE_STATUS_MINUTES:
+            orgs_by_minutes[minutes].append(organization_id)
+    custom_orgs = [org_id for org_ids in orgs_by_minutes.values() for org_id in org_ids]
+
+    groups = [(DEFAULT_OFFLINE_STATUS_MINUTES, Vehicle.objects.exclude(organization_id__in=custom_orgs))]
+    groups += [(minutes, Vehicle.objects.filter(organization_id__in=org_ids)) for minutes, org_ids in orgs_by_minutes.items()]
+
+    changed = []
+    for minutes, queryset in groups:
+        cutoff = now - timedelta(minutes=minutes)
+        with transaction.atomic():
+            # Rows ingest is writing right now are skipped; the next run sees them.
+            stale_ids = list(
+                queryset.filter(last_gps_sync__lt=cutoff).exclude(computed_status='OFFLINE')
+                .select_for_update(skip_locked=True).values_list('pk', flat=True)
+            )
+            if not stale_ids:
+                continue
+            version = next_change_version()
+            # Re-check staleness in the UPDATE itself: a fix that landed after the
+            # read keeps its vehicle online.
+            updated = (
+                Vehicle.objects.filter(pk__in=stale_ids, last_gps_sync__lt=cutoff)
+                .exclude(computed_status='OFFLINE')
+                .update(computed_status='OFFLINE', change_version=version)
+            )
+            if updated:
+                changed.extend(Vehicle.objects.filter(pk__in=stale_ids, computed_status='OFFLINE', change_version=version))
+
+    if changed:
+        broadcast_vehicle_states(changed)
+    return changed
+
+
+def tombstone_retention_days():
+    return int(getattr(settings, 'VEHICLE_TOMBSTONE_RETENTION_DAYS', DEFAULT_TOMBSTONE_RETENTION_DAYS))
+
+
+def tombstone_horizon(now_version=None):
+    """
+    Oldest change_version whose deletions are still recorded. Delta cursors
+    older than this may have missed pruned tombstones and must resync fully.
+    """
+    now_version = now_version or next_change_version()
+    return now_version - tombstone_retention_days() * 24 * 60 * 60 * 1_000_000
+
+
+def prune_vehicle_tombstones():
+    """
+    Drop tombstones past VEHICLE_TOMBSTONE_RETENTION_DAYS. Returns the count.
+    """
+    deleted, _ = VehicleTombstone.objects.filter(change_version__lt=tombstone_horizon()).delete()
+    return deleted
+
+
+def vehicle_delta(vehicle):
+    """
+    Compact live-state record pushed to map clients.
+    """
+    return {
+        'id': vehicle.id,
+        'lat': round(vehicle.last_latitude, 6),
+        'lon': round(vehicle.last_longitude, 6),
+        'speed': round(vehicle.last_speed or 0, 1),
+        'heading': round(vehicle.last_heading or 0),
+        'status': vehicle.computed_status,
+    }
+
+
+def _group_send(groups, message):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        for group in groups:
+            async_to_sync(channel_layer.group_send)(group, message)
+    except Exception as exc:
+        print(f"Fleet broadcast error: {exc}")
+
+
+def broadcast_vehicle_states(vehicles):
+    """
+    Push vehicle-state deltas to each organization's fleet group (and the
+    super-admin group) after the current transaction commits.
+    """
+    by_org = defaultdict(list)
+    for vehicle in vehicles:
+        if vehicle.organization_id:
+            by_org[vehicle.organization_id].append(vehicle_delta(vehicle))
+
+    for organization_id, deltas in by_org.items():
+        message = {'type': 'fleet.delta', 'organization_id': organization_id, 'vehicles': deltas}
+        groups = [fleet_group(organization_id), FLEET_ALL_GROUP]
+        transaction.on_commit(lambda groups=groups, message=message: _group_send(groups, message))
@@ -0,0 +1,220 @@
+import math
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Origin, Customer
+
+GRID_CELL_DEGREES = 0.01  # ~1.1 km cells; a fix is only tested against fences touching its cell
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+DEFAULT_RADIUS_M = 200  # same fallback the Traccar geofence sync uses for a blank radius
+
+VERSION_KEY = 'geofence:version:org:{}'
+STATE_KEY = 'geofence:inside:vehicle:{}'
+STATE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class Fence:
+    """
+    One CIRCLE or RECTANGLE geofence from an Origin or Customer.
+    ``key`` ('origin:12' / 'customer:7') identifies it in vehicle state.
+    """
+    __slots__ = ('key', 'kind', 'ref_id', 'name', 'traccar_id', 'is_origin', 'shape',
+                 'latitude', 'longitude', 'radius', 'south', 'west', 'north', 'east')
+
+    def __init__(self, kind, ref_id, name, traccar_id=None, is_origin=False, shape='CIRCLE',
+                 latitude=None, longitude=None, radius=0, bounds=None):
+        self.key = f"{kind}:{ref_id}"
+        self.kind = kind
+        self.ref_id = ref_id
+        self.name = name
+        self.traccar_id = traccar_id
+        self.is_origin = is_origin
+        self.shape = shape
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius or 0
+
+        if shape == 'RECTANGLE':
+            self.south, self.west, self.north, self.east = (
+                bounds['south'], bounds['west'], bounds['north'], bounds['east'],
+            )
+        else:
+            d_lat = self.radius / METERS_PER_DEGREE_LAT
+            d_lon = self.radius / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+            self.south, self.north = latitude - d_lat, latitude + d_lat
+            self.west, self.east = longitude - d_lon, longitude + d_lon
+
+    def contains(self, latitude, longitude):
+        if not (self.south <= latitude <= self.north and self.west <= longitude <= self.east):
+            return False
+        if self.shape == 'RECTANGLE':
+            return True
+        return haversine_m(self.latitude, self.longitude, latitude, longitude) <= self.radius
+
+    def describe(self):
+        """
+        The fence dict record_geofence_transition expects.
+        """
+        if self.kind == 'origin':
+            geofence_type = 'origin' if self.is_origin else 'drop'
+        else:
+            geofence_type = 'customer'
+        return {
+            'geofence_id': self.traccar_id or self.key,
+            'geofence_type': geofence_type,
+            'ref_id': self.ref_id,
+            'name': self.name,
+        }
+
+
+def _cell(latitude, longitude):
+    return (math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES))
+
+
+class GeofenceIndex:
+    """
+    Uniform lat/lon grid over one organization's fences. Each fence is listed
+    under every cell its bounding box touches, so a lookup reads one cell.
+    """
+
+    def __init__(self, fences):
+        self.fences = list(fences)
+        self.cells = defaultdict(list)
+        for fence in self.fences:
+            south, west = _cell(fence.south, fence.west)
+            north, east = _cell(fence.north, fence.east)
+            for row in range(south, north + 1):
+                for col in range(west, east + 1):
+                    self.cells[(row, col)].append(fence)
+
+    def containing(self, latitude, longitude):
+        return [fence for fence in self.cells.get(_cell(latitude, longitude), ()) if fence.contains(latitude, longitude)]
+
+
+def load_fences(organization_id):
+    from .traccar import _normalize_bounds
+
+    fences = []
+    origins = Origin.objects.filter(organization_id=organization_id, latitude__isnull=False, longitude__isnull=False)
+    for origin in origins.only('id', 'name', 'traccar_id', 'is_origin', 'latitude', 'longitude', 'radius'):
+        fences.append(Fence(
+            'origin', origin.id, origin.name, traccar_id=origin.traccar_id, is_origin=origin.is_origin,
+            latitude=origin.latitude, longitude=origin.longitude, radius=origin.radius or DEFAULT_RADIUS_M,
+        ))
+
+    customers = Customer.objects.filter(organization_id=organization_id).only(
+        'id', 'name', 'traccar_id', 'latitude', 'longitude', 'radius', 'geofence_type', 'geofence_bounds',
+    )
+    for customer in customers:
+        if customer.geofence_type == 'RECTANGLE':
+            bounds = _normalize_bounds(customer.geofence_bounds)
+            if bounds:
+                fences.append(Fence('customer', customer.id, customer.name, traccar_id=customer.traccar_id,
+                                    shape='RECTANGLE', bounds=bounds))
+                continue
+        if customer.latitude is not None and customer.longitude is not None:
+            fences.append(Fence(
+                'customer', customer.id, customer.name, traccar_id=customer.traccar_id,
+                latitude=customer.latitude, longitude=customer.longitude, radius=customer.radius or DEFAULT_RADIUS_M,
+            ))
+    return fences
+
+
+_indexes = {}  # organization_id -> (version, GeofenceIndex)
+_indexes_lock = threading.Lock()
+
+
+def invalidate_geofences(organization_id):
+    """
+    Bump the organization's fence version; every process rebuilds its index on next use.
+    """
+    cache.set(VERSION_KEY.format(organization_id), timezone.now().timestamp(), None)
+
+
+def get_index(organization_id, version=None):
+    if version is None:
+        version = cache.get(VERSION_KEY.format(organization_id))
+    with _indexes_lock:
+        cached = _indexes.get(organization_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    index = GeofenceIndex(load_fences(organization_id))
+    with _indexes_lock:
+        _indexes[organization_id] = (version, index)
+    return index
+
+
+def evaluate_positions(samples, event_time=None):
+    """
+    Compare fixes against the organization's fences and emit enter/exit
+    transitions. ``samples`` is an ordered list of (vehicle, latitude,
+    longitude) or (vehicle, latitude, longitude, fix_time); ``event_time``
+    stamps samples without their own time. Per-vehicle inside state lives in the cache so every ingest
+    process shares it. A vehicle seen for the first time only records its
+    state, so a cold cache never produces a burst of false enters.
+    Returns the (vehicle, event_type, fence) transitions.
+    """
+    from .traccar_events import record_geofence_transition
+
+    samples = [sample for sample in samples if sample[1] is not None and sample[2] is not None]
+    if not samples:
+        return []
+
+    event_time = event_time or timezone.now()
+    samples = [
+        (sample[0], sample[1], sample[2], sample[3] if len(sample) > 3 and sample[3] else event_time)
+        for sample in samples
+    ]
+    organization_ids = {vehicle.organization_id for vehicle, _, _, _ in samples}
+    versions = cache.get_many([VERSION_KEY.format(org_id) for org_id in organization_ids])
+    indexes = {
+        org_id: get_index(org_id, versions.get(VERSION_KEY.format(org_id)))
+        for org_id in organization_ids
+    }
+    state_keys = {vehicle.pk: STATE_KEY.format(vehicle.pk) for vehicle, _, _, _ in samples}
+    stored = cache.get_many(list(state_keys.values()))
+    states = {pk: (set(stored[key]) if key in stored else None) for pk, key in state_keys.items()}
+
+    transitions = []
+    timed = []
+    changed = set()
+    for vehicle, latitude, longitude, fix_time in samples:
+        fences = {fence.key: fence for fence in indexes[vehicle.organization_id].containing(latitude, longitude)}
+        previous = states[vehicle.pk]
+        current = set(fences)
+        if previous is not None:
+            exited = previous - current
+            if exited:
+                known = {fence.key: fence for fence in indexes[vehicle.organization_id].fences}
+                for key in sorted(exited):
+                    if key in known:
+                        transitions.append((vehicle, 'geofenceExit', known[key]))
+                        timed.append(fix_time)
+            for key in sorted(current - previous):
+                transitions.append((vehicle, 'geofenceEnter', fences[key]))
+                timed.append(fix_time)
+        if previous != current:
+            states[vehicle.pk] = current
+            changed.add(vehicle.pk)
+
+    if changed:
+        cache.set_many({state_keys[pk]: sorted(states[pk]) for pk in changed}, STATE_TIMEOUT)
+
+    for (vehicle, event_type, fence), fix_time in zip(transitions, timed):
+        try:
+            record_geofence_transition(vehicle, event_type, fence.describe(), fix_time, int(fix_time.timestamp()))
+        except Exception as exc:
+            print(f"Geofence transition error: {exc}")
+    return transitions
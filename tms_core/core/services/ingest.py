@@ -0,0 +1,256 @@
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Vehicle, VehiclePosition, VehicleEvent, DeviceLog, next_change_version
+from .alerts import notify_vehicle_event, STOP_SPEED_THRESHOLD, DEFAULT_OFFLINE_MINUTES
+from .fleet import broadcast_vehicle_states, compute_vehicle_status, organization_offline_minutes, refresh_computed_status
+from .geofence_engine import evaluate_positions
+
+KNOTS_TO_KMH = 1.852
+
+LIVE_STATE_FIELDS = [
+    'last_latitude', 'last_longitude', 'last_speed', 'last_heading', 'last_ignition',
+    'stopped_since', 'last_gps_sync', 'device_status', 'device_status_changed_at',
+    'current_odometer', 'computed_status', 'last_updated', 'change_version',
+]
+
+
+def fix_time(fix, now):
+    """
+    When the fix was taken: Traccar's ``fixTime``, else ``deviceTime``, else
+    ``now``. Device clocks ahead of ours are clamped to ``now``.
+    """
+    for key in ('fixTime', 'deviceTime'):
+        value = fix.get(key)
+        if not value:
+            continue
+        try:
+            parsed = parse_datetime(value) if isinstance(value, str) else value
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            continue
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        return min(parsed, now)
+    return now
+
+
+def _apply_fix(vehicle, fix, fixed_at, offline_threshold, events, positions):
+    """
+    Apply one Traccar-shaped position dict taken at ``fixed_at`` to the vehicle
+    in memory, collecting VehicleEvent and VehiclePosition rows to insert.
+    A fix older than the vehicle's last sync only adds history.
+    Returns whether the live state was updated.
+    """
+    lat = fix.get('latitude')
+    lon = fix.get('longitude')
+    speed = fix.get('speed')  # Knots
+    course = fix.get('course')
+    attributes = fix.get('attributes') or {}
+
+    has_coords = lat not in (None, '') and lon not in (None, '')
+    lat_val = float(lat) if has_coords else vehicle.last_latitude
+    lon_val = float(lon) if has_coords else vehicle.last_longitude
+    speed_val = (float(speed) * KNOTS_TO_KMH) if speed not in (None, '') else vehicle.last_speed
+    heading_val = float(course) if course not in (None, '') else vehicle.last_heading
+    ignition_val = attributes.get('ignition', vehicle.last_ignition)
+
+    if vehicle.last_gps_sync and fixed_at < vehicle.last_gps_sync:
+        if has_coords:
+            positions.append(VehiclePosition(
+                vehicle=vehicle,
+                latitude=lat_val,
+                longitude=lon_val,
+                speed=speed_val,
+                heading=heading_val,
+                ignition=ignition_val,
+                timestamp=fixed_at,
+            ))
+        return False
+
+    if has_coords:
+        vehicle.last_latitude = lat_val
+        vehicle.last_longitude = lon_val
+    vehicle.last_speed = speed_val
+    vehicle.last_heading = heading_val
+    vehicle.last_ignition = ignition_val
+
+    # 1. OFFLINE CHECK
+    if vehicle.last_gps_sync:
+        offline_duration = (fixed_at - vehicle.last_gps_sync).total_seconds() / 60.0
+        if offline_duration >= offline_threshold:
+            events.append(VehicleEvent(
+                vehicle=vehicle,
+                event_type='OFFLINE',
+                start_time=vehicle.last_gps_sync,
+                end_time=fixed_at,
+                duration_minutes=round(offline_duration, 2),
+                latitude=vehicle.last_latitude,
+                longitude=vehicle.last_longitude,
+            ))
+
+    # 2. STOP CHECK
+    if speed_val <= STOP_SPEED_THRESHOLD:
+        if not vehicle.stopped_since:
+            vehicle.stopped_since = fixed_at
+    else:
+        if vehicle.stopped_since:
+            duration = (fixed_at - vehicle.stopped_since).total_seconds() / 60.0
+            if duration >= 1: # Minimum 1 minute stop
+                events.append(VehicleEvent(
+                    vehicle=vehicle,
+                    event_type='STOP',
+                    start_time=vehicle.stopped_since,
+                    end_time=fixed_at,
+                    duration_minutes=round(duration, 2),
+                    latitude=vehicle.last_latitude,
+                    longitude=vehicle.last_longitude,
+                ))
+        vehicle.stopped_since = None
+
+    vehicle.last_gps_sync = fixed_at
+    if vehicle.device_status != 'ONLINE':
+        vehicle.device_status = 'ONLINE'
+        vehicle.device_status_changed_at = fixed_at
+
+    if 'totalDistance' in attributes:
+        vehicle.current_odometer = int(attributes['totalDistance'] / 1000)
+
+    # SAVE HISTORY
+    if has_coords:
+        positions.append(VehiclePosition(
+            vehicle=vehicle,
+            latitude=lat_val,
+            longitude=lon_val,
+            speed=speed_val,
+            heading=heading_val,
+            ignition=ignition_val,
+            timestamp=fixed_at,
+        ))
+    return True
+
+
+def ingest_positions(fixes):
+    """
+    Apply a batch of Traccar position fixes to vehicle live state.
+
+    Each fix is a Traccar-shaped dict: ``uniqueId``, ``latitude``, ``longitude``,
+    ``speed`` (knots), ``course``, ``attributes`` and ``fixTime`` /
+    ``deviceTime``; each fix is applied at its own time, oldest first, so a
+    micro-batch keeps the real stop/offline timing. Vehicles are loaded with
+    one query and written with one bulk_update; history rows and stop/offline
+    events are bulk-inserted. Fixes for unknown devices are skipped.
+    Returns the vehicles that were updated.
+    """
+    fixes = [fix for fix in fixes if fix.get('uniqueId')]
+    if not fixes:
+        return []
+
+    unique_ids = {str(fix['uniqueId']) for fix in fixes}
+    vehicles = {
+        vehicle.gps_device_id: vehicle
+        for vehicle in Vehicle.objects.filter(gps_device_id__in=unique_ids)
+    }
+    if not vehicles:
+        return []
+
+    thresholds = organization_offline_minutes({vehicle.organization_id for vehicle in vehicles.values()})
+    now = timezone.now()
+    version = next_change_version()
+    events, positions, touched, samples = [], [], {}, []
+
+    timed = sorted(((fix_time(fix, now), fix) for fix in fixes), key=lambda item: item[0])
+    for fixed_at, fix in timed:
+        vehicle = vehicles.get(str(fix['uniqueId']))
+        if vehicle is None:
+            continue
+        offline_threshold = thresholds.get(vehicle.organization_id, DEFAULT_OFFLINE_MINUTES)
+        if not _apply_fix(vehicle, fix, fixed_at, offline_threshold, events, positions):
+            continue
+        vehicle.computed_status = compute_vehicle_status(vehicle, now, offline_threshold)
+        if fix.get('latitude') not in (None, '') and fix.get('longitude') not in (None, ''):
+            samples.append((vehicle, vehicle.last_latitude, vehicle.last_longitude, fixed_at))
+        vehicle.last_updated = now
+        vehicle.change_version = version
+        touched[vehicle.pk] = vehicle
+
+    updated = list(touched.values())
+    with transaction.atomic():
+        Vehicle.objects.bulk_update(updated, LIVE_STATE_FIELDS, batch_size=500)
+        if positions:
+            VehiclePosition.objects.bulk_create(positions, batch_size=1000)
+        if events:
+            VehicleEvent.objects.bulk_create(events, batch_size=500)
+        broadcast_vehicle_states(updated)
+
+    if samples and getattr(settings, 'GEOFENCE_ENGINE_ENABLED', False):
+        evaluate_positions(samples, event_time=now)
+
+    for vehicle in updated:
+        if vehicle.stopped_since:
+            stop_minutes = (now - vehicle.stopped_since).total_seconds() / 60
+            notify_vehicle_event(vehicle, 'VEHICLE_STOP', vehicle.stopped_since, stop_minutes)
+
+    return updated
+
+
+def normalize_device_status(raw_status):
+    """
+    Traccar device status ('online', 'offline', 'unknown', ...) as a
+    Vehicle.device_status value.
+    """
+    if not raw_status:
+        return 'UNKNOWN'
+    normalized = raw_status.lower()
+    if normalized == 'online':
+        return 'ONLINE'
+    if normalized == 'offline':
+        return 'OFFLINE'
+    return 'UNKNOWN'
+
+
+def ingest_device_statuses(devices, source='traccar_socket'):
+    """
+    Apply a batch of Traccar device records (``uniqueId``, ``status``,
+    ``lastUpdate``): status changes are bulk-updated and logged to DeviceLog.
+    """
+    by_uid = {str(device['uniqueId']): device for device in devices if device.get('uniqueId')}
+    if not by_uid:
+        return []
+
+    now = timezone.now()
+    version = next_change_version()
+    changed, logs = [], []
+    for vehicle in Vehicle.objects.filter(gps_device_id__in=list(by_uid)):
+        device = by_uid[vehicle.gps_device_id]
+        status = normalize_device_status(device.get('status'))
+        if status == vehicle.device_status:
+            continue
+        event_time = parse_datetime(device.get('lastUpdate') or '') or now
+        vehicle.device_status = status
+        vehicle.device_status_changed_at = event_time
+        vehicle.last_updated = now
+        vehicle.change_version = version
+        changed.append(vehicle)
+        logs.append(DeviceLog(
+            vehicle=vehicle,
+            status=status,
+            event_time=event_time,
+            message=f"Device {vehicle.license_plate} went {status} at {event_time}.",
+            payload={'source': source, 'deviceId': device.get('id'), 'raw_status': device.get('status')},
+        ))
+
+    if changed:
+        refresh_computed_status(changed, now)
+        with transaction.atomic():
+            Vehicle.objects.bulk_update(
+                changed, ['device_status', 'device_status_changed_at', 'computed_status', 'last_updated', 'change_version'],
+            )
+            DeviceLog.objects.bulk_create(logs)
+            broadcast_vehicle_states(changed)
+    return changed
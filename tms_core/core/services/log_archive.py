@@ -0,0 +1,190 @@
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import ActivityLog, DeviceLog, LogArchive
+
+ARCHIVE_BATCH_SIZE = 5000
+DEFAULT_RETENTION_DAYS = {'ACTIVITY': 90, 'DEVICE': 30}
+
+
+def _activity_rows(queryset):
+    return queryset.values(
+        'id', 'created_at', 'organization_id', 'user_id', 'user__username', 'action', 'details', 'ip_address',
+    )
+
+
+def _device_rows(queryset):
+    return queryset.values(
+        'id', 'created_at', 'vehicle__organization_id', 'vehicle_id', 'vehicle__license_plate',
+        'status', 'message', 'event_time', 'payload',
+    )
+
+
+def _activity_record(row):
+    return {
+        'id': row['id'],
+        'created_at': row['created_at'],
+        'organization_id': row['organization_id'],
+        'user_id': row['user_id'],
+        'user_name': row['user__username'],
+        'action': row['action'],
+        'details': row['details'],
+        'ip_address': row['ip_address'],
+    }
+
+
+def _device_record(row):
+    return {
+        'id': row['id'],
+        'created_at': row['created_at'],
+        'organization_id': row['vehicle__organization_id'],
+        'vehicle_id': row['vehicle_id'],
+        'vehicle': row['vehicle__license_plate'],
+        'status': row['status'],
+        'message': row['message'],
+        'event_time': row['event_time'],
+        'payload': row['payload'],
+    }
+
+
+ARCHIVE_SOURCES = {
+    'ACTIVITY': (ActivityLog, _activity_rows, _activity_record),
+    'DEVICE': (DeviceLog, _device_rows, _device_record),
+}
+
+
+def archive_root():
+    return getattr(settings, 'LOG_ARCHIVE_ROOT', os.path.join(settings.BASE_DIR, 'log_archive'))
+
+
+def retention_days(kind):
+    configured = getattr(settings, 'LOG_RETENTION_DAYS', {}) or {}
+    return int(configured.get(kind, DEFAULT_RETENTION_DAYS[kind]))
+
+
+def _write_chunk(kind, organization_id, month, records):
+    relative = os.path.join(
+        kind.lower(),
+        f"org-{organization_id or 'none'}",
+        month.strftime('%Y-%m'),
+        f"{records[0]['id']}-{records[-1]['id']}.jsonl.gz",
+    )
+    full_path = os.path.join(archive_root(), relative)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    tmp_path = f"{full_path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as handle:
+        for record in records:
+            handle.write(json.dumps(record, cls=DjangoJSONEncoder))
+            handle.write('\n')
+    os.replace(tmp_path, full_path)  # readers never see a half-written file
+    return LogArchive(
+        kind=kind,
+        organization_id=organization_id,
+        month=month,
+        path=relative,
+        entry_count=len(records),
+        first_at=records[0]['created_at'],
+        last_at=records[-1]['created_at'],
+    )
+
+
+def archive_batch(kind, cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move up to ``batch_size`` of the oldest rows created before ``cutoff``
+    into archive files, one per organization and month. Rows are read in id
+    order; ids grow with created_at, so the primary key index finds them.
+    Returns the number of rows archived.
+    """
+    model, fetch_rows, to_record = ARCHIVE_SOURCES[kind]
+    queryset = model.objects.filter(created_at__lt=cutoff).order_by('id')
+    records = [to_record(row) for row in fetch_rows(queryset)[:batch_size]]
+    if not records:
+        return 0
+
+    groups = {}
+    for record in records:
+        month = timezone.localtime(record['created_at']).date().replace(day=1)
+        groups.setdefault((record['organization_id'], month), []).append(record)
+
+    archives = [
+        _write_chunk(kind, organization_id, month, group)
+        for (organization_id, month), group in groups.items()
+    ]
+    with transaction.atomic():
+        # Re-archiving the same ids after a crash rewrites the same files.
+        LogArchive.objects.filter(path__in=[archive.path for archive in archives]).delete()
+        LogArchive.objects.bulk_create(archives)
+        model.objects.filter(id__in=[record['id'] for record in records]).delete()
+    return len(records)
+
+
+def archive_old_logs(now=None, batch_size=ARCHIVE_BATCH_SIZE, max_batches=100):
+    """
+    Retention pass over ActivityLog and DeviceLog: everything older than
+    LOG_RETENTION_DAYS moves into compressed archives. Returns per-kind counts.
+    """
+    now = now or timezone.now()
+    result = {}
+    for kind in ARCHIVE_SOURCES:
+        cutoff = now - timedelta(days=retention_days(kind))
+        archived = 0
+        for _ in range(max_batches):
+            moved = archive_batch(kind, cutoff, batch_size)
+            archived += moved
+            if moved < batch_size:
+                break
+        result[kind.lower()] = archived
+    return result
+
+
+def read_archive(archive):
+    """
+    Yield the records stored in one LogArchive file.
+    """
+    with gzip.open(os.path.join(archive_root(), archive.path), 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def search_archives(archives, start=None, end=None, text=None, filters=None, limit=200):
+    """
+    Scan archive files (newest first) for records created within
+    [start, end] whose fields equal ``filters`` and, when given, whose JSON
+    contains ``text`` (case-insensitive). Stops after ``limit`` matches.
+    """
+    text = text.lower() if text else None
+    filters = filters or {}
+    matches = []
+    for archive in archives:
+        if start and archive.last_at < start:
+            continue
+        if end and archive.first_at > end:
+            continue
+        try:
+            records = list(read_archive(archive))
+        except OSError as e:
+            print(f"Error reading log archive {archive.path}: {e}")
+            continue
+        for record in reversed(records):
+            created_at = parse_datetime(record['created_at'])
+            if start and created_at < start:
+                continue
+            if end and created_at > end:
+                continue
+            if any(str(record.get(field)) != str(value) for field, value in filters.items()):
+                continue
+            if text and text not in json.dumps(record).lower():
+                continue
+            matches.append(record)
+            if len(matches) >= limit:
+                return matches
+    return matches
@@ -0,0 +1,51 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Versions outlive the cached pages, so an expired version never resurrects one.
+RESPONSE_TTL_SECONDS = 6 * 60 * 60
+VERSION_TTL_SECONDS = 7 * 24 * 60 * 60
+
+ALL_SCOPE = 'all'  # superusers / unscoped callers see every organization
+
+
+def _version_key(resource, scope):
+    return f"master:version:{resource}:{scope}"
+
+
+def get_master_version(resource, scope):
+    """
+    Version stamp of one resource (customer/route/origin/driver) for an
+    organization. Seeded from the clock so a cache flush never replays an
+    old stamp.
+    """
+    key = _version_key(resource, scope)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, VERSION_TTL_SECONDS)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_master_version(resource, organization_id):
+    """
+    Invalidate the organization's cached pages of ``resource`` (and the
+    unscoped ones) once the current transaction commits.
+    """
+    def _bump():
+        for scope in {organization_id or ALL_SCOPE, ALL_SCOPE}:
+            key = _version_key(resource, scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), VERSION_TTL_SECONDS)
+
+    transaction.on_commit(_bump)
+
+
+def master_response_key(resource, scope, url):
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f"master:response:{resource}:{scope}:{get_master_version(resource, scope)}:{digest}"
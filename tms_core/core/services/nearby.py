@@ -0,0 +1,228 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import Origin, Customer
+from .geofence_engine import haversine_m, METERS_PER_DEGREE_LAT
+
+CELL_DEGREES = 0.01  # ~1.1 km grid cells
+MAX_RING = 100  # beyond ~110 km of empty cells, fall back to a full scan
+MAX_REPLAY = 500  # more pending changes than this -> rebuild instead of replay
+CHANGE_TIMEOUT = 24 * 60 * 60
+
+SEQ_KEY = 'nearby:seq:org:{}'
+CHANGE_KEY = 'nearby:change:org:{}:{}'
+
+
+def _cell(latitude, longitude):
+    return (math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES))
+
+
+def place_key(kind, object_id):
+    return f"{kind}:{object_id}"
+
+
+def _place_for(kind, obj):
+    """
+    (key, payload) for an Origin/Customer; payload is None when it has no point.
+    Rectangle customers without a pin use the rectangle's centre.
+    """
+    latitude, longitude = obj.latitude, obj.longitude
+    if (latitude is None or longitude is None) and kind == 'customer':
+        from .traccar import _normalize_bounds
+        bounds = _normalize_bounds(obj.geofence_bounds)
+        if bounds:
+            latitude = (bounds['north'] + bounds['south']) / 2
+            longitude = (bounds['east'] + bounds['west']) / 2
+    key = place_key(kind, obj.pk)
+    if latitude is None or longitude is None:
+        return key, None
+    return key, {'type': kind, 'id': obj.pk, 'name': obj.name, 'latitude': latitude, 'longitude': longitude}
+
+
+class PlaceIndex:
+    """
+    Grid of an organization's customer and origin points supporting upsert,
+    removal, k-nearest (expanding rings of cells) and within-radius queries.
+    """
+
+    def __init__(self):
+        self.places = {}
+        self.cells = defaultdict(dict)
+
+    def __len__(self):
+        return len(self.places)
+
+    def upsert(self, key, place):
+        self.remove(key)
+        if place is None:
+            return
+        cell = _cell(place['latitude'], place['longitude'])
+        self.places[key] = (cell, place)
+        self.cells[cell][key] = place
+
+    def remove(self, key):
+        entry = self.places.pop(key, None)
+        if entry:
+            bucket = self.cells.get(entry[0])
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.cells[entry[0]]
+
+    def _ring(self, center, ring):
+        row, col = center
+        if ring == 0:
+            yield center
+            return
+        for d_col in range(-ring, ring + 1):
+            yield (row - ring, col + d_col)
+            yield (row + ring, col + d_col)
+        for d_row in range(-ring + 1, ring):
+            yield (row + d_row, col - ring)
+            yield (row + d_row, col + ring)
+
+    @staticmethod
+    def _cell_span_m(latitude):
+        # Smallest side of a cell around this latitude, used to bound ring distances.
+        return CELL_DEGREES * METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01)
+
+    def nearest(self, latitude, longitude, k=5, kinds=None, max_distance_m=None):
+        """
+        Up to ``k`` places ordered by distance, optionally capped at ``max_distance_m``.
+        """
+        if k <= 0 or not self.places:
+            return []
+        center = _cell(latitude, longitude)
+        span = self._cell_span_m(latitude)
+        best = []  # max-heap via negated distance
+
+        for ring in range(MAX_RING + 1):
+            # Nothing in this ring or beyond can be closer than this.
+            floor = max(ring - 1, 0) * span
+            if len(best) >= k and floor > -best[0][0]:
+                break
+            if max_distance_m is not None and floor > max_distance_m:
+                break
+            for cell in self._ring(center, ring):
+                for key, place in self.cells.get(cell, {}).items():
+                    if kinds and place['type'] not in kinds:
+                        continue
+                    self._offer(best, k, key, place, latitude, longitude, max_distance_m)
+        else:
+            # Sparse organization: the rings ran out before proving the answer, scan everything.
+            best = []
+            for key, (_, place) in self.places.items():
+                if kinds and place['type'] not in kinds:
+                    continue
+                self._offer(best, k, key, place, latitude, longitude, max_distance_m)
+
+        return [dict(place, distance_m=round(-neg, 1)) for neg, _, place in sorted(best, key=lambda item: -item[0])]
+
+    @staticmethod
+    def _offer(best, k, key, place, latitude, longitude, max_distance_m):
+        distance = haversine_m(latitude, longitude, place['latitude'], place['longitude'])
+        if max_distance_m is not None and distance > max_distance_m:
+            return
+        item = (-distance, key, place)
+        if len(best) < k:
+            heapq.heappush(best, item)
+        elif distance < -best[0][0]:
+            heapq.heapreplace(best, item)
+
+    def within(self, latitude, longitude, radius_m, kinds=None, limit=None):
+        """
+        Places within ``radius_m`` ordered by distance.
+        """
+        d_lat = radius_m / METERS_PER_DEGREE_LAT
+        d_lon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+        south, west = _cell(latitude - d_lat, longitude - d_lon)
+        north, east = _cell(latitude + d_lat, longitude + d_lon)
+
+        found = []
+        for row in range(south, north + 1):
+            for col in range(west, east + 1):
+                for place in self.cells.get((row, col), {}).values():
+                    if kinds and place['type'] not in kinds:
+                        continue
+                    distance = haversine_m(latitude, longitude, place['latitude'], place['longitude'])
+                    if distance <= radius_m:
+                        found.append((distance, place))
+        found.sort(key=lambda item: item[0])
+        if limit is not None:
+            found = found[:limit]
+        return [dict(place, distance_m=round(distance, 1)) for distance, place in found]
+
+
+def build_place_index(organization_id):
+    index = PlaceIndex()
+    origins = Origin.objects.filter(organization_id=organization_id).only('id', 'name', 'latitude', 'longitude')
+    for origin in origins:
+        index.upsert(*_place_for('origin', origin))
+    customers = Customer.objects.filter(organization_id=organization_id).only(
+        'id', 'name', 'latitude', 'longitude', 'geofence_bounds',
+    )
+    for customer in customers:
+        index.upsert(*_place_for('customer', customer))
+    return index
+
+
+_indexes = {}  # organization_id -> [seq, PlaceIndex]
+_indexes_lock = threading.Lock()
+
+
+def get_place_index(organization_id):
+    """
+    The organization's index, brought up to date by replaying the change log
+    written by record_place_change; rebuilt from the database on first use or
+    when the log has gaps.
+    """
+    seq_key = SEQ_KEY.format(organization_id)
+    with _indexes_lock:
+        current = cache.get(seq_key) or 0
+        entry = _indexes.get(organization_id)
+        if entry and entry[0] == current:
+            return entry[1]
+
+        if entry and 0 < current - entry[0] <= MAX_REPLAY:
+            keys = [CHANGE_KEY.format(organization_id, seq) for seq in range(entry[0] + 1, current + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) == len(keys):
+                for key in keys:
+                    place_id, place = changes[key]
+                    entry[1].upsert(place_id, place)
+                entry[0] = current
+                return entry[1]
+
+        # Read the sequence before loading so changes committed meanwhile are replayed later.
+        index = build_place_index(organization_id)
+        _indexes[organization_id] = [current, index]
+        return index
+
+
+def record_place_change(kind, instance, deleted=False):
+    """
+    Append a customer/origin change to the organization's log once the
+    transaction commits; every process applies it on its next query.
+    """
+    organization_id = instance.organization_id
+    if deleted:
+        change = (place_key(kind, instance.pk), None)
+    else:
+        change = _place_for(kind, instance)
+
+    def _append():
+        seq_key = SEQ_KEY.format(organization_id)
+        cache.add(seq_key, 0, None)
+        try:
+            seq = cache.incr(seq_key)
+        except ValueError:
+            cache.set(seq_key, 1, None)
+            seq = 1
+        cache.set(CHANGE_KEY.format(organization_id, seq), change, CHANGE_TIMEOUT)
+
+    transaction.on_commit(_append)
@@ -0,0 +1,102 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from ..models import Notification
+
+# Counters expire so any drift (bulk updates, cascading deletes) heals itself.
+COUNTER_TTL_SECONDS = 60 * 60
+
+
+def _unread_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def _version_key(user_id):
+    return f"notifications:version:{user_id}"
+
+
+def get_unread_count(user):
+    """
+    Return the user's unread notification count from the counter cache,
+    falling back to a COUNT query (and priming the cache) on a miss.
+    """
+    key = _unread_key(user.id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count, COUNTER_TTL_SECONDS)
+    return count
+
+
+def get_notification_version(user_id):
+    """
+    Per-user version stamp that changes whenever the user's notifications change.
+    Seeded from the clock so a cache flush never replays an old stamp.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, COUNTER_TTL_SECONDS)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_notification_version(user_id):
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), COUNTER_TTL_SECONDS)
+
+
+def record_notification_created(notification):
+    if not notification.is_read:
+        try:
+            cache.incr(_unread_key(notification.user_id))
+        except ValueError:
+            # Not primed yet; the next read computes it from the table.
+            pass
+    bump_notification_version(notification.user_id)
+
+
+def record_notifications_read(user_id, marked_count, all_read=False):
+    key = _unread_key(user_id)
+    if all_read:
+        cache.set(key, 0, COUNTER_TTL_SECONDS)
+    elif marked_count:
+        try:
+            if cache.decr(key, marked_count) < 0:
+                cache.delete(key)
+        except ValueError:
+            pass
+    if marked_count:
+        bump_notification_version(user_id)
+
+
+def build_list_etag(user_id, full_path):
+    """
+    Weak ETag for a user's notification list page. The request path is folded in
+    so different cursors/page sizes never share a validator.
+    """
+    version = get_notification_version(user_id)
+    path_hash = hashlib.md5(full_path.encode('utf-8')).hexdigest()[:12]
+    return f'W/"{user_id}-{version}-{path_hash}"'
+
+
+def _opaque_tag(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Weak comparison of ``etag`` against an If-None-Match header: a
+    comma-separated list of entity tags, or ``*``.
+    """
+    tags = [tag.strip() for tag in (if_none_match or '').split(',') if tag.strip()]
+    if '*' in tags:
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in tags}
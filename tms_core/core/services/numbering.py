@@ -0,0 +1,121 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import DocumentCounter, Trip
+
+SURAT_NUMBER_TAKEN = 'Surat jalan number already taken, please retry.'
+
+
+def _counter(series, period, organization_id):
+    return DocumentCounter.objects.filter(organization_id=organization_id, series=series, period=period)
+
+
+def allocate_numbers(series, period, count=1, organization_id=None, seed=None):
+    """
+    Reserve ``count`` consecutive numbers of a series and return them as a
+    range. The counter row is incremented in place, so concurrent callers
+    queue on its row lock instead of scanning for the last document, and
+    each gets a distinct block. Call inside the transaction that stores
+    the documents: a rollback then returns the numbers too.
+
+    ``seed`` returns the last number already used when the period has no
+    counter row yet (documents numbered before the counter existed).
+    """
+    with transaction.atomic():
+        counter = _counter(series, period, organization_id)
+        if not counter.update(value=F('value') + count):
+            try:
+                with transaction.atomic():
+                    DocumentCounter.objects.create(
+                        organization_id=organization_id,
+                        series=series,
+                        period=period,
+                        value=(seed() if seed else 0) + count,
+                    )
+            except IntegrityError:
+                # Another request created the row first; take the next block from it.
+                counter.update(value=F('value') + count)
+        last = counter.values_list('value', flat=True).get()
+    return range(last - count + 1, last + 1)
+
+
+def peek_number(series, period, organization_id=None, seed=None):
+    """
+    The number allocate_numbers() would hand out next, without reserving it.
+    """
+    value = _counter(series, period, organization_id).values_list('value', flat=True).first()
+    if value is None:
+        value = seed() if seed else 0
+    return value + 1
+
+
+def _last_sequence(numbers, prefix):
+    """
+    Highest numeric suffix among legacy document numbers starting with
+    ``prefix``; only runs once per period, when its counter row is created.
+    """
+    last = 0
+    for number in numbers:
+        suffix = number[len(prefix):]
+        if suffix.isdigit():
+            last = max(last, int(suffix))
+    return last
+
+
+def _surat_series(for_date):
+    prefix = for_date.strftime("SJ-%Y%m%d-")
+    period = for_date.strftime("%Y%m%d")
+
+    def seed():
+        numbers = Trip.objects.filter(surat_jalan_number__startswith=prefix).values_list('surat_jalan_number', flat=True)
+        return _last_sequence(numbers, prefix)
+
+    return prefix, period, seed
+
+
+def generate_surat_numbers(count, for_date=None):
+    """
+    Reserve ``count`` consecutive Surat Jalan numbers.
+    Format: SJ-YYYYMMDD-XXXX
+    """
+    prefix, period, seed = _surat_series(for_date or timezone.localdate())
+    numbers = [f"{prefix}{seq:04d}" for seq in allocate_numbers('SJ', period, count, seed=seed)]
+    # Numbers typed in by hand are not counted; skip past any the counter reached.
+    taken = set(Trip.objects.filter(surat_jalan_number__in=numbers).values_list('surat_jalan_number', flat=True))
+    while taken:
+        numbers = [number for number in numbers if number not in taken]
+        extra = [f"{prefix}{seq:04d}" for seq in allocate_numbers('SJ', period, len(taken))]
+        taken = set(Trip.objects.filter(surat_jalan_number__in=extra).values_list('surat_jalan_number', flat=True))
+        numbers += extra
+    return numbers
+
+
+def generate_surat_number(for_date=None):
+    return generate_surat_numbers(1, for_date)[0]
+
+
+def preview_surat_number(for_date=None):
+    """
+    The next Surat Jalan number for form prefill; does not reserve it.
+    """
+    prefix, period, seed = _surat_series(for_date or timezone.localdate())
+    return f"{prefix}{peek_number('SJ', period, seed=seed):04d}"
+
+
+def generate_invoice_number(for_date=None):
+    """
+    Reserve the next invoice number.
+    Format: INV-YYYY### (e.g., INV-2025001).
+    """
+    from finance.models import Invoice
+
+    invoice_date = for_date or timezone.localdate()
+    prefix = f"INV-{invoice_date.year}"
+
+    def seed():
+        numbers = Invoice.objects.filter(invoice_number__startswith=prefix).values_list('invoice_number', flat=True)
+        return _last_sequence(numbers, prefix)
+
+    seq = allocate_numbers('INV', str(invoice_date.year), seed=seed)[0]
+    return f"{prefix}{seq:03d}"
@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import TraccarOutbox, Vehicle, Origin, Customer
+
+MAX_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 60 * 60
+CLAIM_LEASE = timedelta(minutes=10)  # PROCESSING rows older than this were abandoned by a dead worker
+DONE_RETENTION = timedelta(days=7)
+FAILED_STATUSES = ('failed', 'error')
+
+
+def enqueue_traccar_sync(kind, object_id):
+    """
+    Record a pending Traccar side effect in the caller's transaction and nudge
+    the drain worker once it commits. Skips the insert when an identical entry
+    is already waiting, so repeated saves coalesce at write time as well.
+    """
+    already_pending = TraccarOutbox.objects.filter(kind=kind, object_id=object_id, status='PENDING').exists()
+    if not already_pending:
+        TraccarOutbox.objects.create(kind=kind, object_id=object_id)
+    transaction.on_commit(_kick_drain)
+
+
+def _kick_drain():
+    from ..tasks import drain_traccar_outbox_task
+    try:
+        drain_traccar_outbox_task.delay()
+    except Exception as exc:
+        # The periodic drain picks the rows up if the broker is unavailable.
+        print(f"Could not queue outbox drain: {exc}")
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BASE_BACKOFF_SECONDS * (2 ** (attempts - 1)), MAX_BACKOFF_SECONDS))
+
+
+def _handle_vehicle_device(object_id):
+    from .traccar import push_vehicle_to_traccar
+    vehicle = Vehicle.objects.filter(pk=object_id).first()
+    if vehicle is None:
+        return {'status': 'skipped', 'reason': 'deleted'}
+    return push_vehicle_to_traccar(vehicle)
+
+
+def _handle_origin_geofence(object_id):
+    from .traccar import sync_origin_geofence
+    origin = Origin.objects.filter(pk=object_id).first()
+    if origin is None:
+        return {'status': 'skipped', 'reason': 'deleted'}
+    return sync_origin_geofence(origin)
+
+
+def _handle_customer_geofence(object_id):
+    from .traccar import sync_customer_geofence
+    customer = Customer.objects.filter(pk=object_id).first()
+    if customer is None:
+        return {'status': 'skipped', 'reason': 'deleted'}
+    return sync_customer_geofence(customer)
+
+
+def _handle_geofence_permissions(object_id):
+    from .traccar import reconcile_geofence_permissions
+    return reconcile_geofence_permissions(object_id)
+
+
+HANDLERS = {
+    'VEHICLE_DEVICE': _handle_vehicle_device,
+    'ORIGIN_GEOFENCE': _handle_origin_geofence,
+    'CUSTOMER_GEOFENCE': _handle_customer_geofence,
+    # Runs after the others in a batch so freshly created devices/geofences are linked.
+    'GEOFENCE_PERMISSIONS': _handle_geofence_permissions,
+}
+
+
+def _claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            TraccarOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        stale = list(
+            TraccarOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='PROCESSING', claimed_at__lt=now - CLAIM_LEASE)
+            .order_by('id')[:batch_size]
+        )
+        rows.extend(stale)
+        if rows:
+            TraccarOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(status='PROCESSING', claimed_at=now)
+    return rows
+
+
+def drain_traccar_outbox(batch_size=200):
+    """
+    Process pending outbox rows. Rows for the same (kind, object) are coalesced
+    into one Traccar sync; failures back off exponentially and are dead-lettered
+    after MAX_ATTEMPTS.
+    """
+    rows = _claim_batch(batch_size)
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.kind, row.object_id), []).append(row)
+
+    kind_order = list(HANDLERS)
+    stats = {'claimed': len(rows), 'synced': 0, 'retried': 0, 'dead': 0}
+
+    for (kind, object_id), group in sorted(groups.items(), key=lambda item: (kind_order.index(item[0][0]), item[0][1])):
+        ids = [row.pk for row in group]
+        attempts = max(row.attempts for row in group) + 1
+        handler = HANDLERS.get(kind)
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown outbox kind {kind}")
+            result = handler(object_id) or {}
+            if result.get('status') in FAILED_STATUSES:
+                raise RuntimeError(result.get('reason') or result.get('status'))
+        except Exception as exc:
+            now = timezone.now()
+            if attempts >= MAX_ATTEMPTS:
+                TraccarOutbox.objects.filter(pk__in=ids).update(
+                    status='DEAD', attempts=attempts, last_error=str(exc)[:2000], processed_at=now,
+                )
+                stats['dead'] += 1
+            else:
+                TraccarOutbox.objects.filter(pk__in=ids).update(
+                    status='PENDING', attempts=attempts, last_error=str(exc)[:2000],
+                    available_at=now + _backoff(attempts), claimed_at=None,
+                )
+                stats['retried'] += 1
+            continue
+
+        TraccarOutbox.objects.filter(pk__in=ids).update(status='DONE', attempts=attempts, processed_at=timezone.now())
+        stats['synced'] += 1
+
+    stats['coalesced'] = len(rows) - len(groups)
+    # Retention counts from completion; available_at only says when a row became due.
+    stats['purged'], _ = TraccarOutbox.objects.filter(
+        status='DONE', processed_at__lt=timezone.now() - DONE_RETENTION,
+    ).delete()
+    return stats
@@ -0,0 +1,93 @@
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from ..models import Organization, Vehicle
+
+DEFAULT_SYNC_MINUTES = 15
+MIN_SYNC_MINUTES = 1
+SYNC_SETTING_KEY = 'traccar_sync_minutes'  # Organization.settings override, e.g. 2 for premium tenants
+DISPATCH_SLACK_SECONDS = 30  # beat ticks drift; treat "almost due" as due
+SHARD_LOCK_TIMEOUT = 10 * 60  # a crashed worker's lock expires after this
+LAST_DISPATCH_TIMEOUT = 24 * 60 * 60
+
+LOCK_KEY = 'traccar-sync:lock:org:{}'
+LAST_DISPATCH_KEY = 'traccar-sync:dispatched:org:{}'
+UNSHARDED = None  # shard id for vehicles outside every active organization
+
+
+def sync_interval_minutes(organization):
+    """
+    Minutes between device syncs for the organization. Defaults to
+    DEFAULT_SYNC_MINUTES; tenants on a faster plan set
+    ``settings['traccar_sync_minutes']``.
+    """
+    raw = (organization.settings or {}).get(SYNC_SETTING_KEY)
+    try:
+        minutes = int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_SYNC_MINUTES
+    return max(minutes, MIN_SYNC_MINUTES)
+
+
+def due_organizations(now=None):
+    """
+    (organization_id, interval_minutes) for every active organization whose
+    shard is due, marking each one as dispatched. One cache round trip reads
+    all last-dispatch stamps. Vehicles of inactive organizations form one
+    extra shard, reported as (UNSHARDED, DEFAULT_SYNC_MINUTES) when it has
+    any tracked vehicle.
+    """
+    now = now or time.time()
+    organizations = list(Organization.objects.filter(is_active=True).only('id', 'settings'))
+    stamps = cache.get_many(
+        [LAST_DISPATCH_KEY.format(org.id) for org in organizations] + [LAST_DISPATCH_KEY.format(UNSHARDED)]
+    )
+
+    def _is_due(shard_id, interval):
+        last = stamps.get(LAST_DISPATCH_KEY.format(shard_id))
+        return last is None or now - last >= interval * 60 - DISPATCH_SLACK_SECONDS
+
+    due = []
+    for organization in organizations:
+        interval = sync_interval_minutes(organization)
+        if _is_due(organization.id, interval):
+            due.append((organization.id, interval))
+
+    if _is_due(UNSHARDED, DEFAULT_SYNC_MINUTES):
+        # Stamped even when empty so the lookup runs once per interval, not every tick.
+        cache.set(LAST_DISPATCH_KEY.format(UNSHARDED), now, LAST_DISPATCH_TIMEOUT)
+        unsharded = (
+            Vehicle.objects.exclude(organization__is_active=True)
+            .exclude(gps_device_id__isnull=True).exclude(gps_device_id__exact='')
+        )
+        if unsharded.exists():
+            due.append((UNSHARDED, DEFAULT_SYNC_MINUTES))
+
+    if due:
+        cache.set_many({LAST_DISPATCH_KEY.format(org_id): now for org_id, _ in due}, LAST_DISPATCH_TIMEOUT)
+    return due
+
+
+@contextmanager
+def cache_lock(key, timeout=SHARD_LOCK_TIMEOUT):
+    """
+    Cross-worker lock on a cache key (atomic add). Yields whether it was
+    acquired; only the holder's token releases it.
+    """
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+def shard_lock(organization_id, timeout=SHARD_LOCK_TIMEOUT):
+    """
+    Lock for one organization's device sync (UNSHARDED for the remainder shard).
+    """
+    return cache_lock(LOCK_KEY.format(organization_id), timeout)
@@ -1,26 +1,16 @@
-import requests
-from requests.auth import HTTPBasicAuth
+import time
+from collections import defaultdict
 from django.conf import settings
+from django.db import transaction
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
-from ..models import Vehicle, VehiclePosition, DeviceLog, Origin, Customer
+from ..models import Vehicle, VehiclePosition, DeviceLog, Origin, Customer, next_change_version
 from .alerts import notify_vehicle_event, STOP_SPEED_THRESHOLD
-
-def _normalize_status(raw_status):
-    if not raw_status:
-        return 'UNKNOWN'
-    normalized = raw_status.lower()
-    if normalized == 'online':
-        return 'ONLINE'
-    if normalized == 'offline':
-        return 'OFFLINE'
-    return 'UNKNOWN'
-
-def _get_traccar_auth():
-    return HTTPBasicAuth(settings.TRACCAR_USER, settings.TRACCAR_PASSWORD)
-
-def _get_traccar_base_url():
-    return settings.TRACCAR_URL.rstrip('/')
+from .fleet import broadcast_vehicle_states, refresh_computed_status
+from .ingest import normalize_device_status
+from .traccar_client import get_traccar_client
+from .geofence_engine import evaluate_positions
+from .master_cache import bump_master_version
 
 def _build_geofence_area(latitude, longitude, radius):
     return f"CIRCLE({latitude} {longitude}, {radius})"
@@ -67,56 +57,146 @@ def _build_rectangle_area(bounds):
     ]
     return _build_polygon_area(points)
 
-def _get_org_vehicle_unique_ids(organization_id):
-    if not organization_id:
-        return []
-    return list(
-        Vehicle.objects.filter(organization_id=organization_id)
-        .exclude(gps_device_id__isnull=True)
-        .exclude(gps_device_id__exact='')
-        .values_list('gps_device_id', flat=True)
+def _desired_geofence_links(device_ids_by_uid, organization_id=None):
+    """
+    Every vehicle's device is linked to every Origin/Customer geofence of its organization.
+    Returns (desired (deviceId, geofenceId) pairs, geofence ids in scope).
+    """
+    vehicles = Vehicle.objects.exclude(gps_device_id__isnull=True).exclude(gps_device_id__exact='')
+    origins = Origin.objects.filter(traccar_id__isnull=False)
+    customers = Customer.objects.filter(traccar_id__isnull=False)
+    if organization_id:
+        vehicles = vehicles.filter(organization_id=organization_id)
+        origins = origins.filter(organization_id=organization_id)
+        customers = customers.filter(organization_id=organization_id)
+
+    devices_by_org = defaultdict(set)
+    for org_id, unique_id in vehicles.values_list('organization_id', 'gps_device_id'):
+        device_id = device_ids_by_uid.get(str(unique_id))
+        if device_id is not None:
+            devices_by_org[org_id].add(device_id)
+
+    geofences_by_org = defaultdict(set)
+    for queryset in (origins, customers):
+        for org_id, geofence_id in queryset.values_list('organization_id', 'traccar_id'):
+            geofences_by_org[org_id].add(geofence_id)
+
+    desired = set()
+    for org_id, geofence_ids in geofences_by_org.items():
+        for device_id in devices_by_org.get(org_id, ()):
+            desired.update((device_id, geofence_id) for geofence_id in geofence_ids)
+
+    scoped_geofences = set().union(*geofences_by_org.values()) if geofences_by_org else set()
+    return desired, scoped_geofences
+
+def reconcile_geofence_permissions(organization_id=None):
+    """
+    Make Traccar's device<->geofence permissions match the database.
+
+    Fetches devices and geofences once and each known device's linked geofences
+    (GET /api/geofences?deviceId=, fanned out on the client pool; Traccar has no
+    permission listing), computes the desired link set from Vehicles and
+    Origin/Customer geofences, then adds missing links and removes extra ones.
+    Only links between known devices and geofences owned by the scoped
+    organization(s) are ever removed. Any failed read aborts the run, since a
+    partial view of the links would add or remove the wrong ones.
+    """
+    client = get_traccar_client()
+    started = time.perf_counter()
+    try:
+        devices = client.get_json('/api/devices')
+        traccar_geofences = client.get_json('/api/geofences')
+    except Exception as exc:
+        print(f"Traccar geofence reconcile error: {exc}")
+        return {'status': 'error', 'reason': str(exc)}
+    if devices is None or traccar_geofences is None:
+        return {'status': 'error', 'reason': 'traccar_read_failed'}
+
+    device_ids_by_uid = {
+        str(device.get('uniqueId')): device.get('id')
+        for device in devices if device.get('uniqueId') and device.get('id') is not None
+    }
+    live_geofence_ids = {geofence.get('id') for geofence in traccar_geofences}
+
+    desired, scoped_geofences = _desired_geofence_links(device_ids_by_uid, organization_id)
+    # Geofences deleted on the Traccar side cannot be linked; the geofence sync recreates them.
+    desired = {pair for pair in desired if pair[1] in live_geofence_ids}
+
+    # Devices Traccar has but no Vehicle references are left alone.
+    vehicle_uids = set(
+        Vehicle.objects.filter(gps_device_id__in=list(device_ids_by_uid)).values_list('gps_device_id', flat=True)
     )
+    known_device_ids = {device_ids_by_uid[uid] for uid in vehicle_uids}
+
+    def _linked_geofences(device_id):
+        resp = client.get('/api/geofences', params={'deviceId': device_id})
+        if resp.status_code != 200:
+            raise ConnectionError(f"GET /api/geofences?deviceId={device_id} failed: {resp.status_code}")
+        return [(device_id, geofence.get('id')) for geofence in resp.json() if geofence.get('id') is not None]
+
+    existing = set()
+    read_failures = []
+    for result in client.map(_linked_geofences, sorted(known_device_ids)):
+        if isinstance(result, Exception):
+            read_failures.append(result)
+        else:
+            existing.update(result)
+    if read_failures:
+        print(f"Traccar geofence reconcile error: {len(read_failures)} link read(s) failed: {read_failures[0]}")
+        return {'status': 'error', 'reason': str(read_failures[0]), 'failed_reads': len(read_failures)}
+
+    managed_existing = {
+        pair for pair in existing
+        if pair[0] in known_device_ids and pair[1] in scoped_geofences
+    }
 
-def _fetch_traccar_devices(auth, base_url):
-    devices_res = requests.get(f"{base_url}/api/devices", auth=auth, timeout=10)
-    if devices_res.status_code != 200:
-        print(f"Traccar geofence permissions failed: devices {devices_res.status_code}")
-        return []
-    return devices_res.json() or []
+    to_add = sorted(desired - existing)
+    to_remove = sorted(managed_existing - desired)
 
-def _link_geofence_to_devices(geofence_id, auth, base_url, vehicle_unique_ids=None):
-    try:
-        devices = _fetch_traccar_devices(auth, base_url)
-        if vehicle_unique_ids is not None:
-            allowed_unique_ids = {str(uid) for uid in vehicle_unique_ids if uid}
-            devices = [device for device in devices if str(device.get('uniqueId')) in allowed_unique_ids]
-
-        existing_device_ids = set()
-        perm_res = requests.get(
-            f"{base_url}/api/permissions?geofenceId={geofence_id}",
-            auth=auth,
-            timeout=10
+    def _link(pair):
+        return client.post('/api/permissions', json={'deviceId': pair[0], 'geofenceId': pair[1]})
+
+    def _unlink(pair):
+        return client.delete('/api/permissions', json={'deviceId': pair[0], 'geofenceId': pair[1]})
+
+    def _failures(results):
+        return sum(
+            1 for res in results
+            if isinstance(res, Exception) or res.status_code not in (200, 201, 204)
         )
-        if perm_res.status_code == 200:
-            existing_device_ids = {
-                perm.get('deviceId') for perm in (perm_res.json() or []) if perm.get('deviceId') is not None
-            }
 
-        for device in devices:
-            device_id = device.get('id')
-            if device_id is None or device_id in existing_device_ids:
-                continue
-            payload = {'deviceId': device_id, 'geofenceId': geofence_id}
-            requests.post(f"{base_url}/api/permissions", json=payload, auth=auth, timeout=10)
-    except Exception as exc:
-        print(f"Traccar geofence permission error: {exc}")
+    add_failures = _failures(client.map(_link, to_add))
+    remove_failures = _failures(client.map(_unlink, to_remove))
+
+    return {
+        'status': 'success' if not (add_failures or remove_failures) else 'partial',
+        'organization_id': organization_id,
+        'devices': len(known_device_ids),
+        'geofences': len(scoped_geofences),
+        'desired': len(desired),
+        'added': len(to_add) - add_failures,
+        'removed': len(to_remove) - remove_failures,
+        'failed': add_failures + remove_failures,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+def schedule_geofence_reconcile(organization_id):
+    """
+    Queue a background permission reconcile for the organization through the
+    outbox, so bursts of saves collapse into a single reconcile.
+    """
+    if not organization_id:
+        return {'status': 'skipped', 'reason': 'no_organization'}
+
+    from .outbox import enqueue_traccar_sync
+    enqueue_traccar_sync('GEOFENCE_PERMISSIONS', organization_id)
+    return {'status': 'queued', 'organization_id': organization_id}
 
 def sync_origin_geofence(origin):
     if origin.latitude is None or origin.longitude is None:
         return {'status': 'skipped', 'reason': 'missing_coords'}
 
-    auth = _get_traccar_auth()
-    base_url = _get_traccar_base_url()
+    client = get_traccar_client()
     radius = origin.radius or 200
     payload = {
         'name': origin.name,
@@ -129,35 +209,25 @@ def sync_origin_geofence(origin):
     try:
         if geofence_id:
             update_payload = {**payload, 'id': geofence_id}
-            resp = requests.put(
-                f"{base_url}/api/geofences/{geofence_id}",
-                json=update_payload,
-                auth=auth,
-                timeout=10
-            )
+            resp = client.put(f"/api/geofences/{geofence_id}", json=update_payload)
             if resp.status_code == 404:
                 geofence_id = None
             elif resp.status_code not in (200, 204):
                 return {'status': 'failed', 'reason': f'update_failed_{resp.status_code}'}
 
         if not geofence_id:
-            resp = requests.post(
-                f"{base_url}/api/geofences",
-                json=payload,
-                auth=auth,
-                timeout=10
-            )
+            resp = client.post('/api/geofences', json=payload)
             if resp.status_code not in (200, 201):
                 return {'status': 'failed', 'reason': f'create_failed_{resp.status_code}'}
             data = resp.json() or {}
             geofence_id = data.get('id')
             if geofence_id and geofence_id != origin.traccar_id:
                 Origin.objects.filter(pk=origin.pk).update(traccar_id=geofence_id)
+                bump_master_version('origin', origin.organization_id)
                 origin.traccar_id = geofence_id
 
         if geofence_id:
-            vehicle_unique_ids = _get_org_vehicle_unique_ids(origin.organization_id)
-            _link_geofence_to_devices(geofence_id, auth, base_url, vehicle_unique_ids)
+            schedule_geofence_reconcile(origin.organization_id)
 
         return {'status': 'success', 'geofence_id': geofence_id}
     except Exception as exc:
@@ -165,8 +235,7 @@ def sync_origin_geofence(origin):
         return {'status': 'error', 'reason': str(exc)}
 
 def sync_customer_geofence(customer):
-    auth = _get_traccar_auth()
-    base_url = _get_traccar_base_url()
+    client = get_traccar_client()
     geofence_type = (customer.geofence_type or 'CIRCLE').upper()
     area = None
 
@@ -191,92 +260,192 @@ def sync_customer_geofence(customer):
     try:
         if geofence_id:
             update_payload = {**payload, 'id': geofence_id}
-            resp = requests.put(
-                f"{base_url}/api/geofences/{geofence_id}",
-                json=update_payload,
-                auth=auth,
-                timeout=10
-            )
+            resp = client.put(f"/api/geofences/{geofence_id}", json=update_payload)
             if resp.status_code == 404:
                 geofence_id = None
             elif resp.status_code not in (200, 204):
                 return {'status': 'failed', 'reason': f'update_failed_{resp.status_code}'}
 
         if not geofence_id:
-            resp = requests.post(
-                f"{base_url}/api/geofences",
-                json=payload,
-                auth=auth,
-                timeout=10
-            )
+            resp = client.post('/api/geofences', json=payload)
             if resp.status_code not in (200, 201):
                 return {'status': 'failed', 'reason': f'create_failed_{resp.status_code}'}
             data = resp.json() or {}
             geofence_id = data.get('id')
             if geofence_id and geofence_id != customer.traccar_id:
                 Customer.objects.filter(pk=customer.pk).update(traccar_id=geofence_id)
+                bump_master_version('customer', customer.organization_id)
                 customer.traccar_id = geofence_id
 
         if geofence_id:
-            vehicle_unique_ids = _get_org_vehicle_unique_ids(customer.organization_id)
-            _link_geofence_to_devices(geofence_id, auth, base_url, vehicle_unique_ids)
+            schedule_geofence_reconcile(customer.organization_id)
 
         return {'status': 'success', 'geofence_id': geofence_id}
     except Exception as exc:
         print(f"Traccar customer geofence sync error: {exc}")
         return {'status': 'error', 'reason': str(exc)}
 
+def push_vehicle_to_traccar(vehicle):
+    """
+    Create or update the Traccar device for a vehicle, then queue a permission
+    reconcile so the device joins its organization's geofences.
+    """
+    if not vehicle.gps_device_id:
+        return {'status': 'skipped', 'reason': 'no_device_id'}
+
+    client = get_traccar_client()
+    device_data = {
+        "name": vehicle.license_plate,
+        "uniqueId": vehicle.gps_device_id,
+        # 'category': 'truck' # Optional
+    }
+
+    try:
+        # Check if device exists first (to decide: Create or Update?)
+        response = client.get('/api/devices', params={'uniqueId': vehicle.gps_device_id})
+        if response.status_code == 200 and len(response.json()) > 0:
+            traccar_id = response.json()[0]['id']
+            device_data['id'] = traccar_id
+            resp = client.put(f"/api/devices/{traccar_id}", json=device_data)
+            action = 'updated'
+        else:
+            resp = client.post('/api/devices', json=device_data)
+            action = 'created'
+        if resp.status_code not in (200, 201, 204):
+            return {'status': 'failed', 'reason': f'{action}_failed_{resp.status_code}'}
+    except Exception as exc:
+        print(f"Error syncing to Traccar: {exc}")
+        return {'status': 'error', 'reason': str(exc)}
+
+    sync_vehicle_geofence_permissions(vehicle)
+    return {'status': 'success', 'action': action}
+
 def sync_vehicle_geofence_permissions(vehicle):
     if not vehicle.organization_id or not vehicle.gps_device_id:
         return {'status': 'skipped', 'reason': 'missing_vehicle_data'}
+    return schedule_geofence_reconcile(vehicle.organization_id)
 
-    geofence_ids = set(
-        Origin.objects.filter(organization_id=vehicle.organization_id, traccar_id__isnull=False)
-        .values_list('traccar_id', flat=True)
-    )
-    geofence_ids.update(
-        Customer.objects.filter(organization_id=vehicle.organization_id, traccar_id__isnull=False)
-        .values_list('traccar_id', flat=True)
-    )
+SYNC_FIELDS = [
+    'device_status', 'device_status_changed_at', 'last_gps_sync',
+    'last_latitude', 'last_longitude', 'last_heading', 'last_speed', 'last_ignition',
+    'current_odometer', 'stopped_since', 'computed_status', 'last_updated', 'change_version',
+]
+
+DEVICE_QUERY_CHUNK = 200  # ids per scoped devices/positions request, keeps URLs short
+
+def _chunks(items, size):
+    items = list(items)
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
 
-    if not geofence_ids:
-        return {'status': 'skipped', 'reason': 'no_geofences'}
+def _fetch_latest_positions(client, position_ids=None):
+    """
+    Latest positions keyed by position id: one request for every device, or
+    chunked ``?id=`` requests when only some positions are needed.
+    """
+    if position_ids is None:
+        positions = client.get_json('/api/positions', default=[]) or []
+    else:
+        positions = []
+        for chunk in _chunks(sorted(position_ids), DEVICE_QUERY_CHUNK):
+            positions.extend(client.get_json('/api/positions', default=[], params={'id': chunk}) or [])
+    return {pos.get('id'): pos for pos in positions if pos.get('id') is not None}
 
-    auth = _get_traccar_auth()
-    base_url = _get_traccar_base_url()
-    for geofence_id in geofence_ids:
-        _link_geofence_to_devices(geofence_id, auth, base_url, [vehicle.gps_device_id])
+def _fetch_devices(client, unique_ids=None):
+    """
+    All devices, or only those with the given uniqueIds (chunked). Returns None
+    when Traccar answers with an error.
+    """
+    if unique_ids is None:
+        response = client.get('/api/devices')
+        if response.status_code != 200:
+            print(f"Traccar Sync Failed: {response.status_code}")
+            return None
+        return response.json() or []
 
-    return {'status': 'success', 'geofences': len(geofence_ids)}
+    devices = []
+    for chunk in _chunks(sorted(unique_ids), DEVICE_QUERY_CHUNK):
+        response = client.get('/api/devices', params={'uniqueId': chunk})
+        if response.status_code != 200:
+            print(f"Traccar Sync Failed: {response.status_code}")
+            return None
+        devices.extend(response.json() or [])
+    return devices
 
-def sync_devices_from_traccar():
+def sync_devices_from_traccar(organization_id=None, unsharded=False):
     """
     Queries Traccar API for all devices and updates local Vehicle records
     if Traccar has newer data than what we have locally.
+
+    Runs as a bulk pipeline: one devices call, one positions call, one vehicle
+    lookup, one bulk_update and one DeviceLog bulk_create. Per-phase timings
+    (milliseconds) are reported under 'timings'.
+
+    With ``organization_id`` only that organization's vehicles are synced and
+    Traccar is asked for just their devices and positions, so per-tenant
+    shards stay proportional to the tenant's fleet. With ``unsharded`` the
+    same scoped pass covers the vehicles no organization shard owns (those of
+    inactive organizations), so the sharded beat still reaches every vehicle.
     """
-    url = f"{settings.TRACCAR_URL}/api/devices"
-    auth = HTTPBasicAuth(settings.TRACCAR_USER, settings.TRACCAR_PASSWORD)
-    
+    client = get_traccar_client()
+    timings = {}
+
+    def _mark(phase, started):
+        timings[phase] = round((time.perf_counter() - started) * 1000, 1)
+        return time.perf_counter()
+
     try:
-        response = requests.get(url, auth=auth, timeout=5)
-        if response.status_code != 200:
-            print(f"Traccar Sync Failed: {response.status_code}")
-            return {'status': 'failed', 'reason': 'api_error'}
-            
-        traccar_devices = response.json()
-        updated_count = 0
-        
+        started = time.perf_counter()
+        if organization_id is None and not unsharded:
+            traccar_devices = _fetch_devices(client)
+            if traccar_devices is None:
+                return {'status': 'failed', 'reason': 'api_error'}
+            started = _mark('fetch_devices', started)
+
+            positions = _fetch_latest_positions(client)
+            started = _mark('fetch_positions', started)
+
+            unique_ids = {str(dev.get('uniqueId')) for dev in traccar_devices if dev.get('uniqueId')}
+            vehicles_by_uid = {
+                vehicle.gps_device_id: vehicle
+                for vehicle in Vehicle.objects.filter(gps_device_id__in=unique_ids)
+            }
+            started = _mark('load_vehicles', started)
+        else:
+            scoped = (
+                Vehicle.objects.exclude(organization__is_active=True) if unsharded
+                else Vehicle.objects.filter(organization_id=organization_id)
+            )
+            vehicles_by_uid = {
+                vehicle.gps_device_id: vehicle
+                for vehicle in scoped.exclude(gps_device_id__isnull=True).exclude(gps_device_id__exact='')
+            }
+            started = _mark('load_vehicles', started)
+
+            traccar_devices = _fetch_devices(client, vehicles_by_uid) if vehicles_by_uid else []
+            if traccar_devices is None:
+                return {'status': 'failed', 'reason': 'api_error', 'organization_id': organization_id}
+            started = _mark('fetch_devices', started)
+
+            position_ids = {dev.get('positionId') for dev in traccar_devices if dev.get('positionId')}
+            positions = _fetch_latest_positions(client, position_ids) if position_ids else {}
+            started = _mark('fetch_positions', started)
+
+        now = timezone.now()
+        version = next_change_version()
+        updated_vehicles = []
+        device_logs = []
+
         for t_dev in traccar_devices:
             unique_id = t_dev.get('uniqueId')
             status = t_dev.get('status')
             last_update_str = t_dev.get('lastUpdate')
-            
+
             if not unique_id or not last_update_str:
                 continue
-                
-            try:
-                vehicle = Vehicle.objects.get(gps_device_id=unique_id)
-            except Vehicle.DoesNotExist:
+
+            vehicle = vehicles_by_uid.get(str(unique_id))
+            if vehicle is None:
                 continue
 
             # Parse Traccar time (ISO 8601)
@@ -284,87 +453,85 @@ def sync_devices_from_traccar():
             if not traccar_time:
                 continue
 
-            normalized_status = _normalize_status(status)
+            normalized_status = normalize_device_status(status)
             status_changed = False
             if normalized_status != vehicle.device_status:
                 vehicle.device_status = normalized_status
-                vehicle.device_status_changed_at = traccar_time or timezone.now()
-                DeviceLog.objects.create(
+                vehicle.device_status_changed_at = traccar_time or now
+                device_logs.append(DeviceLog(
                     vehicle=vehicle,
                     status=normalized_status,
-                    event_time=traccar_time or timezone.now(),
+                    event_time=traccar_time or now,
                     message=f"[SYNC] Device {vehicle.license_plate} now {normalized_status} (Traccar).",
                     payload={'source': 'celery_sync', 'deviceId': t_dev.get('id'), 'raw_status': status},
-                )
+                ))
                 status_changed = True
 
-            position_changed = False
             time_updated = False
             if not vehicle.last_gps_sync or traccar_time > vehicle.last_gps_sync:
                 vehicle.last_gps_sync = traccar_time
                 time_updated = True
-                position_changed = _sync_position(vehicle, t_dev.get('positionId'), auth)
-            
-            if position_changed or status_changed or time_updated:
-                vehicle.save()
-                updated_count += 1
-                
-        return {'status': 'success', 'updated': updated_count}
+                position = positions.get(t_dev.get('positionId'))
+                if position:
+                    _apply_position(vehicle, position, now)
+
+            if status_changed or time_updated:
+                vehicle.last_updated = now
+                vehicle.change_version = version
+                updated_vehicles.append(vehicle)
+        refresh_computed_status(updated_vehicles, now)
+        started = _mark('compute', started)
+
+        with transaction.atomic():
+            if updated_vehicles:
+                Vehicle.objects.bulk_update(updated_vehicles, SYNC_FIELDS, batch_size=500)
+            if device_logs:
+                DeviceLog.objects.bulk_create(device_logs, batch_size=500)
+            broadcast_vehicle_states(updated_vehicles)
+        started = _mark('write', started)
+
+        if updated_vehicles and getattr(settings, 'GEOFENCE_ENGINE_ENABLED', False):
+            evaluate_positions(
+                [(vehicle, vehicle.last_latitude, vehicle.last_longitude) for vehicle in updated_vehicles],
+                event_time=now,
+            )
+            _mark('geofences', started)
+
+        return {
+            'status': 'success',
+            'organization_id': organization_id,
+            'devices': len(traccar_devices),
+            'updated': len(updated_vehicles),
+            'device_logs': len(device_logs),
+            'timings': timings,
+        }
 
     except Exception as e:
         print(f"Traccar Sync Error: {e}")
         return {'status': 'error', 'reason': str(e)}
 
-def _sync_position(vehicle, position_id, auth):
-    if not position_id:
-        return False
-        
-    url = f"{settings.TRACCAR_URL}/api/positions?id={position_id}"
-    try:
-        resp = requests.get(url, auth=auth, timeout=5)
-        if resp.status_code == 200:
-            positions = resp.json()
-            if positions:
-                pos = positions[0]
-                changed = False
-                # Update Vehicle
-                if 'latitude' in pos:
-                    vehicle.last_latitude = pos.get('latitude', vehicle.last_latitude)
-                    changed = True
-                if 'longitude' in pos:
-                    vehicle.last_longitude = pos.get('longitude', vehicle.last_longitude)
-                    changed = True
-                if 'course' in pos:
-                    vehicle.last_heading = pos.get('course', vehicle.last_heading)
-                    changed = True
-                speed_knots = pos.get('speed', 0)
-                vehicle.last_speed = speed_knots * 1.852 # Convert to km/h
-                changed = True
-                
-                # Handle Attributes (Ignition, etc)
-                attrs = pos.get('attributes', {})
-                vehicle.last_ignition = attrs.get('ignition', vehicle.last_ignition)
-                changed = True
-                
-                if 'totalDistance' in attrs:
-                    vehicle.current_odometer = int(attrs['totalDistance'] / 1000)
-                    changed = True
-                
-                # Handle Stop Logic
-                now = timezone.now()
-                if vehicle.last_speed <= STOP_SPEED_THRESHOLD:
-                    if not vehicle.stopped_since:
-                        vehicle.stopped_since = now # Approximate to now or pos time
-                        changed = True
-                else:
-                    vehicle.stopped_since = None
-                    changed = True
-                    
-                # Create History Record (optional, maybe too noisy for sync?)
-                # VehiclePosition.objects.create(...) 
-                return changed
-        return False
-                
-    except Exception as e:
-        print(f"Pos Sync Error: {e}")
-        return False
+def _apply_position(vehicle, pos, now):
+    """
+    Copy a Traccar position onto the vehicle's live state (in memory only).
+    """
+    if 'latitude' in pos:
+        vehicle.last_latitude = pos.get('latitude', vehicle.last_latitude)
+    if 'longitude' in pos:
+        vehicle.last_longitude = pos.get('longitude', vehicle.last_longitude)
+    if 'course' in pos:
+        vehicle.last_heading = pos.get('course', vehicle.last_heading)
+    speed_knots = pos.get('speed', 0) or 0
+    vehicle.last_speed = speed_knots * 1.852 # Convert to km/h
+
+    # Handle Attributes (Ignition, etc)
+    attrs = pos.get('attributes', {}) or {}
+    vehicle.last_ignition = attrs.get('ignition', vehicle.last_ignition)
+    if 'totalDistance' in attrs:
+        vehicle.current_odometer = int(attrs['totalDistance'] / 1000)
+
+    # Handle Stop Logic
+    if vehicle.last_speed <= STOP_SPEED_THRESHOLD:
+        if not vehicle.stopped_since:
+            vehicle.stopped_since = now # Approximate to now or pos time
+    else:
+        vehicle.stopped_since = None
@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 20
+DEFAULT_MAX_WORKERS = 8
+
+
+class TraccarClient:
+    """
+    Thin wrapper around the Traccar REST API.
+
+    Keeps one pooled keep-alive ``requests.Session`` per process, retries
+    idempotent calls (and connection failures) with exponential backoff, applies
+    the same timeout to every call and owns a bounded thread pool for fan-out
+    work such as granting many permissions at once.
+    """
+
+    def __init__(self, base_url=None, user=None, password=None, *, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        self.base_url = (base_url or settings.TRACCAR_URL).rstrip('/')
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(user or settings.TRACCAR_USER, password or settings.TRACCAR_PASSWORD)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def get_json(self, path, default=None, **kwargs):
+        """
+        GET and decode JSON; returns ``default`` on a non-200 response.
+        """
+        resp = self.get(path, **kwargs)
+        if resp.status_code != 200:
+            print(f"Traccar GET {path} failed: {resp.status_code}")
+            return default
+        return resp.json()
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='traccar')
+            return self._executor
+
+    def map(self, fn, items):
+        """
+        Run ``fn`` over ``items`` on the bounded pool and return results in order.
+        Exceptions are returned in place of results so one failure does not hide the rest.
+        """
+        def _safe(item):
+            try:
+                return fn(item)
+            except Exception as exc:
+                return exc
+
+        return list(self.executor.map(_safe, items))
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_traccar_client():
+    """
+    Process-wide client so every caller shares one connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TraccarClient()
+        return _client
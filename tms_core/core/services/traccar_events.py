@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Vehicle, Customer, Origin, User, Notification, ActivityLog, VehicleEvent
+from .active_trips import advance_trip_on_geofence
+from .alerts import notify_vehicle_event
+from .fleet import broadcast_vehicle_states, refresh_computed_status
+
+
+def handle_traccar_event(event, device, ip_address=None):
+    """
+    Apply one Traccar event (deviceOnline/deviceOffline/geofenceEnter/geofenceExit)
+    for ``device`` (a dict carrying ``uniqueId``). Shared by the event webhook and
+    the Traccar socket consumer. Returns a status dict.
+    """
+    if not event or not device:
+        return {'status': 'ignored'}
+
+    traccar_id = device.get('uniqueId')
+    event_type = event.get('type')
+    server_time = event.get('eventTime') or event.get('serverTime') # Traccar timestamp
+    event_time = parse_datetime(server_time) if server_time else None
+    if not event_time:
+        event_time = timezone.now()
+
+    if not traccar_id:
+        return {'status': 'no device id'}
+
+    try:
+        vehicle = Vehicle.objects.get(gps_device_id=traccar_id)
+    except Vehicle.DoesNotExist:
+        return {'status': 'unknown vehicle'}
+
+    # Handle OFFLINE
+    if event_type == 'deviceOffline':
+        vehicle.device_status = 'OFFLINE'
+        vehicle.device_status_changed_at = event_time
+        vehicle.computed_status = 'OFFLINE'
+        vehicle.save(update_fields=['device_status', 'device_status_changed_at', 'computed_status'])
+        broadcast_vehicle_states([vehicle])
+        # Create Event Record
+        VehicleEvent.objects.create(
+            vehicle=vehicle,
+            event_type='OFFLINE',
+            start_time=event_time, # Approximate start
+            end_time=event_time, # Placeholder
+            duration_minutes=0, # Unknown yet
+            latitude=vehicle.last_latitude,
+            longitude=vehicle.last_longitude
+        )
+
+        # Log Activity
+        ActivityLog.objects.create(
+            action='VEHICLE_OFFLINE',
+            details={
+                'organization_id': vehicle.organization_id,
+                'vehicle': vehicle.license_plate,
+                'vehicle_id': vehicle.id,
+                'event_time': event_time.isoformat(),
+            },
+            user=None # System
+        )
+
+        # Notify User
+        notify_vehicle_event(vehicle, 'VEHICLE_OFFLINE', timezone.now(), 0)
+
+    # Handle ONLINE
+    elif event_type == 'deviceOnline':
+        vehicle.device_status = 'ONLINE'
+        vehicle.device_status_changed_at = event_time
+        refresh_computed_status([vehicle])
+        vehicle.save(update_fields=['device_status', 'device_status_changed_at', 'computed_status'])
+        broadcast_vehicle_states([vehicle])
+        # Log Activity
+        ActivityLog.objects.create(
+            action='VEHICLE_ONLINE',
+            details={
+                'organization_id': vehicle.organization_id,
+                'vehicle': vehicle.license_plate,
+                'vehicle_id': vehicle.id,
+                'event_time': event_time.isoformat(),
+            },
+            user=None
+        )
+
+        # Close any open OFFLINE events?
+        # (Complex logic omitted for simplicity, but we log the return)
+    # Handle GEOFENCE ENTER/EXIT (Notifications + optional auto-arrival)
+    elif event_type in ['geofenceEnter', 'geofenceExit']:
+        if getattr(settings, 'GEOFENCE_ENGINE_ENABLED', False):
+            # Enter/exit is evaluated locally by the geofence engine.
+            return {'status': 'ignored', 'reason': 'geofence_engine_enabled'}
+
+        geofence_id = event.get('geofenceId')
+        if not geofence_id:
+            return {'status': 'ignored', 'reason': 'no_geofence_id'}
+
+        origin = Origin.objects.filter(traccar_id=geofence_id).first()
+        if origin:
+            fence = {
+                'geofence_id': geofence_id,
+                'geofence_type': 'origin' if origin.is_origin else 'drop',
+                'ref_id': origin.id,
+                'name': origin.name,
+            }
+        else:
+            customer = Customer.objects.filter(traccar_id=geofence_id).first()
+            if not customer:
+                return {'status': 'ignored', 'reason': 'unknown_geofence'}
+            fence = {
+                'geofence_id': geofence_id,
+                'geofence_type': 'customer',
+                'ref_id': customer.id,
+                'name': customer.name,
+            }
+
+        event_key = event.get('id') or int(event_time.timestamp())
+        record_geofence_transition(vehicle, event_type, fence, event_time, event_key, ip_address=ip_address)
+
+    return {'status': 'processed'}
+
+
+def record_geofence_transition(vehicle, event_type, fence, event_time, event_key, ip_address=None):
+    """
+    Notify watchers, log the activity and advance the vehicle's active trip for
+    one geofence enter/exit. ``fence`` describes the geofence: geofence_id,
+    geofence_type ('origin' / 'drop' / 'customer'), ref_id and name.
+    Used for Traccar events and for transitions found by the local engine.
+    """
+    geofence_id = fence['geofence_id']
+    geofence_type = fence['geofence_type']
+    geofence_name = fence['name']
+
+    action_label = 'entered' if event_type == 'geofenceEnter' else 'exited'
+    category = 'GEOFENCE_ENTER' if event_type == 'geofenceEnter' else 'GEOFENCE_EXIT'
+    geofence_label = geofence_type.capitalize()
+    message = f"Vehicle {vehicle.license_plate} {action_label} {geofence_label} geofence {geofence_name}."
+    alert_key = f"{category}:{vehicle.id}:{geofence_id}:{event_key}"
+    watchers = User.objects.filter(
+        organization_id=vehicle.organization_id,
+        role__in=['OWNER', 'ADMIN'],
+    )
+
+    for watcher in watchers:
+        if Notification.objects.filter(user=watcher, alert_key=alert_key).exists():
+            continue
+        Notification.objects.create(
+            user=watcher,
+            message=message,
+            category=category,
+            reference_id=str(geofence_id),
+            alert_key=alert_key,
+        )
+
+    ActivityLog.objects.create(
+        action=category,
+        details={
+            'organization_id': vehicle.organization_id,
+            'vehicle_id': vehicle.id,
+            'vehicle': vehicle.license_plate,
+            'geofence_id': geofence_id,
+            'geofence_ref_id': fence['ref_id'],
+            'geofence_name': geofence_name,
+            'geofence_type': geofence_type,
+            'event_time': event_time.isoformat(),
+        },
+        user=None,
+        ip_address=ip_address
+    )
+
+    advance_trip_on_geofence(vehicle, event_type, fence, event_time, ip_address=ip_address)
@@ -0,0 +1,204 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .ingest import ingest_positions, ingest_device_statuses
+from .traccar_client import get_traccar_client
+from .traccar_events import handle_traccar_event
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_MAX_BACKOFF = 60  # seconds
+
+
+def socket_url(base_url):
+    """
+    http://traccar:8082 -> ws://traccar:8082/api/socket
+    """
+    base_url = base_url.rstrip('/')
+    if base_url.startswith('https://'):
+        return 'wss://' + base_url[len('https://'):] + '/api/socket'
+    if base_url.startswith('http://'):
+        return 'ws://' + base_url[len('http://'):] + '/api/socket'
+    return base_url + '/api/socket'
+
+
+def open_session(client):
+    """
+    Log in to Traccar and return the Cookie header for the socket handshake.
+    The socket only accepts session cookies, not basic auth.
+    """
+    resp = client.session.post(
+        client.url('/api/session'),
+        data={'email': settings.TRACCAR_USER, 'password': settings.TRACCAR_PASSWORD},
+        timeout=client.timeout,
+    )
+    if resp.status_code != 200:
+        raise ConnectionError(f"Traccar session login failed: {resp.status_code}")
+    cookies = resp.cookies.get_dict() or client.session.cookies.get_dict()
+    return '; '.join(f"{name}={value}" for name, value in cookies.items())
+
+
+def _apply_batch(fixes, devices, events):
+    """
+    Runs in the ORM thread. The socket process is long-lived, so drop
+    connections the database has already closed before touching it.
+    """
+    close_old_connections()
+    stats = {'positions': 0, 'devices': 0, 'events': 0, 'errors': 0}
+
+    if devices:
+        try:
+            stats['devices'] = len(ingest_device_statuses(devices))
+        except Exception as exc:
+            stats['errors'] += 1
+            print(f"Traccar socket device batch failed: {exc}")
+
+    if fixes:
+        try:
+            stats['positions'] = len(ingest_positions(fixes))
+        except Exception as exc:
+            stats['errors'] += 1
+            print(f"Traccar socket position batch failed: {exc}")
+
+    for event, device in events:
+        try:
+            handle_traccar_event(event, device)
+            stats['events'] += 1
+        except Exception as exc:
+            stats['errors'] += 1
+            print(f"Traccar socket event failed: {exc}")
+
+    return stats
+
+
+class TraccarSocketIngest:
+    """
+    Keeps one authenticated connection to Traccar's /api/socket and feeds the
+    pushed positions, device statuses and events into the ingest services in
+    micro-batches (every ``flush_interval`` seconds or ``batch_size`` messages),
+    so a fleet reporting every few seconds costs one bulk write per batch
+    instead of one HTTP request and one save per fix. Reconnects with
+    exponential backoff.
+    """
+
+    def __init__(self, client=None, *, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_backoff=DEFAULT_MAX_BACKOFF, url=None):
+        self.client = client or get_traccar_client()
+        self.url = url or socket_url(self.client.base_url)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+
+        self.device_ids = {}  # Traccar device id -> uniqueId
+        self.last_position_ids = {}  # Traccar device id -> newest position id applied
+        self.positions = []
+        self.devices = {}
+        self.events = []
+
+    @property
+    def pending(self):
+        return len(self.positions) + len(self.devices) + len(self.events)
+
+    def refresh_devices(self):
+        devices = self.client.get_json('/api/devices', default=[]) or []
+        for device in devices:
+            if device.get('id') is not None and device.get('uniqueId'):
+                self.device_ids[device['id']] = str(device['uniqueId'])
+        return len(devices)
+
+    def handle_message(self, raw):
+        try:
+            payload = json.loads(raw)
+        except (TypeError, ValueError):
+            print("Traccar socket sent a non-JSON frame")
+            return
+
+        for device in payload.get('devices') or []:
+            if device.get('id') is not None and device.get('uniqueId'):
+                self.device_ids[device['id']] = str(device['uniqueId'])
+                self.devices[str(device['uniqueId'])] = device
+
+        for position in payload.get('positions') or []:
+            device_id = position.get('deviceId')
+            position_id = position.get('id')
+            # Traccar replays the latest position of every device on (re)connect.
+            if position_id is not None and position_id <= self.last_position_ids.get(device_id, -1):
+                continue
+            if position_id is not None:
+                self.last_position_ids[device_id] = position_id
+            self.positions.append(position)
+
+        self.events.extend(payload.get('events') or [])
+
+    async def flush(self):
+        if not self.pending:
+            return None
+
+        positions, devices, events = self.positions, list(self.devices.values()), self.events
+        self.positions, self.devices, self.events = [], {}, []
+
+        unknown = {item.get('deviceId') for item in positions + events} - set(self.device_ids)
+        if unknown:
+            await asyncio.to_thread(self.refresh_devices)
+
+        fixes = [
+            dict(position, uniqueId=self.device_ids[position['deviceId']])
+            for position in positions if position.get('deviceId') in self.device_ids
+        ]
+        device_events = [
+            (event, {'uniqueId': self.device_ids[event['deviceId']]})
+            for event in events if event.get('deviceId') in self.device_ids
+        ]
+        return await sync_to_async(_apply_batch)(fixes, devices, device_events)
+
+    async def consume(self, websocket):
+        loop = asyncio.get_running_loop()
+        flush_at = loop.time() + self.flush_interval
+        while True:
+            timeout = max(0.0, flush_at - loop.time())
+            try:
+                raw = await asyncio.wait_for(websocket.recv(), timeout)
+            except asyncio.TimeoutError:
+                raw = None
+
+            if raw is not None:
+                self.handle_message(raw)
+
+            if self.pending >= self.batch_size or loop.time() >= flush_at:
+                await self.flush()
+                flush_at = loop.time() + self.flush_interval
+
+    async def run(self):
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import WebSocketException
+
+        backoff = 1
+        while True:
+            try:
+                cookie = await asyncio.to_thread(open_session, self.client)
+                await asyncio.to_thread(self.refresh_devices)
+                async with connect(self.url, additional_headers={'Cookie': cookie}) as websocket:
+                    print(f"Connected to Traccar socket {self.url} ({len(self.device_ids)} devices)")
+                    backoff = 1
+                    await self.consume(websocket)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ConnectionError, WebSocketException) as exc:
+                print(f"Traccar socket disconnected: {exc}")
+            except Exception as exc:
+                print(f"Traccar socket error: {exc}")
+            finally:
+                # A failing flush must not end the reconnect loop.
+                try:
+                    await self.flush()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    print(f"Traccar socket flush failed: {exc}")
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,109 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from ..models import Trip, SuratJalanHistory
+from ..serializers import BulkTripSerializer, TripSerializer, active_conflict_message
+from .active_trips import ACTIVE_STATUSES, schedule_active_trip_refresh
+from .audit import buffered_activity, record_activity
+from .numbering import SURAT_NUMBER_TAKEN, generate_surat_numbers
+
+BULK_DISPATCH_LIMIT = 200
+
+
+def _check_conflicts(rows, errors):
+    """
+    The per-trip active vehicle/driver checks for a whole batch: one query
+    against existing active trips, plus rows earlier in the same batch.
+    """
+    vehicle_ids = {data['vehicle'].id for data in rows.values() if data.get('vehicle')}
+    driver_ids = {data['driver'].id for data in rows.values() if data.get('driver')}
+    busy_vehicles, busy_drivers = set(), set()
+    if vehicle_ids or driver_ids:
+        active = Trip.objects.filter(status__in=ACTIVE_STATUSES).filter(
+            Q(vehicle_id__in=vehicle_ids) | Q(driver_id__in=driver_ids)
+        ).values_list('vehicle_id', 'driver_id')
+        for vehicle_id, driver_id in active:
+            busy_vehicles.add(vehicle_id)
+            busy_drivers.add(driver_id)
+
+    numbers = set()
+    for index, data in rows.items():
+        vehicle, driver = data.get('vehicle'), data.get('driver')
+        conflicts = []
+        if vehicle and vehicle.id in busy_vehicles:
+            conflicts.append('vehicle')
+        if driver and driver.id in busy_drivers:
+            conflicts.append('driver')
+        if conflicts:
+            errors[index] = {'non_field_errors': [active_conflict_message(conflicts)]}
+            continue
+
+        number = data.get('surat_jalan_number')
+        if number:
+            if number in numbers:
+                errors[index] = {'surat_jalan_number': ['Duplicate surat jalan number in this batch.']}
+                continue
+            numbers.add(number)
+
+        if data.get('status', 'PLANNED') in ACTIVE_STATUSES:
+            if vehicle:
+                busy_vehicles.add(vehicle.id)
+            if driver:
+                busy_drivers.add(driver.id)
+
+
+def dispatch_trips(rows, context=None, user=None, ip_address=None):
+    """
+    Create a batch of trips in one transaction. Rows are validated like a
+    single POST /api/trips/, except that the active-trip conflict checks run
+    set-based, trips without a surat jalan number get a consecutive block,
+    and trips, customer links and surat jalan histories are bulk inserted.
+
+    All or nothing: returns (trips, errors), where errors is aligned with
+    ``rows`` ({} for a valid row) and trips is empty when any row failed.
+    """
+    context = dict(context or {}, preloaded_relations=BulkTripSerializer.preload_relations(rows))
+    serializers = [BulkTripSerializer(data=row, context=context) for row in rows]
+    errors = [{} if serializer.is_valid() else dict(serializer.errors) for serializer in serializers]
+    valid = {index: serializer.validated_data for index, serializer in enumerate(serializers) if not errors[index]}
+    _check_conflicts(valid, errors)
+    if any(errors):
+        return [], errors
+
+    trips, customer_ids = [], []
+    for data in valid.values():
+        data = TripSerializer.prepare_create_data(dict(data))
+        customer_ids.append([customer.id for customer in data.pop('customers', [])])
+        trips.append(Trip(**data))
+
+    CustomerLink = Trip.customers.through
+    try:
+        with buffered_activity(), transaction.atomic():
+            # Reserved in this transaction, so a failed insert releases the block.
+            unnumbered = [trip for trip in trips if not trip.surat_jalan_number]
+            if unnumbered:
+                for trip, number in zip(unnumbered, generate_surat_numbers(len(unnumbered))):
+                    trip.surat_jalan_number = number
+            Trip.objects.bulk_create(trips)
+            CustomerLink.objects.bulk_create([
+                CustomerLink(trip_id=trip.id, customer_id=customer_id)
+                for trip, ids in zip(trips, customer_ids)
+                for customer_id in ids
+            ])
+            SuratJalanHistory.objects.bulk_create([
+                SuratJalanHistory(trip=trip, surat_jalan_number=trip.surat_jalan_number) for trip in trips
+            ])
+            # bulk_create sends no post_save: audit and refresh the active trip cache here.
+            for trip in trips:
+                record_activity(
+                    'TRIP_CREATED',
+                    {'id': trip.id, 'str': str(trip), 'surat_jalan': trip.surat_jalan_number},
+                    user=user,
+                    ip_address=ip_address,
+                )
+            schedule_active_trip_refresh(*(trip.vehicle_id for trip in trips))
+    except IntegrityError as e:
+        # A surat jalan number was taken meanwhile (e.g. typed in by hand); nothing was written.
+        print(f"Error creating trips in bulk: {e}")
+        return [], [{'non_field_errors': [SURAT_NUMBER_TAKEN]} for _ in rows]
+    return trips, errors
@@ -1,24 +1,120 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import ActivityLog, Organization, User, Customer, Route, Origin, Vehicle, Trip, VehicleEvent
+from .models import ActivityLog, Organization, User, Customer, Route, Origin, Vehicle, Trip, VehicleEvent, Notification, VehicleTombstone, next_change_version
 from .middleware import get_current_user, get_current_request
-from .services.traccar import sync_origin_geofence, sync_customer_geofence
+from .services.outbox import enqueue_traccar_sync
+from .services.geofence_engine import invalidate_geofences
+from .services.nearby import record_place_change
+from .services.active_trips import schedule_active_trip_refresh
+from .services.master_cache import bump_master_version
+from .services.notifications import record_notification_created
+from .services.events import publish_event, user_channel
+from .services.audit import record_activity, publish_activity
+from .serializers import NotificationSerializer
 
 TRACKED_MODELS = [Organization, User, Customer, Route, Origin, Vehicle, Trip, VehicleEvent]
 
 @receiver(post_save, sender=Origin)
 def sync_origin_geofence_on_save(sender, instance, **kwargs):
+    invalidate_geofences(instance.organization_id)
     update_fields = kwargs.get('update_fields')
     if update_fields and set(update_fields).issubset({'traccar_id'}):
         return
-    sync_origin_geofence(instance)
+    record_place_change('origin', instance)
+    enqueue_traccar_sync('ORIGIN_GEOFENCE', instance.pk)
 
 @receiver(post_save, sender=Customer)
 def sync_customer_geofence_on_save(sender, instance, **kwargs):
+    invalidate_geofences(instance.organization_id)
     update_fields = kwargs.get('update_fields')
     if update_fields and set(update_fields).issubset({'traccar_id'}):
         return
-    sync_customer_geofence(instance)
+    record_place_change('customer', instance)
+    enqueue_traccar_sync('CUSTOMER_GEOFENCE', instance.pk)
+
+@receiver(post_delete, sender=Origin)
+@receiver(post_delete, sender=Customer)
+def drop_deleted_geofence(sender, instance, **kwargs):
+    invalidate_geofences(instance.organization_id)
+    record_place_change('origin' if sender is Origin else 'customer', instance, deleted=True)
+
+@receiver(post_init, sender=Trip)
+def remember_trip_vehicle(sender, instance, **kwargs):
+    # __dict__ so deferred loads (.only()) do not fetch the column.
+    instance._active_trip_vehicle_id = instance.__dict__.get('vehicle_id')
+
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def refresh_active_trip_index(sender, instance, **kwargs):
+    previous = getattr(instance, '_active_trip_vehicle_id', None)
+    schedule_active_trip_refresh(instance.vehicle_id, previous)
+    instance._active_trip_vehicle_id = instance.vehicle_id
+
+@receiver(m2m_changed, sender=Trip.customers.through)
+def refresh_active_trip_customers(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_active_trip_refresh(instance.vehicle_id)
+    elif pk_set:
+        schedule_active_trip_refresh(*Trip.objects.filter(pk__in=pk_set).values_list('vehicle_id', flat=True))
+
+MASTER_DATA_RESOURCES = {Customer: 'customer', Route: 'route', Origin: 'origin'}
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Route)
+@receiver(post_save, sender=Origin)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Route)
+@receiver(post_delete, sender=Origin)
+def bump_master_data_version(sender, instance, **kwargs):
+    bump_master_version(MASTER_DATA_RESOURCES[sender], instance.organization_id)
+
+@receiver(post_init, sender=User)
+def remember_user_organization(sender, instance, **kwargs):
+    # __dict__ so deferred loads (.only()) do not fetch the column.
+    instance._driver_list_organization_id = instance.__dict__.get('organization_id')
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_driver_list_version(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields).issubset({'last_login'}):
+        return
+    # A user moved between organizations leaves the old org's list too.
+    previous = getattr(instance, '_driver_list_organization_id', None)
+    for organization_id in {previous, instance.organization_id}:
+        bump_master_version('driver', organization_id)
+    instance._driver_list_organization_id = instance.organization_id
+
+@receiver(post_save, sender=Organization)
+def bump_organization_driver_version(sender, instance, **kwargs):
+    # Driver rows embed the organization's subscription status.
+    bump_master_version('driver', instance.id)
+
+@receiver(post_delete, sender=Vehicle)
+def record_vehicle_tombstone(sender, instance, **kwargs):
+    VehicleTombstone.objects.create(
+        vehicle_id=instance.id,
+        organization_id=instance.organization_id,
+        change_version=next_change_version(),
+    )
+
+@receiver(post_save, sender=Notification)
+def on_notification_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        record_notification_created(instance)
+    except Exception as e:
+        print(f"Error updating notification counters: {e}")
+    publish_event(user_channel(instance.user_id), 'notification', NotificationSerializer(instance).data)
+
+@receiver(post_save, sender=ActivityLog)
+def publish_activity_log(sender, instance, created, **kwargs):
+    if not created:
+        return
+    publish_activity(instance)
 
 @receiver(post_save)
 def log_save_activity(sender, instance, created, **kwargs):
@@ -45,10 +141,10 @@ def log_save_activity(sender, instance, created, **kwargs):
         if isinstance(instance, Trip):
             details['surat_jalan'] = instance.surat_jalan_number
 
-        ActivityLog.objects.create(
+        record_activity(
+            action,
+            details,
             user=user if (user and user.is_authenticated) else None,
-            action=action,
-            details=details,
             ip_address=req.META.get('REMOTE_ADDR') if req else None
         )
     except Exception as e:
@@ -70,10 +166,10 @@ def log_delete_activity(sender, instance, **kwargs):
             'str': str(instance)
         }
         
-        ActivityLog.objects.create(
+        record_activity(
+            action,
+            details,
             user=user if (user and user.is_authenticated) else None,
-            action=action,
-            details=details,
             ip_address=req.META.get('REMOTE_ADDR') if req else None
         )
     except Exception as e:
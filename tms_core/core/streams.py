@@ -0,0 +1,79 @@
+import json
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .middleware import get_user_from_token
+from .services.events import all_orgs_pattern, org_channel, user_channel
+
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 5000
+
+
+async def _authenticate(request):
+    """
+    EventSource cannot set headers, so the access token may also arrive as ?token=.
+    """
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            raw_token = header.split(' ', 1)[1]
+    return await sync_to_async(get_user_from_token)(raw_token)
+
+
+def _subscriptions_for(user):
+    """
+    Notifications are per user; activity logs follow ActivityLogViewSet scoping.
+    """
+    channels = [user_channel(user.id)]
+    patterns = []
+    if user.is_superuser:
+        patterns.append(all_orgs_pattern())
+    elif user.organization_id and user.role in ['OWNER', 'ADMIN']:
+        channels.append(org_channel(user.organization_id))
+    return channels, patterns
+
+
+async def _event_source(channels, patterns):
+    client = aioredis.Redis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        if channels:
+            await pubsub.subscribe(*channels)
+        if patterns:
+            await pubsub.psubscribe(*patterns)
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=HEARTBEAT_SECONDS)
+            if message is None:
+                # Comment frames keep proxies from closing an idle stream.
+                yield ": keepalive\n\n"
+                continue
+            try:
+                payload = json.loads(message['data'])
+            except (TypeError, ValueError):
+                continue
+            yield f"event: {payload.get('event', 'message')}\ndata: {json.dumps(payload.get('data'))}\n\n"
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+async def event_stream(request):
+    """
+    GET /api/stream/?token=<access>
+    Server-sent events for new notifications and activity logs of the caller's organization.
+    """
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication required'}, status=401)
+
+    channels, patterns = _subscriptions_for(user)
+    response = StreamingHttpResponse(_event_source(channels, patterns), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,13 +1,110 @@
 from celery import shared_task
-from .services.traccar import sync_devices_from_traccar
+from .services.traccar import sync_devices_from_traccar, reconcile_geofence_permissions
+from .services.outbox import drain_traccar_outbox
+from .services.sync_shards import UNSHARDED, due_organizations, shard_lock, cache_lock
+from .services.dwell import compute_geofence_dwells
+from .services.log_archive import archive_old_logs
+from .services.fleet import mark_stale_vehicles_offline, prune_vehicle_tombstones
 
 @shared_task
 def sync_device_statuses():
     """
-    Periodic task to sync device statuses from Traccar as a safety net.
-    Recommended schedule: Every 15 minutes.
+    Safety-net device sync, sharded by organization. Runs every minute and
+    queues sync_organization_devices for each organization whose interval has
+    elapsed (15 minutes by default, shorter for premium tenants), so workers
+    sync tenants in parallel and no single task grows with the whole fleet.
+    Vehicles of inactive organizations are synced by one remainder shard.
     """
-    print("Running scheduled device status sync...")
-    result = sync_devices_from_traccar()
+    due = due_organizations()
+    for organization_id, interval in due:
+        # A shard still queued after its next slot is stale; the next dispatch replaces it.
+        sync_organization_devices.apply_async(args=[organization_id], expires=interval * 60)
+    if due:
+        print(f"Queued device sync for {len(due)} organization(s)")
+    return {'dispatched': len(due)}
+
+@shared_task
+def sync_organization_devices(organization_id):
+    """
+    Sync one organization's devices from Traccar (UNSHARDED: vehicles of
+    inactive organizations). Holds a per-shard lock so a slow run is never
+    overlapped by the next one.
+    """
+    with shard_lock(organization_id) as acquired:
+        if not acquired:
+            return {'status': 'skipped', 'reason': 'locked', 'organization_id': organization_id}
+        result = sync_devices_from_traccar(organization_id, unsharded=organization_id is UNSHARDED)
     print(f"Sync result: {result}")
     return result
+
+@shared_task
+def reconcile_geofence_permissions_task(organization_id=None):
+    """
+    Diff Traccar device<->geofence permissions against the database and apply
+    only the missing/extra links. Queued after geofence or vehicle saves; run
+    without an organization for a full sweep.
+    """
+    result = reconcile_geofence_permissions(organization_id)
+    print(f"Geofence permission reconcile: {result}")
+    return result
+
+@shared_task
+def drain_traccar_outbox_task():
+    """
+    Push pending Traccar side effects recorded by model saves. Queued after each
+    commit that writes to the outbox; the beat schedule also runs it every minute.
+    """
+    result = drain_traccar_outbox()
+    if result.get('claimed'):
+        print(f"Traccar outbox drain: {result}")
+    return result
+
+@shared_task
+def mark_stale_vehicles_offline_task():
+    """
+    Flip vehicles that stopped reporting to OFFLINE using each organization's
+    threshold, so computed_status stays filterable without recomputation.
+    """
+    changed = mark_stale_vehicles_offline()
+    if changed:
+        print(f"Marked {len(changed)} vehicles offline")
+    return {'status': 'success', 'offline': len(changed)}
+
+@shared_task
+def prune_vehicle_tombstones_task():
+    """
+    Retention: drop vehicle deletion markers older than the delta-sync window;
+    clients with an older cursor get a full resync instead.
+    """
+    pruned = prune_vehicle_tombstones()
+    if pruned:
+        print(f"Pruned {pruned} vehicle tombstones")
+    return {'status': 'success', 'pruned': pruned}
+
+@shared_task
+def archive_old_logs_task():
+    """
+    Retention: move ActivityLog/DeviceLog rows past LOG_RETENTION_DAYS into
+    compressed archives so the hot tables stay small.
+    """
+    with cache_lock('retention:lock:logs', timeout=2 * 60 * 60) as acquired:
+        if not acquired:
+            return {'status': 'skipped', 'reason': 'locked'}
+        result = archive_old_logs()
+    if any(result.values()):
+        print(f"Archived logs: {result}")
+    return result
+
+@shared_task
+def compute_geofence_dwells_task():
+    """
+    Fold new VehiclePosition rows into GeofenceDwell visits, resuming from the
+    stored watermark so history is never rescanned.
+    """
+    with cache_lock('analytics:lock:geofence-dwell', timeout=30 * 60) as acquired:
+        if not acquired:
+            return {'status': 'skipped', 'reason': 'locked'}
+        result = compute_geofence_dwells()
+    if result.get('positions'):
+        print(f"Geofence dwell batch: {result}")
+    return result
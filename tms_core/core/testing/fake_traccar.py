@@ -0,0 +1,436 @@
+import asyncio
+import base64
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_FLEET_SIZE = 100
+DEFAULT_UNIQUE_ID_PREFIX = 'FAKE'
+DEFAULT_POSITION_INTERVAL = 1.0  # seconds between socket position pushes
+DEFAULT_MOVING_RATIO = 0.2  # share of the fleet reporting a new fix per push
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def _now_iso():
+    return datetime.now(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000+00:00')
+
+
+class FakeTraccar:
+    """
+    In-process stand-in for a Traccar server, for offline tests and benchmarks.
+
+    Serves the REST endpoints the TMS uses (session, devices, positions,
+    geofences, permission writes; links are listed per device through
+    /api/geofences?deviceId= as on a real server) over HTTP and the /api/socket feed over a
+    WebSocket. All state is in memory. Every REST call is counted in ``calls``
+    under a normalized route such as ``"PUT /api/devices/{id}"``.
+    ``latency``/``jitter`` (seconds) delay each REST response.
+
+        with FakeTraccar(fleet_size=10_000, latency=0.02) as fake, use_fake_traccar(fake):
+            sync_devices_from_traccar()
+            fake.calls['GET /api/devices']
+    """
+
+    def __init__(self, fleet_size=DEFAULT_FLEET_SIZE, *, latency=0.0, jitter=0.0, host='127.0.0.1',
+                 port=0, socket_port=0, unique_id_prefix=DEFAULT_UNIQUE_ID_PREFIX,
+                 position_interval=DEFAULT_POSITION_INTERVAL, moving_ratio=DEFAULT_MOVING_RATIO, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.host = host
+        self.port = port
+        self.socket_port = socket_port
+        self.unique_id_prefix = unique_id_prefix
+        self.position_interval = position_interval
+        self.moving_ratio = moving_ratio
+        self.random = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self.calls = Counter()
+        self.devices = {}
+        self.positions = {}  # deviceId -> latest position
+        self.geofences = {}
+        self.permissions = set()  # (deviceId, geofenceId)
+        self.sessions = set()
+        self._next_id = {'device': 1, 'position': 1, 'geofence': 1}
+
+        self._http = None
+        self._http_thread = None
+        self._loop = None
+        self._socket_thread = None
+        self._socket_server = None
+        self._socket_clients = set()
+        self._socket_ready = threading.Event()
+
+        for index in range(fleet_size):
+            self.add_device(f"{unique_id_prefix}{index:06d}", name=f"{unique_id_prefix}-{index}")
+
+    # State helpers
+
+    def _allocate(self, kind):
+        value = self._next_id[kind]
+        self._next_id[kind] += 1
+        return value
+
+    def add_device(self, unique_id, name=None, status=None):
+        with self.lock:
+            device_id = self._allocate('device')
+            device = {
+                'id': device_id,
+                'name': name or unique_id,
+                'uniqueId': str(unique_id),
+                'status': None,
+                'lastUpdate': _now_iso(),
+                'positionId': None,
+                'disabled': False,
+            }
+            self.devices[device_id] = device
+            self.move_device(device_id)
+            device['status'] = status or self.random.choice(['online', 'offline'])
+            return device
+
+    def move_device(self, device_id, latitude=None, longitude=None, speed=None):
+        """
+        Record a new fix for the device and return it.
+        """
+        with self.lock:
+            previous = self.positions.get(device_id)
+            if latitude is None:
+                base_lat = previous['latitude'] if previous else self.random.uniform(-7.5, -6.0)
+                latitude = base_lat + self.random.uniform(-0.001, 0.001)
+            if longitude is None:
+                base_lon = previous['longitude'] if previous else self.random.uniform(106.5, 108.0)
+                longitude = base_lon + self.random.uniform(-0.001, 0.001)
+            if speed is None:
+                speed = self.random.choice([0.0, self.random.uniform(5, 40)])
+            total = (previous['attributes']['totalDistance'] if previous else 0) + self.random.uniform(0, 500)
+            now = _now_iso()
+            position = {
+                'id': self._allocate('position'),
+                'deviceId': device_id,
+                'latitude': latitude,
+                'longitude': longitude,
+                'speed': speed,
+                'course': self.random.uniform(0, 360),
+                'fixTime': now,
+                'serverTime': now,
+                'attributes': {'ignition': speed > 0, 'totalDistance': total},
+            }
+            self.positions[device_id] = position
+            device = self.devices[device_id]
+            device['positionId'] = position['id']
+            device['lastUpdate'] = now
+            device['status'] = 'online'
+            return position
+
+    @property
+    def unique_ids(self):
+        with self.lock:
+            return [device['uniqueId'] for device in self.devices.values()]
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls.clear()
+
+    # Lifecycle
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def socket_url(self):
+        return f"ws://{self.host}:{self.socket_port}/api/socket"
+
+    def start(self):
+        self._http = ThreadingHTTPServer((self.host, self.port), _handler_for(self))
+        self._http.daemon_threads = True
+        self.port = self._http.server_address[1]
+        self._http_thread = threading.Thread(target=self._http.serve_forever, name='fake-traccar-http', daemon=True)
+        self._http_thread.start()
+
+        self._socket_thread = threading.Thread(target=self._run_socket_loop, name='fake-traccar-socket', daemon=True)
+        self._socket_thread.start()
+        self._socket_ready.wait(timeout=10)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_socket(), self._loop).result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._socket_thread.join(timeout=10)
+            self._loop = None
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # REST
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+    def dispatch(self, method, path, query, body):
+        """
+        Route one REST call; returns (status, payload, extra headers).
+        """
+        route = _ID_SEGMENT.sub('/{id}', path)
+        with self.lock:
+            self.calls[f"{method} {route}"] += 1
+
+        segments = [segment for segment in path.split('/') if segment][1:]  # drop 'api'
+        resource = segments[0] if segments else ''
+        object_id = int(segments[1]) if len(segments) > 1 and segments[1].isdigit() else None
+
+        with self.lock:
+            if resource == 'session' and method == 'POST':
+                token = uuid.uuid4().hex
+                self.sessions.add(token)
+                return 200, {'id': 1, 'email': 'fake@traccar'}, {'Set-Cookie': f"JSESSIONID={token}; Path=/"}
+            if resource == 'devices':
+                return self._devices(method, object_id, query, body)
+            if resource == 'positions' and method == 'GET':
+                positions = list(self.positions.values())
+                if 'deviceId' in query:
+                    wanted = {int(value) for value in query['deviceId']}
+                    positions = [pos for pos in positions if pos['deviceId'] in wanted]
+                if 'id' in query:
+                    wanted = {int(value) for value in query['id']}
+                    positions = [pos for pos in positions if pos['id'] in wanted]
+                return 200, positions, {}
+            if resource == 'geofences':
+                return self._geofences(method, object_id, query, body)
+            if resource == 'permissions':
+                return self._permissions(method, body)
+        return 404, {'error': f"{method} {path} not supported"}, {}
+
+    def _devices(self, method, object_id, query, body):
+        if method == 'GET':
+            devices = list(self.devices.values())
+            if 'uniqueId' in query:
+                wanted = set(query['uniqueId'])
+                devices = [device for device in devices if device['uniqueId'] in wanted]
+            if 'id' in query:
+                wanted = {int(value) for value in query['id']}
+                devices = [device for device in devices if device['id'] in wanted]
+            return 200, devices, {}
+        if method == 'POST':
+            unique_id = (body or {}).get('uniqueId')
+            if not unique_id or any(device['uniqueId'] == str(unique_id) for device in self.devices.values()):
+                return 400, {'error': 'duplicate or missing uniqueId'}, {}
+            device = self.add_device(unique_id, name=body.get('name'), status='offline')
+            return 200, device, {}
+        if object_id not in self.devices:
+            return 404, {'error': 'device not found'}, {}
+        if method == 'PUT':
+            self.devices[object_id].update({k: v for k, v in (body or {}).items() if k != 'id'})
+            return 200, self.devices[object_id], {}
+        if method == 'DELETE':
+            self.devices.pop(object_id)
+            self.positions.pop(object_id, None)
+            self.permissions = {pair for pair in self.permissions if pair[0] != object_id}
+            return 204, None, {}
+        return 405, None, {}
+
+    def _geofences(self, method, object_id, query, body):
+        if method == 'GET':
+            geofences = list(self.geofences.values())
+            if 'deviceId' in query:
+                # Geofences linked to the device, as Traccar answers ?deviceId=.
+                device_id = int(query['deviceId'][0])
+                geofences = [geofence for geofence in geofences if (device_id, geofence['id']) in self.permissions]
+            return 200, geofences, {}
+        if method == 'POST':
+            geofence = dict(body or {}, id=self._allocate('geofence'))
+            self.geofences[geofence['id']] = geofence
+            return 200, geofence, {}
+        if object_id not in self.geofences:
+            return 404, {'error': 'geofence not found'}, {}
+        if method == 'PUT':
+            self.geofences[object_id].update({k: v for k, v in (body or {}).items() if k != 'id'})
+            return 200, self.geofences[object_id], {}
+        if method == 'DELETE':
+            self.geofences.pop(object_id)
+            self.permissions = {pair for pair in self.permissions if pair[1] != object_id}
+            return 204, None, {}
+        return 405, None, {}
+
+    def _permissions(self, method, body):
+        # Like Traccar, links are only written here; they are read back via
+        # GET /api/geofences?deviceId=.
+        if method not in ('POST', 'DELETE'):
+            return 405, {'error': f"{method} /api/permissions not supported"}, {}
+        pair = ((body or {}).get('deviceId'), (body or {}).get('geofenceId'))
+        if pair[0] not in self.devices or pair[1] not in self.geofences:
+            return 400, {'error': 'unknown device or geofence'}, {}
+        if method == 'POST':
+            self.permissions.add(pair)
+            return 204, None, {}
+        if method == 'DELETE':
+            self.permissions.discard(pair)
+            return 204, None, {}
+        return 405, None, {}
+
+    # Socket
+
+    def _run_socket_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._open_socket())
+        self._socket_ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _open_socket(self):
+        from websockets.asyncio.server import serve
+
+        self._socket_server = await serve(
+            self._socket_handler, self.host, self.socket_port, process_request=self._check_session,
+        )
+        self.socket_port = self._socket_server.sockets[0].getsockname()[1]
+        self._pusher = asyncio.ensure_future(self._push_positions())
+
+    async def _close_socket(self):
+        self._pusher.cancel()
+        self._socket_server.close()
+        await self._socket_server.wait_closed()
+
+    def _check_session(self, connection, request):
+        if request.path != '/api/socket':
+            return connection.respond(404, 'Not Found\n')
+        cookies = dict(
+            part.strip().split('=', 1) for part in request.headers.get('Cookie', '').split(';') if '=' in part
+        )
+        if cookies.get('JSESSIONID') not in self.sessions:
+            return connection.respond(401, 'Unauthorized\n')
+        return None
+
+    async def _socket_handler(self, websocket):
+        with self.lock:
+            snapshot = {'devices': list(self.devices.values()), 'positions': list(self.positions.values())}
+        await websocket.send(json.dumps(snapshot))
+        self._socket_clients.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self._socket_clients.discard(websocket)
+
+    async def _broadcast(self, payload):
+        message = json.dumps(payload)
+        for websocket in list(self._socket_clients):
+            try:
+                await websocket.send(message)
+            except Exception:
+                self._socket_clients.discard(websocket)
+
+    async def _push_positions(self):
+        while True:
+            await asyncio.sleep(self.position_interval)
+            if not self._socket_clients or not self.moving_ratio:
+                continue
+            with self.lock:
+                device_ids = list(self.devices)
+                count = max(1, int(len(device_ids) * self.moving_ratio)) if device_ids else 0
+                positions = [self.move_device(device_id) for device_id in self.random.sample(device_ids, count)]
+            if positions:
+                await self._broadcast({'positions': positions})
+
+    def push(self, payload):
+        """
+        Send an arbitrary socket message ({'events': [...]}, {'devices': [...]}, ...)
+        to every connected client. Callable from any thread.
+        """
+        asyncio.run_coroutine_threadsafe(self._broadcast(payload), self._loop).result(timeout=10)
+
+
+def _handler_for(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _handle(self, method):
+            parsed = urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            body = None
+            if raw:
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    body = json.loads(raw)
+                else:
+                    body = {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+
+            if not self._authorized(parsed.path):
+                self._send(401, {'error': 'unauthorized'}, {})
+                return
+
+            fake.delay()
+            status_code, payload, headers = fake.dispatch(method, parsed.path, parse_qs(parsed.query), body)
+            self._send(status_code, payload, headers)
+
+        def _authorized(self, path):
+            if path == '/api/session':
+                return True
+            auth = self.headers.get('Authorization') or ''
+            if auth.startswith('Basic ') and ':' in base64.b64decode(auth[6:]).decode(errors='ignore'):
+                return True
+            return any(f"JSESSIONID={token}" in (self.headers.get('Cookie') or '') for token in fake.sessions)
+
+        def _send(self, status_code, payload, headers):
+            data = b'' if payload is None else json.dumps(payload).encode()
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if data:
+                self.wfile.write(data)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+        def log_message(self, format, *args):
+            return
+
+    return Handler
+
+
+@contextmanager
+def use_fake_traccar(fake, **client_kwargs):
+    """
+    Point the process-wide TraccarClient at ``fake`` for the duration of the block.
+    """
+    from ..services import traccar_client
+
+    client = traccar_client.TraccarClient(base_url=fake.base_url, **client_kwargs)
+    with traccar_client._client_lock:
+        previous, traccar_client._client = traccar_client._client, client
+    try:
+        yield client
+    finally:
+        with traccar_client._client_lock:
+            traccar_client._client = previous
+        client.close()
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Customer, Organization, Origin, Trip, User, Vehicle
+from ..services.active_trips import advance_trip_on_geofence, get_active_trips
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class AdvanceTripOnGeofenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Advance Logistics')
+        cls.vehicle = Vehicle.objects.create(organization=cls.organization, license_plate='B 1 AT')
+        cls.driver = User.objects.create(username='at-driver', role='DRIVER', organization=cls.organization)
+        cls.depot_a = Origin.objects.create(organization=cls.organization, name='Depot A')
+        cls.depot_b = Origin.objects.create(organization=cls.organization, name='Depot B')
+        cls.shop = Customer.objects.create(organization=cls.organization, name='Shop')
+        cls.market = Customer.objects.create(organization=cls.organization, name='Market')
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def _trip(self, origin, customers, sj):
+        trip = Trip.objects.create(
+            organization=self.organization, vehicle=self.vehicle, driver=self.driver,
+            origin_location=origin, origin=origin.name, destination=customers[0].name,
+            destinations=[customer.name for customer in customers], surat_jalan_number=sj,
+        )
+        trip.customers.set(customers)
+        return trip
+
+    def _event(self, event_type, place, minutes=0):
+        fence = {
+            'geofence_id': f'{place.__class__.__name__}:{place.id}',
+            'geofence_type': 'origin' if isinstance(place, Origin) else 'customer',
+            'ref_id': place.id,
+            'name': place.name,
+        }
+        return advance_trip_on_geofence(self.vehicle, event_type, fence, self.now + timedelta(minutes=minutes))
+
+    def _status(self, trip):
+        trip.refresh_from_db()
+        return trip.status
+
+    def test_origin_events_match_the_trip_origin(self):
+        older = self._trip(self.depot_a, [self.shop], 'SJ-AT-1')
+        newer = self._trip(self.depot_b, [self.market], 'SJ-AT-2')
+
+        self.assertEqual(self._event('geofenceEnter', self.depot_b), 'arrived')
+        self.assertEqual((self._status(older), self._status(newer)), ('PLANNED', 'ARRIVED'))
+        self.assertEqual(self._event('geofenceExit', self.depot_b, 5), 'departed')
+        self.assertEqual(self._status(newer), 'OTW')
+
+        other_depot = Origin.objects.create(organization=self.organization, name='Depot C')
+        self.assertIsNone(self._event('geofenceEnter', other_depot))
+
+    def test_drive_through_does_not_complete_a_destination(self):
+        trip = self._trip(self.depot_a, [self.shop], 'SJ-AT-3')
+        self.assertIsNone(self._event('geofenceEnter', self.shop))
+        self.assertIsNone(self._event('geofenceExit', self.shop, 1))
+        trip.refresh_from_db()
+        self.assertEqual((trip.status, trip.completed_destinations), ('PLANNED', []))
+
+    def test_exit_without_seen_entry_does_not_complete(self):
+        trip = self._trip(self.depot_a, [self.shop], 'SJ-AT-4')
+        self.assertIsNone(self._event('geofenceExit', self.shop, 30))
+        self.assertEqual(self._status(trip), 'PLANNED')
+
+    def test_dwell_at_each_destination_completes_the_trip(self):
+        trip = self._trip(self.depot_a, [self.shop, self.market], 'SJ-AT-5')
+
+        self._event('geofenceEnter', self.shop)
+        self.assertEqual(self._event('geofenceExit', self.shop, 10), 'destination_arrived')
+        trip.refresh_from_db()
+        self.assertEqual((trip.status, trip.completed_destinations), ('OTW', ['Shop']))
+
+        self._event('geofenceEnter', self.market, 20)
+        self.assertEqual(self._event('geofenceExit', self.market, 30), 'completed')
+        trip.refresh_from_db()
+        self.assertEqual(trip.status, 'COMPLETED')
+        self.assertEqual(trip.completed_at, self.now + timedelta(minutes=30))
+        self.assertEqual(get_active_trips(self.vehicle.id), [])
+
+    def test_destination_completes_the_trip_that_has_it_pending(self):
+        older = self._trip(self.depot_a, [self.shop], 'SJ-AT-6')
+        newer = self._trip(self.depot_b, [self.market], 'SJ-AT-7')
+
+        self._event('geofenceEnter', self.market)
+        self.assertEqual(self._event('geofenceExit', self.market, 10), 'completed')
+        self.assertEqual((self._status(older), self._status(newer)), ('PLANNED', 'COMPLETED'))
+        self.assertEqual([entry['id'] for entry in get_active_trips(self.vehicle.id)], [older.id])
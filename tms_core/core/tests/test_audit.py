@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from ..models import ActivityLog
+from ..services.audit import buffered_activity, record_activity
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BufferedActivityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _actions(self):
+        return list(ActivityLog.objects.order_by('id').values_list('action', flat=True))
+
+    def test_entries_of_rolled_back_transaction_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffered_activity():
+                record_activity('KEPT_BEFORE')
+                try:
+                    with transaction.atomic():
+                        record_activity('ROLLED_BACK')
+                        raise ValueError('write failed')
+                except ValueError:
+                    pass
+                record_activity('KEPT_AFTER')
+        self.assertEqual(self._actions(), ['KEPT_BEFORE', 'KEPT_AFTER'])
+
+    def test_flush_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with buffered_activity():
+                record_activity('PENDING')
+            self.assertEqual(self._actions(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._actions(), ['PENDING'])
+
+    def test_nested_scopes_flush_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffered_activity():
+                with buffered_activity():
+                    record_activity('INNER')
+                self.assertEqual(self._actions(), [])
+                record_activity('OUTER')
+        self.assertEqual(self._actions(), ['INNER', 'OUTER'])
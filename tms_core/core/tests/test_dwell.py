@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import AnalyticsWatermark, GeofenceDwell, Organization, Origin, Vehicle, VehiclePosition
+from ..services.dwell import GAP_GRACE_SECONDS, WATERMARK_NAME, compute_geofence_dwells, process_dwell_batch
+from . import LOCAL_CACHE
+
+INSIDE = (-6.2, 106.8)
+OUTSIDE = (-6.3, 106.9)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class GeofenceDwellTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Dwell Logistics')
+        cls.origin = Origin.objects.create(organization=cls.organization, name='Depot', latitude=INSIDE[0],
+                                           longitude=INSIDE[1], radius=200)
+        cls.vehicle = Vehicle.objects.create(organization=cls.organization, license_plate='B 1 DW')
+
+    def setUp(self):
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def _position(self, minutes, point, **fields):
+        return VehiclePosition.objects.create(
+            vehicle=self.vehicle, latitude=point[0], longitude=point[1],
+            timestamp=self.start + timedelta(minutes=minutes), **fields,
+        )
+
+    def _watermark(self):
+        return AnalyticsWatermark.objects.get(name=WATERMARK_NAME)
+
+    def test_visit_is_folded_and_closed(self):
+        for minute in (0, 2, 5):
+            self._position(minute, INSIDE)
+        self._position(6, OUTSIDE)
+
+        compute_geofence_dwells()
+
+        dwell = GeofenceDwell.objects.get()
+        self.assertEqual(dwell.origin_id, self.origin.id)
+        self.assertEqual(dwell.position_count, 3)
+        self.assertEqual(dwell.duration_minutes, 5)
+        self.assertEqual(dwell.exited_at, self.start + timedelta(minutes=6))
+
+    def test_drive_through_is_dropped(self):
+        self._position(0, INSIDE)
+        self._position(1, OUTSIDE)
+        compute_geofence_dwells()
+        self.assertFalse(GeofenceDwell.objects.exists())
+
+    def test_late_committed_id_is_folded_once(self):
+        first = self._position(0, INSIDE)
+        in_flight = self._position(3, INSIDE)
+        last = self._position(5, INSIDE)
+        in_flight_id = in_flight.id
+        in_flight.delete()  # not visible yet when the batch runs
+
+        stats = process_dwell_batch()
+        self.assertEqual(stats['watermark'], last.id)
+        self.assertEqual(self._watermark().pending.keys(), {str(in_flight_id)})
+
+        VehiclePosition.objects.create(id=in_flight_id, vehicle=self.vehicle, latitude=INSIDE[0],
+                                       longitude=INSIDE[1], timestamp=self.start + timedelta(minutes=3))
+        self.assertEqual(process_dwell_batch()['positions'], 1)
+        self.assertEqual(self._watermark().pending, {})
+        self.assertEqual(process_dwell_batch()['positions'], 0)
+
+        dwell = GeofenceDwell.objects.get()
+        self.assertEqual(dwell.position_count, 3)
+        self.assertEqual(dwell.entered_at, first.timestamp)
+        self.assertEqual(dwell.last_seen_at, last.timestamp)
+
+    def test_expired_gaps_are_forgotten(self):
+        self._position(0, INSIDE)
+        process_dwell_batch()
+        AnalyticsWatermark.objects.filter(name=WATERMARK_NAME).update(
+            pending={'999999': time.time() - GAP_GRACE_SECONDS - 1},
+        )
+        self.assertEqual(process_dwell_batch()['positions'], 0)
+        self.assertEqual(self._watermark().pending, {})
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..models import ActivityLog, Customer, Organization, Origin, Vehicle
+from ..services.geofence_engine import DEFAULT_RADIUS_M, evaluate_positions, invalidate_geofences, load_fences
+from . import LOCAL_CACHE
+
+DEPOT = (-6.2, 106.8)
+NEAR_DEPOT = (-6.2009, 106.8)  # ~100 m south
+FAR_AWAY = (-6.3, 106.9)
+WAREHOUSE_BOUNDS = {'north': -6.25, 'south': -6.26, 'east': 106.86, 'west': 106.85}
+IN_WAREHOUSE = (-6.255, 106.855)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class GeofenceEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Fence Logistics')
+        cls.depot = Origin.objects.create(organization=cls.organization, name='Depot', latitude=DEPOT[0],
+                                          longitude=DEPOT[1], radius=0)
+        cls.warehouse = Customer.objects.create(organization=cls.organization, name='Warehouse',
+                                                geofence_type='RECTANGLE', geofence_bounds=WAREHOUSE_BOUNDS)
+        cls.vehicle = Vehicle.objects.create(organization=cls.organization, license_plate='B 1 GF')
+
+    def setUp(self):
+        cache.clear()
+        invalidate_geofences(self.organization.id)
+
+    def _evaluate(self, point):
+        return [(event, fence.key) for _, event, fence in evaluate_positions([(self.vehicle, *point)])]
+
+    def test_blank_radius_uses_default(self):
+        fences = {fence.key: fence for fence in load_fences(self.organization.id)}
+        self.assertEqual(fences[f'origin:{self.depot.id}'].radius, DEFAULT_RADIUS_M)
+        self.assertEqual(fences[f'customer:{self.warehouse.id}'].shape, 'RECTANGLE')
+
+    def test_first_sighting_only_records_state(self):
+        self.assertEqual(self._evaluate(NEAR_DEPOT), [])
+        self.assertFalse(ActivityLog.objects.filter(action__startswith='GEOFENCE').exists())
+        # Still inside: no enter on the next fix either.
+        self.assertEqual(self._evaluate(NEAR_DEPOT), [])
+
+    def test_enter_and_exit(self):
+        self._evaluate(FAR_AWAY)
+        self.assertEqual(self._evaluate(NEAR_DEPOT), [('geofenceEnter', f'origin:{self.depot.id}')])
+        self.assertEqual(self._evaluate(NEAR_DEPOT), [])
+        self.assertEqual(self._evaluate(IN_WAREHOUSE), [
+            ('geofenceExit', f'origin:{self.depot.id}'),
+            ('geofenceEnter', f'customer:{self.warehouse.id}'),
+        ])
+        self.assertEqual(self._evaluate(FAR_AWAY), [('geofenceExit', f'customer:{self.warehouse.id}')])
+        self.assertEqual(
+            list(ActivityLog.objects.filter(action__startswith='GEOFENCE').order_by('id').values_list('action', flat=True)),
+            ['GEOFENCE_ENTER', 'GEOFENCE_EXIT', 'GEOFENCE_ENTER', 'GEOFENCE_EXIT'],
+        )
+
+    def test_changed_fences_are_picked_up(self):
+        self._evaluate(FAR_AWAY)
+        Origin.objects.filter(pk=self.depot.pk).update(latitude=FAR_AWAY[0] + 0.0005, longitude=FAR_AWAY[1])
+        self.assertEqual(self._evaluate(FAR_AWAY), [])
+        invalidate_geofences(self.organization.id)
+        self.assertEqual(self._evaluate(FAR_AWAY), [('geofenceEnter', f'origin:{self.depot.id}')])
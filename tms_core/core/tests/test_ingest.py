@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Organization, Vehicle, VehicleEvent, VehiclePosition
+from ..services.ingest import fix_time, ingest_positions
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE, GEOFENCE_ENGINE_ENABLED=False)
+class IngestFixTimeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Ingest Logistics')
+
+    def setUp(self):
+        cache.clear()
+        self.vehicle = Vehicle.objects.create(organization=self.organization, license_plate='B 1 IN', gps_device_id='dev-1')
+        self.start = (timezone.now() - timedelta(hours=1)).replace(microsecond=0)
+
+    def _fix(self, minutes, speed, **extra):
+        fix = {'uniqueId': 'dev-1', 'latitude': -6.2, 'longitude': 106.8, 'speed': speed}
+        if minutes is not None:
+            fix['fixTime'] = (self.start + timedelta(minutes=minutes)).isoformat()
+        fix.update(extra)
+        return fix
+
+    def test_fix_time_falls_back_to_device_time_then_now(self):
+        now = timezone.now()
+        device_time = (now - timedelta(minutes=3)).isoformat()
+        self.assertEqual(fix_time({'fixTime': device_time}, now), now - timedelta(minutes=3))
+        self.assertEqual(fix_time({'deviceTime': device_time}, now), now - timedelta(minutes=3))
+        self.assertEqual(fix_time({'fixTime': 'garbage'}, now), now)
+        self.assertEqual(fix_time({}, now), now)
+        # Device clocks running ahead are clamped.
+        self.assertEqual(fix_time({'fixTime': (now + timedelta(hours=1)).isoformat()}, now), now)
+
+    def test_batch_uses_each_fix_time(self):
+        # Delivered out of order in one micro-batch.
+        ingest_positions([self._fix(5, 20), self._fix(0, 0)])
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.last_gps_sync, self.start + timedelta(minutes=5))
+        self.assertIsNone(self.vehicle.stopped_since)
+        stop = VehicleEvent.objects.get(vehicle=self.vehicle, event_type='STOP')
+        self.assertEqual(stop.start_time, self.start)
+        self.assertEqual(stop.end_time, self.start + timedelta(minutes=5))
+        self.assertEqual(stop.duration_minutes, 5)
+        self.assertEqual(
+            list(VehiclePosition.objects.filter(vehicle=self.vehicle).values_list('timestamp', flat=True)),
+            [self.start, self.start + timedelta(minutes=5)],
+        )
+
+    def test_offline_gap_measured_between_fixes(self):
+        ingest_positions([self._fix(0, 20), self._fix(45, 20)])
+        offline = VehicleEvent.objects.get(vehicle=self.vehicle, event_type='OFFLINE')
+        self.assertEqual(offline.start_time, self.start)
+        self.assertEqual(offline.end_time, self.start + timedelta(minutes=45))
+
+    def test_late_fix_only_adds_history(self):
+        ingest_positions([self._fix(10, 20)])
+        ingest_positions([self._fix(2, 0, latitude=-6.3)])
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.last_gps_sync, self.start + timedelta(minutes=10))
+        self.assertEqual(self.vehicle.last_latitude, -6.2)
+        self.assertIsNone(self.vehicle.stopped_since)
+        self.assertTrue(VehiclePosition.objects.filter(vehicle=self.vehicle, timestamp=self.start + timedelta(minutes=2)).exists())
@@ -0,0 +1,31 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Organization, User
+
+
+class LogArchiveParamsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Archive Logistics')
+        cls.owner = User.objects.create(username='archive-owner', role='OWNER', organization=cls.organization)
+        cls.admin = User.objects.create(username='archive-admin', is_superuser=True)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_impossible_or_malformed_dates_are_rejected(self):
+        self.client.force_authenticate(self.owner)
+        for params in ({'start_date': '2024-13-45'}, {'end_date': '2024-02-30'}, {'start_date': 'last week'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/log-archives/search/', params).status_code, 400)
+
+        response = self.client.get('/api/log-archives/search/', {'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_superuser_organization_must_be_an_integer(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/log-archives/', {'organization': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/log-archives/search/', {'organization': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/log-archives/', {'organization': self.organization.id}).status_code, 200)
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..models import Organization, Route, User
+from ..services.master_cache import ALL_SCOPE, get_master_version
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class MasterListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Cache Logistics')
+        cls.other_organization = Organization.objects.create(name='Other Cache Logistics')
+        cls.owner = User.objects.create(username='cache-owner', role='OWNER', organization=cls.organization)
+        cls.other_owner = User.objects.create(
+            username='other-cache-owner', role='OWNER', organization=cls.other_organization,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _names(self, url, user, field='username'):
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {row[field] for row in response.data}
+
+    def test_list_is_served_from_cache_until_a_save(self):
+        route = Route.objects.create(organization=self.organization, origin='Cikarang', destination='Bandung')
+        self.assertEqual(self._names('/api/routes/', self.owner, 'destination'), {'Bandung'})
+
+        # Bypassing signals leaves the cached page in place...
+        Route.objects.filter(pk=route.pk).update(destination='Semarang')
+        self.assertEqual(self._names('/api/routes/', self.owner, 'destination'), {'Bandung'})
+
+        # ...a save bumps the version once the transaction commits.
+        route.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            route.save()
+        self.assertEqual(self._names('/api/routes/', self.owner, 'destination'), {'Semarang'})
+
+    def test_save_leaves_other_organizations_cached(self):
+        other_version = get_master_version('route', self.other_organization.id)
+        all_version = get_master_version('route', ALL_SCOPE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Route.objects.create(organization=self.organization, origin='Cikarang', destination='Bekasi')
+
+        self.assertEqual(get_master_version('route', self.other_organization.id), other_version)
+        self.assertNotEqual(get_master_version('route', ALL_SCOPE), all_version)
+
+    def test_driver_moved_between_organizations_leaves_both_lists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            driver = User.objects.create(username='moving-driver', role='DRIVER', organization=self.organization)
+        self.assertEqual(self._names('/api/drivers/', self.owner), {'moving-driver'})
+        self.assertEqual(self._names('/api/drivers/', self.other_owner), set())
+
+        driver = User.objects.get(pk=driver.pk)
+        driver.organization = self.other_organization
+        with self.captureOnCommitCallbacks(execute=True):
+            driver.save()
+
+        self.assertEqual(self._names('/api/drivers/', self.owner), set())
+        self.assertEqual(self._names('/api/drivers/', self.other_owner), {'moving-driver'})
+
+    def test_last_login_update_keeps_driver_list_cached(self):
+        driver = User.objects.create(username='login-driver', role='DRIVER', organization=self.organization)
+        version = get_master_version('driver', self.organization.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            driver.save(update_fields=['last_login'])
+
+        self.assertEqual(get_master_version('driver', self.organization.id), version)
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..models import Customer, Organization, User
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class NearbyPlacesRadiusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Nearby Logistics')
+        cls.user = User.objects.create(username='nearby-owner', role='OWNER', organization=cls.organization)
+        cls.customer = Customer.objects.create(organization=cls.organization, name='Shop', latitude=-6.2, longitude=106.8)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, radius):
+        return self.client.get('/api/nearby/', {'lat': -6.2, 'lon': 106.8, 'radius': radius})
+
+    def test_rejects_non_positive_radius(self):
+        for radius in ('0', '-5', 'nan'):
+            self.assertEqual(self._get(radius).status_code, 400, radius)
+
+    def test_huge_radius_is_capped(self):
+        response = self._get('1e12')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place['id'] for place in response.data], [self.customer.id])
+
+    def test_superuser_organization_must_be_an_integer(self):
+        admin = User.objects.create(username='nearby-admin', is_superuser=True)
+        self.client.force_authenticate(admin)
+        params = {'lat': -6.2, 'lon': 106.8}
+
+        self.assertEqual(self.client.get('/api/nearby/', {**params, 'organization': 'abc'}).status_code, 400)
+        response = self.client.get('/api/nearby/', {**params, 'organization': self.organization.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place['id'] for place in response.data], [self.customer.id])
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..models import Organization, User, Notification
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class NotificationListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Notification Logistics')
+        cls.user = User.objects.create(username='notif-owner', role='OWNER', organization=cls.organization)
+        cls.other = User.objects.create(username='notif-other', role='OWNER', organization=cls.organization)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _notify(self, user=None, count=1):
+        return [Notification.objects.create(user=user or self.user, message=f'Message {i}') for i in range(count)]
+
+    def _unread(self):
+        response = self.client.get('/api/notifications/unread-count/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['unread']
+
+    def test_matching_etag_returns_304(self):
+        self._notify(count=2)
+        first = self.client.get('/api/notifications/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data['results']), 2)
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/notifications/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_etag_changes_with_new_notification_and_path(self):
+        self._notify()
+        etag = self.client.get('/api/notifications/')['ETag']
+        self.assertNotEqual(self.client.get('/api/notifications/', {'page_size': 1})['ETag'], etag)
+
+        self._notify()
+        response = self.client.get('/api/notifications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_other_users_notifications_do_not_change_etag(self):
+        self._notify()
+        etag = self.client.get('/api/notifications/')['ETag']
+        self._notify(user=self.other)
+        self.assertEqual(self.client.get('/api/notifications/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_none_match_is_compared_exactly(self):
+        self._notify()
+        etag = self.client.get('/api/notifications/')['ETag']
+        opaque = etag[2:]
+
+        def status_for(header):
+            return self.client.get('/api/notifications/', HTTP_IF_NONE_MATCH=header).status_code
+
+        self.assertEqual(status_for(f'"other", {opaque}'), 304)
+        self.assertEqual(status_for('*'), 304)
+        # A header that merely contains the tag is not a match.
+        self.assertEqual(status_for(f'"stale", {etag}junk'), 200)
+        self.assertEqual(status_for(opaque[:-2] + '"'), 200)
+
+    def test_unread_count_follows_create_and_mark_read(self):
+        notifications = self._notify(count=3)
+        self.assertEqual(self._unread(), 3)
+
+        # Primed counter is incremented, not recomputed.
+        self._notify()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._unread(), 4)
+
+        response = self.client.post('/api/notifications/mark-read/', {'id': notifications[0].id}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self._unread(), 3)
+
+        # Marking an already read notification again changes nothing.
+        self.client.post('/api/notifications/mark-read/', {'id': notifications[0].id}, format='json')
+        self.assertEqual(self._unread(), 3)
+
+        response = self.client.post('/api/notifications/mark-read/', {}, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(self._unread(), 0)
+        self.assertEqual(Notification.objects.filter(user=self.user, is_read=False).count(), 0)
+
+    def test_mark_read_invalidates_etag(self):
+        notification = self._notify()[0]
+        etag = self.client.get('/api/notifications/')['ETag']
+        self.client.post('/api/notifications/mark-read/', {'id': notification.id}, format='json')
+        response = self.client.get('/api/notifications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['is_read'])
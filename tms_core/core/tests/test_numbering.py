@@ -0,0 +1,90 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..models import Customer, DocumentCounter, Organization, Trip, User, Vehicle
+from ..services.numbering import (
+    SURAT_NUMBER_TAKEN, allocate_numbers, generate_surat_number, generate_surat_numbers, peek_number,
+    preview_surat_number,
+)
+from . import LOCAL_CACHE
+
+DAY = date(2026, 10, 19)
+
+
+class AllocateNumbersTests(TestCase):
+    def test_blocks_are_consecutive_and_distinct(self):
+        self.assertEqual(list(allocate_numbers('SJ', '20261019', 3)), [1, 2, 3])
+        self.assertEqual(list(allocate_numbers('SJ', '20261019', 2)), [4, 5])
+        self.assertEqual(DocumentCounter.objects.get(series='SJ', period='20261019').value, 5)
+
+    def test_series_periods_and_organizations_count_separately(self):
+        organization = Organization.objects.create(name='Numbering Logistics')
+        allocate_numbers('SJ', '20261019', 4)
+
+        self.assertEqual(list(allocate_numbers('SJ', '20261020')), [1])
+        self.assertEqual(list(allocate_numbers('INV', '20261019')), [1])
+        self.assertEqual(list(allocate_numbers('SJ', '20261019', organization_id=organization.id)), [1])
+
+    def test_seed_only_used_for_a_new_counter(self):
+        self.assertEqual(list(allocate_numbers('SJ', '20261019', 2, seed=lambda: 40)), [41, 42])
+        self.assertEqual(list(allocate_numbers('SJ', '20261019', seed=lambda: 90)), [43])
+
+    def test_peek_does_not_reserve(self):
+        self.assertEqual(peek_number('SJ', '20261019', seed=lambda: 6), 7)
+        self.assertFalse(DocumentCounter.objects.exists())
+        allocate_numbers('SJ', '20261019', 2)
+        self.assertEqual(peek_number('SJ', '20261019'), 3)
+        self.assertEqual(peek_number('SJ', '20261019'), 3)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SuratNumberTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Surat Logistics')
+        cls.customer = Customer.objects.create(organization=cls.organization, name='Customer S')
+        cls.vehicles = [
+            Vehicle.objects.create(organization=cls.organization, license_plate=f'B {i} SN') for i in range(2)
+        ]
+        cls.drivers = [
+            User.objects.create(username=f'sn-driver-{i}', role='DRIVER', organization=cls.organization) for i in range(2)
+        ]
+
+    def _trip(self, number, index=0):
+        return Trip.objects.create(
+            organization=self.organization, vehicle=self.vehicles[index], driver=self.drivers[index],
+            origin='Depot', destination=self.customer.name, surat_jalan_number=number, status='COMPLETED',
+        )
+
+    def test_legacy_numbers_seed_the_daily_counter(self):
+        self._trip('SJ-20261019-0007')
+        self._trip('SJ-20261019-MANUAL', index=1)
+
+        self.assertEqual(preview_surat_number(DAY), 'SJ-20261019-0008')
+        self.assertEqual(generate_surat_numbers(2, DAY), ['SJ-20261019-0008', 'SJ-20261019-0009'])
+        self.assertEqual(generate_surat_number(date(2026, 10, 20)), 'SJ-20261020-0001')
+
+    def test_counter_skips_numbers_typed_in_by_hand(self):
+        allocate_numbers('SJ', '20261019')
+        self._trip('SJ-20261019-0002')
+        self._trip('SJ-20261019-0003', index=1)
+
+        self.assertEqual(generate_surat_numbers(2, DAY), ['SJ-20261019-0004', 'SJ-20261019-0005'])
+
+    def test_number_taken_after_validation_is_a_400(self):
+        taken = self._trip('SJ-20261019-0001').surat_jalan_number
+        payload = {
+            'organization': self.organization.id, 'vehicle': self.vehicles[1].id, 'driver': self.drivers[1].id,
+            'origin': 'Depot', 'destination': self.customer.name, 'customers': [self.customer.id],
+        }
+
+        # A concurrent request typed in the number the counter then handed out.
+        with mock.patch('core.serializers.generate_surat_number', return_value=taken):
+            response = APIClient().post('/api/trips/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['surat_jalan_number'], [SURAT_NUMBER_TAKEN])
+        self.assertEqual(Trip.objects.count(), 1)
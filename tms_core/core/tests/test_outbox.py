@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import TraccarOutbox
+from ..services import outbox
+from ..services.outbox import drain_traccar_outbox, enqueue_traccar_sync
+
+
+class TraccarOutboxDrainTests(TestCase):
+    def setUp(self):
+        self.handler = mock.Mock(return_value={'status': 'success'})
+        patcher = mock.patch.dict(outbox.HANDLERS, {'VEHICLE_DEVICE': self.handler})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _row(self, object_id=1, **fields):
+        return TraccarOutbox.objects.create(kind='VEHICLE_DEVICE', object_id=object_id, **fields)
+
+    def test_enqueue_skips_duplicate_pending_entry(self):
+        enqueue_traccar_sync('VEHICLE_DEVICE', 7)
+        enqueue_traccar_sync('VEHICLE_DEVICE', 7)
+        self.assertEqual(TraccarOutbox.objects.filter(kind='VEHICLE_DEVICE', object_id=7).count(), 1)
+
+    def test_rows_for_same_object_are_coalesced(self):
+        first, second = self._row(), self._row()
+        self._row(object_id=2)
+
+        stats = drain_traccar_outbox()
+
+        self.assertEqual(self.handler.call_count, 2)
+        self.assertEqual(sorted(call.args[0] for call in self.handler.call_args_list), [1, 2])
+        self.assertEqual(stats['claimed'], 3)
+        self.assertEqual(stats['synced'], 2)
+        self.assertEqual(stats['coalesced'], 1)
+        for row in (first, second):
+            row.refresh_from_db()
+            self.assertEqual(row.status, 'DONE')
+
+    def test_failure_backs_off_exponentially(self):
+        self.handler.return_value = {'status': 'error', 'reason': 'Traccar down'}
+        row = self._row()
+
+        for attempts in (1, 2, 3):
+            before = timezone.now()
+            stats = drain_traccar_outbox()
+            self.assertEqual(stats['retried'], 1)
+            row.refresh_from_db()
+            self.assertEqual(row.status, 'PENDING')
+            self.assertEqual(row.attempts, attempts)
+            self.assertEqual(row.last_error, 'Traccar down')
+            self.assertIsNone(row.claimed_at)
+            delay = outbox.BASE_BACKOFF_SECONDS * 2 ** (attempts - 1)
+            self.assertGreaterEqual(row.available_at, before + timedelta(seconds=delay))
+            self.assertLess(row.available_at, timezone.now() + timedelta(seconds=delay + 1))
+
+            # Not due yet: the next drain leaves it alone.
+            self.assertEqual(drain_traccar_outbox()['claimed'], 0)
+            TraccarOutbox.objects.filter(pk=row.pk).update(available_at=timezone.now())
+
+        self.assertEqual(self.handler.call_count, 3)
+
+    def test_backoff_is_capped(self):
+        self.assertEqual(outbox._backoff(30), timedelta(seconds=outbox.MAX_BACKOFF_SECONDS))
+
+    def test_stale_processing_rows_are_reclaimed(self):
+        stale = self._row(status='PROCESSING', claimed_at=timezone.now() - outbox.CLAIM_LEASE - timedelta(minutes=1))
+        fresh = self._row(object_id=2, status='PROCESSING', claimed_at=timezone.now())
+
+        stats = drain_traccar_outbox()
+
+        self.assertEqual(stats['claimed'], 1)
+        self.handler.assert_called_once_with(1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, 'DONE')
+        self.assertEqual(fresh.status, 'PROCESSING')
+
+    def test_dead_lettered_after_max_attempts(self):
+        self.handler.side_effect = RuntimeError('boom')
+        row = self._row(attempts=outbox.MAX_ATTEMPTS - 2)
+
+        self.assertEqual(drain_traccar_outbox()['retried'], 1)
+        TraccarOutbox.objects.filter(pk=row.pk).update(available_at=timezone.now())
+        stats = drain_traccar_outbox()
+
+        self.assertEqual(stats['dead'], 1)
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'DEAD')
+        self.assertEqual(row.attempts, outbox.MAX_ATTEMPTS)
+        self.assertEqual(row.last_error, 'boom')
+        self.assertIsNotNone(row.processed_at)
+
+        # Dead letters are never picked up again.
+        self.assertEqual(drain_traccar_outbox()['claimed'], 0)
+        self.assertEqual(self.handler.call_count, 2)
+
+    def test_done_rows_are_purged_by_completion_time(self):
+        long_ago = timezone.now() - outbox.DONE_RETENTION - timedelta(days=1)
+        old = self._row(status='DONE', available_at=long_ago, processed_at=long_ago)
+        # Became due long ago but only finished now (after a long retry run).
+        recent = self._row(object_id=2, status='DONE', available_at=long_ago, processed_at=timezone.now())
+
+        stats = drain_traccar_outbox()
+
+        self.assertEqual(stats['purged'], 1)
+        self.assertFalse(TraccarOutbox.objects.filter(pk=old.pk).exists())
+        self.assertTrue(TraccarOutbox.objects.filter(pk=recent.pk).exists())
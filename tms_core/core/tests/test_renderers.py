@@ -0,0 +1,59 @@
+import io
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from ..renderers import ORJSONParser, ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def _both(self, data):
+        return JSONRenderer().render(data), ORJSONRenderer().render(data)
+
+    def test_decodes_to_the_same_values_as_json_renderer(self):
+        data = {
+            'id': 1,
+            'revenue': '1500000.00',
+            'margin': Decimal('1900000.50'),
+            'at': datetime(2026, 10, 19, 8, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'reference': uuid.UUID(int=5),
+            'small': 1e-6,
+            'large': 1e16,
+            'empty': None,
+            'notes': 'Bongkar di dock 3 — hubungi PIC',
+            'nested': [{'a': [1, 2.5, None]}],
+        }
+        drf, fast = self._both(data)
+        self.assertEqual(json.loads(fast), json.loads(drf))
+
+    def test_integers_beyond_64_bits_fall_back(self):
+        drf, fast = self._both({'big': 2 ** 70, 'negative': -(2 ** 64)})
+        self.assertEqual(fast, drf)
+
+    def test_non_finite_floats_are_rejected(self):
+        for value in (float('nan'), float('inf'), -float('inf'), Decimal('NaN')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                ORJSONRenderer().render({'rows': [{'speed': value}]})
+
+    def test_real_nulls_are_kept(self):
+        self.assertEqual(ORJSONRenderer().render({'end_time': None, 'speed': 0.0}), b'{"end_time":null,"speed":0.0}')
+
+    def test_line_separators_are_escaped(self):
+        self.assertEqual(ORJSONRenderer().render({'note': 'a\u2028b\u2029c'}), b'{"note":"a\\u2028b\\u2029c"}')
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    def test_parses_utf8_body(self):
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('{"a":"é"}'.encode())), {'a': 'é'})
+
+    def test_rejects_nan(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"a":NaN}'))
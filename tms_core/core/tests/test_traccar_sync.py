@@ -0,0 +1,175 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..models import Organization, Origin, Vehicle
+from ..services.sync_shards import UNSHARDED, due_organizations, shard_lock
+from ..services.traccar import DEVICE_QUERY_CHUNK, reconcile_geofence_permissions, sync_devices_from_traccar
+from ..tasks import sync_organization_devices
+from ..testing.fake_traccar import FakeTraccar, use_fake_traccar
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class TraccarSyncCallCountTests(TestCase):
+    """
+    Sync paths against the in-process fake Traccar: the number of REST calls
+    must not grow with the fleet beyond the documented chunking.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeTraccar(fleet_size=DEVICE_QUERY_CHUNK + 50, seed=7, moving_ratio=0).start()
+        cls.addClassCleanup(cls.fake.stop)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Sync Logistics')
+        cls.other_organization = Organization.objects.create(name='Other Sync Logistics')
+        unique_ids = cls.fake.unique_ids
+        cls.vehicles = [
+            Vehicle.objects.create(organization=cls.organization, license_plate=f'B {i} SY', gps_device_id=uid)
+            for i, uid in enumerate(unique_ids[:DEVICE_QUERY_CHUNK + 10])
+        ]
+        cls.other_vehicles = [
+            Vehicle.objects.create(organization=cls.other_organization, license_plate=f'D {i} SY', gps_device_id=uid)
+            for i, uid in enumerate(unique_ids[DEVICE_QUERY_CHUNK + 10:DEVICE_QUERY_CHUNK + 20])
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.fake.reset_calls()
+        context = use_fake_traccar(self.fake, retries=0)
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+    def test_full_sync_uses_one_devices_and_one_positions_call(self):
+        result = sync_devices_from_traccar()
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['updated'], len(self.vehicles) + len(self.other_vehicles))
+        self.assertEqual(dict(self.fake.calls), {'GET /api/devices': 1, 'GET /api/positions': 1})
+
+        # Nothing newer on the second pass.
+        self.fake.reset_calls()
+        self.assertEqual(sync_devices_from_traccar()['updated'], 0)
+        self.assertEqual(sum(self.fake.calls.values()), 2)
+
+    def test_organization_shard_fetches_only_its_devices_in_chunks(self):
+        result = sync_devices_from_traccar(self.organization.id)
+
+        self.assertEqual(result['devices'], len(self.vehicles))
+        self.assertEqual(result['updated'], len(self.vehicles))
+        self.assertEqual(self.fake.calls['GET /api/devices'], 2)
+        self.assertEqual(self.fake.calls['GET /api/positions'], 2)
+        self.assertFalse(Vehicle.objects.filter(pk__in=[v.pk for v in self.other_vehicles], last_gps_sync__isnull=False).exists())
+
+    def test_sharded_dispatch_syncs_each_organization_once(self):
+        due = dict(due_organizations())
+        self.assertIn(self.organization.id, due)
+        self.assertIn(self.other_organization.id, due)
+        # Dispatched shards are not due again until their interval elapses.
+        self.assertEqual(due_organizations(), [])
+
+        results = [sync_organization_devices(org_id) for org_id in (self.organization.id, self.other_organization.id)]
+        self.assertEqual([r['updated'] for r in results], [len(self.vehicles), len(self.other_vehicles)])
+        self.assertEqual(self.fake.calls['GET /api/devices'], 3)
+
+    def test_inactive_organizations_are_synced_by_the_remainder_shard(self):
+        suspended = Organization.objects.create(name='Suspended Logistics', is_active=False)
+        vehicle = Vehicle.objects.create(organization=suspended, license_plate='S 1 SY', gps_device_id=self.fake.unique_ids[-1])
+
+        due = due_organizations()
+        self.assertIn(UNSHARDED, dict(due))
+        self.assertNotIn(suspended.id, dict(due))
+
+        result = sync_organization_devices(UNSHARDED)
+        self.assertEqual((result['devices'], result['updated']), (1, 1))
+        self.assertEqual(self.fake.calls['GET /api/devices'], 1)
+        vehicle.refresh_from_db()
+        self.assertIsNotNone(vehicle.last_gps_sync)
+
+    def test_locked_shard_makes_no_calls(self):
+        with shard_lock(self.organization.id) as acquired:
+            self.assertTrue(acquired)
+            result = sync_organization_devices(self.organization.id)
+        self.assertEqual(result['reason'], 'locked')
+        self.assertEqual(sum(self.fake.calls.values()), 0)
+
+    def test_permission_reconcile_only_sends_the_diff(self):
+        geofence_ids = []
+        for name in ('Depot', 'Port'):
+            status, geofence, _ = self.fake.dispatch('POST', '/api/geofences', {}, {'name': name, 'area': 'CIRCLE (-6.2 106.8, 200)'})
+            geofence_ids.append(geofence['id'])
+            Origin.objects.create(organization=self.other_organization, name=name, traccar_id=geofence['id'],
+                                  latitude=-6.2, longitude=106.8)
+        self.fake.reset_calls()
+
+        result = reconcile_geofence_permissions(self.other_organization.id)
+        desired = len(self.other_vehicles) * len(geofence_ids)
+        self.assertEqual(result['added'], desired)
+        self.assertEqual(self.fake.calls['POST /api/permissions'], desired)
+        self.assertEqual(self.fake.calls['GET /api/devices'], 1)
+
+        # Already in sync: devices, geofences and one link read per known device
+        # (a vehicle moved to another organization keeps stale links); no writes.
+        self.fake.reset_calls()
+        result = reconcile_geofence_permissions(self.other_organization.id)
+        self.assertEqual((result['added'], result['removed']), (0, 0))
+        self.assertEqual(dict(self.fake.calls), {'GET /api/devices': 1, 'GET /api/geofences': 1 + result['devices']})
+
+        # A vehicle moved away is unlinked from both fences.
+        moved = self.other_vehicles[0]
+        Vehicle.objects.filter(pk=moved.pk).update(organization=self.organization)
+        self.fake.reset_calls()
+        result = reconcile_geofence_permissions(self.other_organization.id)
+        self.assertEqual(result['removed'], len(geofence_ids))
+        self.assertEqual(self.fake.calls['DELETE /api/permissions'], len(geofence_ids))
+
+    def test_permission_reconcile_aborts_when_a_link_read_fails(self):
+        status, geofence, _ = self.fake.dispatch('POST', '/api/geofences', {}, {'name': 'Gate', 'area': 'CIRCLE (-6.2 106.8, 200)'})
+        Origin.objects.create(organization=self.other_organization, name='Gate', traccar_id=geofence['id'],
+                              latitude=-6.2, longitude=106.8)
+        serve = self.fake._geofences
+
+        def flaky(method, object_id, query, body):
+            if 'deviceId' in query and int(query['deviceId'][0]) % 2:
+                return 500, {'error': 'boom'}, {}
+            return serve(method, object_id, query, body)
+
+        self.fake.reset_calls()
+        with mock.patch.object(self.fake, '_geofences', side_effect=flaky):
+            result = reconcile_geofence_permissions(self.other_organization.id)
+
+        self.assertEqual(result['status'], 'error')
+        self.assertGreater(result['failed_reads'], 0)
+        self.assertEqual(self.fake.calls['POST /api/permissions'] + self.fake.calls['DELETE /api/permissions'], 0)
+
+    def test_permission_reconcile_removes_stale_links_seen_per_device(self):
+        status, geofence, _ = self.fake.dispatch('POST', '/api/geofences', {}, {'name': 'Yard', 'area': 'CIRCLE (-6.2 106.8, 200)'})
+        Origin.objects.create(organization=self.other_organization, name='Yard', traccar_id=geofence['id'],
+                              latitude=-6.2, longitude=106.8)
+        device_ids = {device['uniqueId']: device['id'] for device in self.fake.devices.values()}
+        linked = device_ids[self.other_vehicles[0].gps_device_id]
+        # A link left on a device whose vehicle belongs to another organization.
+        stale = device_ids[self.vehicles[0].gps_device_id]
+        for device_id in (linked, stale):
+            self.fake.dispatch('POST', '/api/permissions', {}, {'deviceId': device_id, 'geofenceId': geofence['id']})
+
+        # Links are not listable, only readable per device.
+        self.assertEqual(self.fake.dispatch('GET', '/api/permissions', {}, None)[0], 405)
+        self.assertEqual(
+            self.fake.dispatch('GET', '/api/geofences', {'deviceId': [str(stale)]}, None)[1], [geofence],
+        )
+
+        self.fake.reset_calls()
+        result = reconcile_geofence_permissions(self.other_organization.id)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['removed'], 1)
+        self.assertEqual(result['added'], len(self.other_vehicles) - 1)
+        self.assertNotIn('GET /api/permissions', self.fake.calls)
+        self.assertNotIn((stale, geofence['id']), self.fake.permissions)
+        self.assertIn((linked, geofence['id']), self.fake.permissions)
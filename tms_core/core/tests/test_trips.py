@@ -0,0 +1,162 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Organization, User, Vehicle, Customer, Origin, Trip
+from . import LOCAL_CACHE
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class TripListQueryCountTests(TestCase):
+    """
+    GET /api/trips/ must read every relation from joins/prefetches, so its
+    query count does not grow with the number of rows returned.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Query Count Logistics')
+        cls.origin = Origin.objects.create(organization=cls.organization, name='Depot', latitude=-6.2, longitude=106.8)
+        cls.customers = [
+            Customer.objects.create(organization=cls.organization, name=f'Customer {i}') for i in range(3)
+        ]
+        cls.created = 0
+
+    def _create_trips(self, count):
+        for _ in range(count):
+            TripListQueryCountTests.created += 1
+            n = TripListQueryCountTests.created
+            vehicle = Vehicle.objects.create(organization=self.organization, license_plate=f'B {n} QC')
+            driver = User.objects.create(username=f'qc-driver-{n}', role='DRIVER', organization=self.organization)
+            trip = Trip.objects.create(
+                organization=self.organization,
+                vehicle=vehicle,
+                driver=driver,
+                customer=self.customers[0],
+                origin_location=self.origin,
+                origin=self.origin.name,
+                destination=self.customers[0].name,
+                destinations=[customer.name for customer in self.customers],
+                surat_jalan_number=f'SJ-QC-{n}',
+            )
+            trip.customers.set(self.customers)
+
+    def _list_query_count(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/trips/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self._create_trips(16)
+        self.assertEqual(self._list_query_count(16), self._list_query_count(1))
+
+    def test_sparse_fields(self):
+        self._create_trips(2)
+        response = self.client.get('/api/trips/', {'fields': 'id,status,vehicle_plate'})
+        self.assertEqual(response.status_code, 200)
+        for row in response.data['results']:
+            self.assertEqual(set(row), {'id', 'status', 'vehicle_plate'})
+
+    def test_list_query_count_is_pinned(self):
+        self._create_trips(5)
+        # Trips (with vehicle, driver, customer, origin joined) + customers prefetch.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/trips/')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BulkTripDispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Bulk Dispatch Logistics')
+        cls.customer = Customer.objects.create(organization=cls.organization, name='Customer A')
+        cls.vehicles = [
+            Vehicle.objects.create(organization=cls.organization, license_plate=f'B {i} BD') for i in range(3)
+        ]
+        cls.drivers = [
+            User.objects.create(username=f'bd-driver-{i}', role='DRIVER', organization=cls.organization) for i in range(3)
+        ]
+
+    def _row(self, index, **extra):
+        return {
+            'organization': self.organization.id,
+            'vehicle': self.vehicles[index].id,
+            'driver': self.drivers[index].id,
+            'origin': 'Depot',
+            'destination': self.customer.name,
+            'customers': [self.customer.id],
+            **extra,
+        }
+
+    def test_creates_batch_with_consecutive_numbers(self):
+        response = self.client.post(
+            '/api/trips/bulk/', {'trips': [self._row(0), self._row(1)]}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        numbers = [row['surat_jalan_number'] for row in response.data['results']]
+        self.assertEqual([int(number.rsplit('-', 1)[1]) for number in numbers], [1, 2])
+        trip = Trip.objects.get(surat_jalan_number=numbers[0])
+        self.assertEqual(list(trip.customers.all()), [self.customer])
+        self.assertEqual(trip.surat_histories.count(), 1)
+
+    def test_conflicts_reject_whole_batch(self):
+        rows = [self._row(0), self._row(1, driver=self.drivers[0].id)]
+        response = self.client.post('/api/trips/bulk/', {'trips': rows}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('driver', response.data['errors'][1]['non_field_errors'][0])
+        self.assertFalse(Trip.objects.exists())
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class TripListPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Paging Logistics')
+        cls.vehicle = Vehicle.objects.create(organization=cls.organization, license_plate='B 1 PG')
+        cls.drivers = [
+            User.objects.create(username=f'pg-driver-{i}', role='DRIVER', organization=cls.organization) for i in range(2)
+        ]
+        cls.trips = [
+            Trip.objects.create(
+                organization=cls.organization, vehicle=cls.vehicle, driver=cls.drivers[i % 2],
+                origin='Depot', destination=f'Shop {i}', status=status, surat_jalan_number=f'SJ-PG-{i}',
+            )
+            for i, status in enumerate(['PLANNED', 'OTW', 'COMPLETED', 'COMPLETED', 'SETTLED'])
+        ]
+
+    def test_pages_newest_first_without_repeats(self):
+        seen = []
+        response = self.client.get('/api/trips/', {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, [trip.id for trip in reversed(self.trips)])
+
+    def test_filters(self):
+        def ids(params):
+            return {row['id'] for row in self.client.get('/api/trips/', params).data['results']}
+
+        self.assertEqual(ids({'status': 'planned,OTW'}), {self.trips[0].id, self.trips[1].id})
+        self.assertEqual(ids({'driver': self.drivers[1].id}), {self.trips[1].id, self.trips[3].id})
+        self.assertEqual(ids({'q': 'shop 4'}), {self.trips[4].id})
+
+    def test_status_counts(self):
+        response = self.client.get('/api/trips/status-counts/', {'driver': self.drivers[0].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['PLANNED'], 1)
+        self.assertEqual(response.data['COMPLETED'], 1)
+        self.assertEqual(response.data['SETTLED'], 1)
+        self.assertEqual(response.data['OTW'], 0)
+        self.assertEqual(response.data['total'], 3)
+
+    def test_master_data_lists_are_not_paginated(self):
+        response = self.client.get('/api/vehicles/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
@@ -0,0 +1,216 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Organization, User, Vehicle, VehicleTombstone, next_change_version
+from ..services import fleet
+from ..services.fleet import (
+    DEFAULT_OFFLINE_STATUS_MINUTES, compute_vehicle_status, mark_stale_vehicles_offline, prune_vehicle_tombstones,
+)
+from ..views import VehicleViewSet
+from . import LOCAL_CACHE
+
+DAY_MICROS = 24 * 60 * 60 * 1_000_000
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class VehicleDeltaSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Delta Logistics')
+        cls.other_organization = Organization.objects.create(name='Other Logistics')
+        cls.user = User.objects.create(username='delta-owner', role='OWNER', organization=cls.organization)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _vehicle(self, plate, organization=None):
+        return Vehicle.objects.create(organization=organization or self.organization, license_plate=plate)
+
+    def _delta(self, since):
+        response = self.client.get('/api/vehicles/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Sync-Cursor'], response.data['cursor'])
+        return response.data
+
+    def _ids(self, data):
+        return {row['id'] for row in data['vehicles']}
+
+    def test_returns_only_vehicles_changed_after_cursor(self):
+        unchanged = self._vehicle('B 1 DS')
+        changed = self._vehicle('B 2 DS')
+        Vehicle.objects.filter(pk__in=[unchanged.pk, changed.pk]).update(change_version=1_000)
+        since = next_change_version() - 10_000_000
+        Vehicle.objects.filter(pk=unchanged.pk).update(change_version=since - 1)
+        changed.save()
+
+        data = self._delta(since)
+        self.assertEqual(self._ids(data), {changed.id})
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['reset'])
+
+    def test_cursor_overlaps_recent_changes(self):
+        vehicle = self._vehicle('B 3 DS')
+        data = self._delta(next_change_version() - 60_000_000)
+        cursor = int(data['cursor'])
+        self.assertLessEqual(cursor, next_change_version() - VehicleViewSet.SYNC_CURSOR_OVERLAP_MICROS)
+
+        # A row stamped just before the cursor was issued (committed late) is re-sent.
+        Vehicle.objects.filter(pk=vehicle.pk).update(change_version=cursor + 1)
+        self.assertIn(vehicle.id, self._ids(self._delta(cursor)))
+
+    def test_deleted_vehicles_come_back_as_tombstones(self):
+        since = next_change_version()
+        vehicle = self._vehicle('B 4 DS')
+        vehicle_id = vehicle.id
+        vehicle.delete()
+
+        data = self._delta(since)
+        self.assertEqual(data['deleted'], [vehicle_id])
+        self.assertNotIn(vehicle_id, self._ids(data))
+
+    def test_delta_is_scoped_to_the_organization(self):
+        since = next_change_version()
+        own = self._vehicle('B 5 DS')
+        foreign = self._vehicle('B 6 DS', organization=self.other_organization)
+        foreign_id = foreign.id
+        foreign.delete()
+        self._vehicle('B 7 DS', organization=self.other_organization)
+
+        data = self._delta(since)
+        self.assertEqual(self._ids(data), {own.id})
+        self.assertEqual(data['deleted'], [])
+
+    def test_cursor_older_than_retention_resets(self):
+        vehicle = self._vehicle('B 8 DS')
+        with self.settings(VEHICLE_TOMBSTONE_RETENTION_DAYS=1):
+            data = self._delta(next_change_version() - 2 * DAY_MICROS)
+        self.assertTrue(data['reset'])
+        self.assertIn(vehicle.id, self._ids(data))
+
+    def test_prune_drops_only_expired_tombstones(self):
+        now = next_change_version()
+        old = VehicleTombstone.objects.create(vehicle_id=1, organization=self.organization, change_version=now - 3 * DAY_MICROS)
+        recent = VehicleTombstone.objects.create(vehicle_id=2, organization=self.organization, change_version=now - DAY_MICROS // 2)
+        with self.settings(VEHICLE_TOMBSTONE_RETENTION_DAYS=1):
+            self.assertEqual(prune_vehicle_tombstones(), 1)
+        self.assertFalse(VehicleTombstone.objects.filter(pk=old.pk).exists())
+        self.assertTrue(VehicleTombstone.objects.filter(pk=recent.pk).exists())
+
+
+class ComputeVehicleStatusTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def _status(self, offline_minutes=DEFAULT_OFFLINE_STATUS_MINUTES, minutes_ago=1, **fields):
+        vehicle = Vehicle(last_gps_sync=self.now - timedelta(minutes=minutes_ago), **fields)
+        return compute_vehicle_status(vehicle, self.now, offline_minutes)
+
+    def test_motion_and_ignition(self):
+        self.assertEqual(self._status(last_speed=40), 'MOVING')
+        self.assertEqual(self._status(last_speed=5, last_ignition=True), 'IDLE')
+        self.assertEqual(self._status(last_speed=5), 'STOPPED')
+
+    def test_device_offline_overrides_motion(self):
+        self.assertEqual(self._status(last_speed=40, device_status='OFFLINE'), 'OFFLINE')
+
+    def test_stale_fix_goes_offline_after_threshold(self):
+        minutes = DEFAULT_OFFLINE_STATUS_MINUTES
+        self.assertEqual(self._status(minutes_ago=minutes - 1, last_speed=40), 'MOVING')
+        self.assertEqual(self._status(minutes_ago=minutes + 1, last_speed=40), 'OFFLINE')
+        self.assertEqual(self._status(offline_minutes=60, minutes_ago=minutes + 1, last_speed=40), 'MOVING')
+
+    def test_vehicle_without_fix_is_not_offline(self):
+        self.assertEqual(compute_vehicle_status(Vehicle(last_ignition=True), self.now), 'IDLE')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class VehicleStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Status Logistics')
+        cls.patient_organization = Organization.objects.create(name='Patient Logistics')
+        cls.user = User.objects.create(username='status-owner', role='OWNER', organization=cls.organization)
+        User.objects.create(
+            username='patient-owner', role='OWNER', organization=cls.patient_organization, offline_alert_minutes=60,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _vehicle(self, plate, minutes_ago=1, status='MOVING', organization=None):
+        return Vehicle.objects.create(
+            organization=organization or self.organization, license_plate=plate,
+            last_gps_sync=self.now - timedelta(minutes=minutes_ago), computed_status=status,
+        )
+
+    def test_mark_stale_uses_each_organizations_threshold(self):
+        stale = self._vehicle('B 1 ST', minutes_ago=15)
+        fresh = self._vehicle('B 2 ST', minutes_ago=5)
+        already = self._vehicle('B 3 ST', minutes_ago=90, status='OFFLINE')
+        patient = self._vehicle('B 4 ST', minutes_ago=15, organization=self.patient_organization)
+        patient_stale = self._vehicle('B 5 ST', minutes_ago=90, organization=self.patient_organization)
+        before = stale.change_version
+
+        changed = mark_stale_vehicles_offline(self.now)
+
+        self.assertEqual({vehicle.id for vehicle in changed}, {stale.id, patient_stale.id})
+        for vehicle, expected in ((stale, 'OFFLINE'), (fresh, 'MOVING'), (already, 'OFFLINE'),
+                                  (patient, 'MOVING'), (patient_stale, 'OFFLINE')):
+            vehicle.refresh_from_db()
+            self.assertEqual(vehicle.computed_status, expected)
+        self.assertGreater(stale.change_version, before)
+
+        # Nothing left to flip on the next run.
+        self.assertEqual(mark_stale_vehicles_offline(self.now), [])
+
+    def test_fix_arriving_during_the_sweep_keeps_vehicle_online(self):
+        stale = self._vehicle('B 13 ST', minutes_ago=15)
+        racing = self._vehicle('B 14 ST', minutes_ago=15)
+        next_version = fleet.next_change_version
+
+        def fix_arrives():
+            # Ingest stores a fresh fix after the sweep read the stale rows.
+            Vehicle.objects.filter(pk=racing.pk).update(last_gps_sync=self.now, computed_status='MOVING')
+            return next_version()
+
+        with mock.patch.object(fleet, 'next_change_version', side_effect=fix_arrives):
+            changed = mark_stale_vehicles_offline(self.now)
+
+        self.assertEqual([vehicle.id for vehicle in changed], [stale.id])
+        self.assertEqual(changed[0].computed_status, 'OFFLINE')
+        racing.refresh_from_db()
+        self.assertEqual(racing.computed_status, 'MOVING')
+
+    def test_status_filter(self):
+        moving = self._vehicle('B 6 ST', status='MOVING')
+        idle = self._vehicle('B 7 ST', status='IDLE')
+        self._vehicle('B 8 ST', status='OFFLINE')
+
+        response = self.client.get('/api/vehicles/', {'status': 'moving, idle'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['id'] for row in response.data}, {moving.id, idle.id})
+
+    def test_status_counts(self):
+        self._vehicle('B 9 ST', status='MOVING')
+        self._vehicle('B 10 ST', status='MOVING')
+        self._vehicle('B 11 ST', status='OFFLINE')
+        self._vehicle('B 12 ST', status='IDLE', organization=self.patient_organization)
+
+        response = self.client.get('/api/vehicles/status-counts/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['MOVING'], 2)
+        self.assertEqual(response.data['OFFLINE'], 1)
+        self.assertEqual(response.data['IDLE'], 0)
+        self.assertEqual(response.data['total'], 3)
@@ -2,19 +2,21 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from django.utils.dateparse import parse_date, parse_datetime
-from django.db.models import Q
+from django.utils.dateparse import parse_date
+from django.db.models import Count, Avg, Max, Sum, Q
+from django.db.models.functions import TruncMonth
 from datetime import datetime, timedelta, time
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
 
-from .models import Vehicle, Trip, Customer, Route, Origin, User, VehiclePosition, Organization, DeliveryProof, Notification, ActivityLog, VehicleEvent
+from .models import Vehicle, Trip, Customer, Route, Origin, User, VehiclePosition, Organization, DeliveryProof, Notification, ActivityLog, VehicleEvent, VehicleTombstone, GeofenceDwell, LogArchive, VEHICLE_STATUS_CHOICES, next_change_version
 from .serializers import (
-    VehicleSerializer, TripSerializer, UserSerializer, CustomerSerializer, 
-    RouteSerializer, OriginSerializer, VehiclePositionSerializer, SuratJalanHistorySerializer, generate_surat_number,
-    OrganizationSerializer, NotificationSerializer, ActivityLogSerializer
+    VehicleSerializer, TripSerializer, TripListSerializer, UserSerializer, CustomerSerializer, 
+    RouteSerializer, OriginSerializer, VehiclePositionSerializer, SuratJalanHistorySerializer,
+    OrganizationSerializer, NotificationSerializer, ActivityLogSerializer, GeofenceDwellSerializer, LogArchiveSerializer
 )
 from .services.alerts import (
     STOP_SPEED_THRESHOLD,
@@ -23,6 +25,21 @@ from .services.alerts import (
     notify_vehicle_event,
 )
 from .services.traccar import sync_devices_from_traccar
+from .services.ingest import ingest_positions
+from .services.fleet import tombstone_horizon
+from .services.sync_shards import shard_lock
+from .services.nearby import get_place_index
+from .services.traccar_events import handle_traccar_event
+from .services.active_trips import notify_trip_completed
+from .services.trip_dispatch import BULK_DISPATCH_LIMIT, dispatch_trips
+from .services.numbering import preview_surat_number
+from .services.log_archive import search_archives
+from .services.notifications import build_list_etag, etag_matches, get_unread_count, record_notifications_read
+from .pagination import (
+    NotificationCursorPagination, ActivityLogCursorPagination, TripCursorPagination,
+    PositionCursorPagination, GeofenceDwellCursorPagination,
+)
+from .mixins import OrganizationCachedListMixin
 
 class CustomAuthToken(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
@@ -45,18 +62,99 @@ class CustomAuthToken(ObtainAuthToken):
 class VehicleViewSet(viewsets.ModelViewSet):
     serializer_class = VehicleSerializer
     permission_classes = [permissions.AllowAny]
-    
+    # Rows committed slightly after their stamp was taken are re-sent inside this window.
+    SYNC_CURSOR_OVERLAP_MICROS = 2_000_000
+
     def get_queryset(self):
-            return Vehicle.objects.all()
+        queryset = Vehicle.objects.all()
+        # ?status=MOVING,IDLE filters on the indexed computed_status column.
+        statuses = [value.strip().upper() for value in self.request.query_params.get('status', '').split(',') if value.strip()]
+        if statuses:
+            queryset = queryset.filter(computed_status__in=statuses)
+        return queryset
+
+    def _organization_scope(self, queryset):
+        """
+        The caller's organization (superusers: ?organization= or every one);
+        anonymous callers and users without an organization see nothing.
+        """
+        user = self.request.user
+        if user.is_superuser:
+            organization_id = self.request.query_params.get('organization')
+            return queryset.filter(organization_id=organization_id) if organization_id else queryset
+        if user.is_authenticated and user.organization_id:
+            return queryset.filter(organization_id=user.organization_id)
+        return queryset.none()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Plain list by default. With ?since=<cursor> only the caller's organization's
+        vehicles changed after the cursor are returned, plus ids of its vehicles
+        deleted since then. A cursor older than the tombstone retention window
+        gets every vehicle with "reset": true, and the client replaces its copy.
+        Every response carries the next cursor in the X-Sync-Cursor header.
+        """
+        now_version = next_change_version()
+        cursor = now_version - self.SYNC_CURSOR_OVERLAP_MICROS
+        since_raw = request.query_params.get('since')
+        if since_raw is None:
+            response = super().list(request, *args, **kwargs)
+            response['X-Sync-Cursor'] = str(cursor)
+            return response
+
+        try:
+            since = int(since_raw)
+        except (TypeError, ValueError):
+            return Response({"error": "since must be a cursor returned by this endpoint"}, status=status.HTTP_400_BAD_REQUEST)
+
+        vehicles = self._organization_scope(self.filter_queryset(self.get_queryset()))
+        reset = since < tombstone_horizon(now_version)
+        if reset:
+            deleted = []
+        else:
+            vehicles = vehicles.filter(change_version__gt=since)
+            deleted = self._organization_scope(VehicleTombstone.objects.filter(change_version__gt=since))
+            deleted = list(deleted.values_list('vehicle_id', flat=True))
+        cursor = max(cursor, since)
+        response = Response({
+            "cursor": str(cursor),
+            "vehicles": self.get_serializer(vehicles, many=True).data,
+            "deleted": deleted,
+            "reset": reset,
+        })
+        response['X-Sync-Cursor'] = str(cursor)
+        return response
 
     @action(detail=False, methods=['post'], url_path='sync', permission_classes=[permissions.IsAuthenticated])
     def sync(self, request):
         """
         Force a check against Traccar API to ensure data is latest.
         """
-        result = sync_devices_from_traccar()
+        user = request.user
+        if user.is_superuser and not user.organization_id:
+            return Response(sync_devices_from_traccar(), status=status.HTTP_200_OK)
+        if not user.organization_id:
+            return Response({'status': 'skipped', 'reason': 'no_organization'}, status=status.HTTP_200_OK)
+
+        with shard_lock(user.organization_id) as acquired:
+            if not acquired:
+                return Response({'status': 'skipped', 'reason': 'sync_in_progress'}, status=status.HTTP_200_OK)
+            result = sync_devices_from_traccar(user.organization_id)
         return Response(result, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'], url_path='status-counts', permission_classes=[permissions.IsAuthenticated])
+    def status_counts(self, request):
+        """
+        Vehicles per computed_status for the user's organization (superusers:
+        ?organization= or the whole fleet), counted in SQL.
+        """
+        queryset = self._organization_scope(Vehicle.objects.all())
+        counts = {status_value: 0 for status_value, _ in VEHICLE_STATUS_CHOICES}
+        for row in queryset.order_by().values('computed_status').annotate(total=Count('id')):
+            counts[row['computed_status']] = row['total']
+        counts['total'] = sum(counts.values())
+        return Response(counts, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='alerts', permission_classes=[permissions.IsAuthenticated])
     def alerts(self, request):
         user = request.user
@@ -117,6 +215,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
     # ACTION: Get History for Playback
     # GET /api/vehicles/1/history/?date=2025-12-13
+    # Cursor pages of the day's fixes, oldest first (follow `next`).
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
         vehicle = self.get_object()
@@ -141,28 +240,104 @@ class VehicleViewSet(viewsets.ModelViewSet):
         positions = VehiclePosition.objects.filter(
             vehicle=vehicle,
             timestamp__range=(start_of_day, end_of_day)
-        ).order_by('timestamp')
+        )
 
-        serializer = VehiclePositionSerializer(positions, many=True)
-        return Response(serializer.data)
+        paginator = PositionCursorPagination()
+        page = paginator.paginate_queryset(positions, request, view=self)
+        serializer = VehiclePositionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class TripViewSet(viewsets.ModelViewSet):
+    """
+    Lists are cursor pages, newest first. Filters: ?status=PLANNED,OTW,
+    ?driver=<id>, ?q= (surat jalan number, origin, destination or driver).
+    """
     serializer_class = TripSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = TripCursorPagination
 
     def get_queryset(self):
-        return Trip.objects.all()
+        # Join/prefetch every relation the serializers read so lists stay at a fixed query count.
+        queryset = Trip.objects.select_related('vehicle', 'driver', 'customer', 'origin_location')
+        if self.action == 'list':
+            return self._filter(queryset).prefetch_related('customers')
+        return queryset.prefetch_related('customers', 'delivery_proofs')
+
+    def _filter(self, queryset):
+        params = self.request.query_params
+        statuses = [value.strip().upper() for value in params.get('status', '').split(',') if value.strip()]
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+        if params.get('driver'):
+            queryset = queryset.filter(driver_id=params['driver'])
+        search = params.get('q', '').strip()
+        if search:
+            queryset = queryset.filter(
+                Q(surat_jalan_number__icontains=search) | Q(origin__icontains=search)
+                | Q(destination__icontains=search) | Q(driver__username__icontains=search)
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return TripListSerializer
+        return TripSerializer
 
     def perform_create(self, serializer):
         serializer.save()
 
+    @action(detail=False, methods=['get'], url_path='status-counts')
+    def status_counts(self, request):
+        """
+        Trips per status (same filters as the list), counted in SQL so
+        dashboards do not page through every trip.
+        """
+        queryset = self._filter(Trip.objects.all())
+        counts = {status_value: 0 for status_value, _ in Trip.STATUS_CHOICES}
+        for row in queryset.order_by().values('status').annotate(total=Count('id')):
+            counts[row['status']] = row['total']
+        counts['total'] = sum(counts.values())
+        return Response(counts, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='next-surat-number')
     def next_surat_number(self, request):
         """
-        Provide the next Surat Jalan number so the frontend can prefill while keeping numbers unique.
+        Provide the next Surat Jalan number so the frontend can prefill. Only a preview:
+        the number is reserved when the trip is saved without one.
         """
-        return Response({'next_surat_jalan_number': generate_surat_number()})
+        return Response({'next_surat_jalan_number': preview_surat_number()})
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_dispatch(self, request):
+        """
+        Create many trips at once: {"trips": [{...}, ...]} with the same fields
+        as a single POST. Nothing is created unless every row is valid;
+        ``errors`` lists the problems per row, in request order.
+        """
+        rows = request.data.get('trips') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "trips must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > BULK_DISPATCH_LIMIT:
+            return Response(
+                {"error": f"At most {BULK_DISPATCH_LIMIT} trips per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user = request.user if request.user.is_authenticated else None
+        trips, errors = dispatch_trips(
+            rows,
+            context=self.get_serializer_context(),
+            user=user,
+            ip_address=request.META.get('REMOTE_ADDR'),
+        )
+        if not trips:
+            return Response({"created": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset().prefetch_related(None).prefetch_related('customers')
+        created = queryset.filter(id__in=[trip.id for trip in trips]).order_by('id')
+        serializer = TripListSerializer(created, many=True, context=self.get_serializer_context())
+        return Response({"created": len(trips), "results": serializer.data}, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['get'], url_path='surat-history')
     def surat_history(self, request, pk=None):
@@ -260,23 +435,23 @@ class TripViewSet(viewsets.ModelViewSet):
         return Response(TripSerializer(trip).data, status=status.HTTP_200_OK)
 
     def _notify_trip_completed(self, trip):
-        org_users = User.objects.filter(organization=trip.organization, role__in=['OWNER', 'ADMIN'])
-        message = f"Trip {trip.surat_jalan_number or trip.id} completed."
-        for u in org_users:
-            Notification.objects.create(user=u, message=message)
+        notify_trip_completed(trip.organization_id, trip.surat_jalan_number or trip.id)
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(OrganizationCachedListMixin, viewsets.ModelViewSet):
     serializer_class = CustomerSerializer
+    cache_resource = 'customer'
     permission_classes = [permissions.AllowAny]
     queryset = Customer.objects.all()
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(OrganizationCachedListMixin, viewsets.ModelViewSet):
     serializer_class = RouteSerializer
+    cache_resource = 'route'
     permission_classes = [permissions.AllowAny]
     queryset = Route.objects.all()
 
-class OriginViewSet(viewsets.ModelViewSet):
+class OriginViewSet(OrganizationCachedListMixin, viewsets.ModelViewSet):
     serializer_class = OriginSerializer
+    cache_resource = 'origin'
     permission_classes = [permissions.AllowAny]
     queryset = Origin.objects.all()
 
@@ -293,29 +468,100 @@ class UserViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save()
 
-class DriverViewSet(viewsets.ReadOnlyModelViewSet):
+class DriverViewSet(OrganizationCachedListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.filter(role='DRIVER')
     serializer_class = UserSerializer 
+    cache_resource = 'driver'
     permission_classes = [permissions.AllowAny]
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationCursorPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        return Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        # Polling clients send If-None-Match; unchanged feeds short-circuit before any query.
+        etag = build_list_etag(request.user.id, request.get_full_path())
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({"unread": get_unread_count(request.user)}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], url_path='mark-read')
     def mark_read(self, request):
         notif_id = request.data.get('id')
-        qs = Notification.objects.filter(user=request.user)
+        qs = Notification.objects.filter(user=request.user, is_read=False)
         if notif_id:
             qs = qs.filter(id=notif_id)
         updated = qs.update(is_read=True)
+        record_notifications_read(request.user.id, updated, all_read=not notif_id)
         return Response({"updated": updated}, status=status.HTTP_200_OK)
 
+class NearbyPlacesView(APIView):
+    """
+    GET /api/nearby/?lat=&lon=[&k=5][&radius=<m>][&type=customer|origin]
+    k nearest customers/origins of the caller's organization; with radius, every
+    place within that many meters (nearest first, at most `limit`, default 100;
+    radius is capped at MAX_RADIUS). Super admins pass ?organization=<id>.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_K = 50
+    MAX_LIMIT = 500
+    MAX_RADIUS = 50000  # meters; bounds how many grid cells a radius query walks
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            lat = float(params['lat'])
+            lon = float(params['lon'])
+            k = min(int(params.get('k', 5)), self.MAX_K)
+            radius = float(params['radius']) if params.get('radius') else None
+            limit = min(int(params.get('limit', 100)), self.MAX_LIMIT)
+            organization = int(params['organization']) if params.get('organization') else None
+        except (KeyError, ValueError):
+            return Response({"error": "lat and lon are required; k, radius, limit and organization must be numbers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return Response({"error": "lat/lon out of range"}, status=status.HTTP_400_BAD_REQUEST)
+        if radius is not None:
+            if not radius > 0:
+                return Response({"error": "radius must be a positive number"}, status=status.HTTP_400_BAD_REQUEST)
+            radius = min(radius, self.MAX_RADIUS)
+
+        kind = params.get('type')
+        if kind and kind not in ('customer', 'origin'):
+            return Response({"error": "type must be customer or origin"}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = {kind} if kind else None
+
+        user = request.user
+        organization_id = user.organization_id
+        if user.is_superuser and organization:
+            organization_id = organization
+        if not organization_id:
+            return Response([], status=status.HTTP_200_OK)
+
+        index = get_place_index(organization_id)
+        if radius is not None and 'k' not in params:
+            results = index.within(lat, lon, radius, kinds=kinds, limit=limit)
+        else:
+            results = index.nearest(lat, lon, k=k, kinds=kinds, max_distance_m=radius)
+        return Response(results, status=status.HTTP_200_OK)
+
 # THE BRIDGE (Traccar -> Django)
+# The traccar_socket management command is the primary ingest path; this
+# webhook stays for Traccar's position forwarding and manual testing.
 class GPSForwardView(APIView):
     permission_classes = [] 
 
@@ -328,64 +574,16 @@ class GPSForwardView(APIView):
         speed = request.query_params.get('speed') # Knots usually
         
         if traccar_id and lat and lon:
-            try:
-                vehicle = Vehicle.objects.get(gps_device_id=traccar_id)
-                vehicle.last_latitude = float(lat)
-                vehicle.last_longitude = float(lon)
-                
-                heading_val = 0.0
-                if course:
-                    heading_val = float(course)
-                    vehicle.last_heading = heading_val
-                
-                speed_val = 0.0
-                if speed:
-                    speed_val = float(speed) * 1.852
-                    vehicle.last_speed = speed_val
- 
-                now = timezone.now()
-                if speed_val <= STOP_SPEED_THRESHOLD:
-                    if not vehicle.stopped_since:
-                        vehicle.stopped_since = now
-                else:
-                    if vehicle.stopped_since:
-                        # EVENT: STOP ENDED
-                        duration = (now - vehicle.stopped_since).total_seconds() / 60.0
-                        if duration >= 1: # Minimum 1 minute stop
-                            VehicleEvent.objects.create(
-                                vehicle=vehicle,
-                                event_type='STOP',
-                                start_time=vehicle.stopped_since,
-                                end_time=now,
-                                duration_minutes=round(duration, 2),
-                                latitude=vehicle.last_latitude,
-                                longitude=vehicle.last_longitude
-                            )
-                    vehicle.stopped_since = None
-
-                vehicle.last_gps_sync = now
-                if vehicle.device_status != 'ONLINE':
-                    vehicle.device_status = 'ONLINE'
-                    vehicle.device_status_changed_at = now
-                vehicle.save()
-
-                # SAVE HISTORY
-                VehiclePosition.objects.create(
-                    vehicle=vehicle,
-                    latitude=float(lat),
-                    longitude=float(lon),
-                    speed=speed_val,
-                    heading=heading_val,
-                    ignition=vehicle.last_ignition # Assume unchanged for GET
-                )
-
-                if vehicle.stopped_since:
-                    stop_minutes = (now - vehicle.stopped_since).total_seconds() / 60
-                    notify_vehicle_event(vehicle, 'VEHICLE_STOP', vehicle.stopped_since, stop_minutes)
-
-                return Response({"status": "Updated"}, status=status.HTTP_200_OK)
-            except Vehicle.DoesNotExist:
+            updated = ingest_positions([{
+                'uniqueId': traccar_id,
+                'latitude': lat,
+                'longitude': lon,
+                'speed': speed or 0,
+                'course': course or None,
+            }])
+            if not updated:
                 return Response({"status": "Ignored"}, status=status.HTTP_200_OK)
+            return Response({"status": "Updated"}, status=status.HTTP_200_OK)
         
         return Response({"status": "Ready"}, status=status.HTTP_200_OK)
     
@@ -397,303 +595,178 @@ class GPSForwardView(APIView):
         position_data = data.get('position', {})
         
         if not device_data:
-            traccar_id = data.get('uniqueId')
-            lat = data.get('latitude')
-            lon = data.get('longitude')
-            speed = data.get('speed')
-            attributes = data.get('attributes', {})
-            course = data.get('course')
+            fix = dict(data)
         else:
-            traccar_id = device_data.get('uniqueId')
-            lat = position_data.get('latitude')
-            lon = position_data.get('longitude')
-            speed = position_data.get('speed') # Knots
-            course = position_data.get('course')
-            attributes = position_data.get('attributes', {})
+            fix = dict(position_data, uniqueId=device_data.get('uniqueId'))
 
+        traccar_id = fix.get('uniqueId')
         if not traccar_id:
              return Response({"error": "No device ID"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            vehicle = Vehicle.objects.get(gps_device_id=traccar_id)
-            
-            # Prepare values
-            lat_val = float(lat) if lat else vehicle.last_latitude
-            lon_val = float(lon) if lon else vehicle.last_longitude
-            speed_val = (float(speed) * 1.852) if speed is not None else vehicle.last_speed
-            heading_val = float(course) if course is not None else vehicle.last_heading
-            ignition_val = attributes.get('ignition', vehicle.last_ignition)
-
-            # Update Vehicle State
-            if lat and lon:
-                vehicle.last_latitude = lat_val
-                vehicle.last_longitude = lon_val
-            
-            vehicle.last_speed = speed_val
-            vehicle.last_heading = heading_val
-            vehicle.last_ignition = ignition_val
-            
-            now = timezone.now()
-            
-            # 1. OFFLINE CHECK
-            if vehicle.last_gps_sync:
-                offline_duration = (now - vehicle.last_gps_sync).total_seconds() / 60.0
-                offline_threshold = vehicle.user.offline_alert_minutes if (hasattr(vehicle, 'user') and vehicle.user) else DEFAULT_OFFLINE_MINUTES
-                
-                # Check user config or fallback to Organization OWNER config if available, else Default
-                # Assuming vehicle.organization -> get owner
-                if not hasattr(vehicle, 'user') or not vehicle.user:
-                     org_owner = User.objects.filter(organization=vehicle.organization, role='OWNER').first()
-                     if org_owner:
-                         offline_threshold = org_owner.offline_alert_minutes
-                
-                if offline_duration >= offline_threshold:
-                     VehicleEvent.objects.create(
-                        vehicle=vehicle,
-                        event_type='OFFLINE',
-                        start_time=vehicle.last_gps_sync,
-                        end_time=now,
-                        duration_minutes=round(offline_duration, 2),
-                        latitude=vehicle.last_latitude,
-                        longitude=vehicle.last_longitude
-                     )
-
-            # 2. STOP CHECK
-            if speed_val <= STOP_SPEED_THRESHOLD:
-                if not vehicle.stopped_since:
-                    vehicle.stopped_since = now
-            else:
-                if vehicle.stopped_since:
-                    duration = (now - vehicle.stopped_since).total_seconds() / 60.0
-                    if duration >= 1:
-                        VehicleEvent.objects.create(
-                            vehicle=vehicle,
-                            event_type='STOP',
-                            start_time=vehicle.stopped_since,
-                            end_time=now,
-                            duration_minutes=round(duration, 2),
-                            latitude=vehicle.last_latitude,
-                            longitude=vehicle.last_longitude
-                        )
-                vehicle.stopped_since = None
-            
-            vehicle.last_gps_sync = now
-            if vehicle.device_status != 'ONLINE':
-                vehicle.device_status = 'ONLINE'
-                vehicle.device_status_changed_at = now
-            
-            if 'totalDistance' in attributes:
-                vehicle.current_odometer = int(attributes['totalDistance'] / 1000)
-
-            vehicle.save() 
-            
-            # SAVE HISTORY
-            if lat and lon:
-                VehiclePosition.objects.create(
-                    vehicle=vehicle,
-                    latitude=lat_val,
-                    longitude=lon_val,
-                    speed=speed_val,
-                    heading=heading_val,
-                    ignition=ignition_val
-                )
-
-            if vehicle.stopped_since:
-                stop_minutes = (now - vehicle.stopped_since).total_seconds() / 60
-                notify_vehicle_event(vehicle, 'VEHICLE_STOP', vehicle.stopped_since, stop_minutes)
-
-            return Response({"status": "Updated"}, status=status.HTTP_200_OK)
-            
-        except Vehicle.DoesNotExist:
+        updated = ingest_positions([fix])
+        if not updated:
             print(f"⚠️ Unknown Device: {traccar_id}")
             return Response({"status": "Ignored"}, status=status.HTTP_200_OK)
+        return Response({"status": "Updated"}, status=status.HTTP_200_OK)
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ActivityLogCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return ActivityLog.objects.all()
+            return ActivityLog.objects.select_related('user')
         if not user.is_authenticated or not user.organization_id:
             return ActivityLog.objects.none()
         if user.role in ['OWNER', 'ADMIN']:
-            return ActivityLog.objects.filter(
-                Q(user__organization=user.organization) |
-                Q(details__organization_id=user.organization_id)
-            )
+            return ActivityLog.objects.filter(organization_id=user.organization_id).select_related('user')
         return ActivityLog.objects.none()
 
+class GeofenceDwellViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Completed geofence visits (see core.services.dwell).
+    Filters: ?customer=, ?origin=, ?vehicle=, ?place_type=, ?start_date=, ?end_date=.
+    /by-customer/ and /by-origin/ return the average dwell per place, /monthly/
+    the average per month.
+    """
+    serializer_class = GeofenceDwellSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = GeofenceDwellCursorPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = GeofenceDwell.objects.filter(exited_at__isnull=False).select_related('vehicle', 'customer', 'origin')
+        if not user.is_superuser:
+            if not user.organization_id or user.role not in ['OWNER', 'ADMIN']:
+                return queryset.none()
+            queryset = queryset.filter(organization_id=user.organization_id)
+
+        params = self.request.query_params
+        for field in ('customer', 'origin', 'vehicle'):
+            if params.get(field):
+                queryset = queryset.filter(**{f"{field}_id": params[field]})
+        if params.get('place_type'):
+            queryset = queryset.filter(place_type=params['place_type'].upper())
+        try:
+            # parse_date returns None for a malformed value and raises for an impossible one (2024-13-45).
+            start_date = parse_date(params.get('start_date') or '')
+            end_date = parse_date(params.get('end_date') or '')
+        except ValueError:
+            start_date = end_date = None
+        if (params.get('start_date') and not start_date) or (params.get('end_date') and not end_date):
+            return Response({'error': 'start_date and end_date must be dates (YYYY-MM-DD)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start_date:
+            queryset = queryset.filter(entered_at__date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(entered_at__date__lte=end_date)
+        return queryset
+
+    def _summary(self, queryset, *group_by):
+        return list(
+            queryset.order_by().values(*group_by).annotate(
+                visits=Count('id'),
+                avg_dwell_minutes=Avg('duration_minutes'),
+                max_dwell_minutes=Max('duration_minutes'),
+                total_dwell_minutes=Sum('duration_minutes'),
+            ).order_by('-avg_dwell_minutes')
+        )
+
+    @action(detail=False, methods=['get'], url_path='by-customer')
+    def by_customer(self, request):
+        queryset = self.get_queryset().filter(place_type='CUSTOMER')
+        return Response(self._summary(queryset, 'customer_id', 'customer__name'), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='by-origin')
+    def by_origin(self, request):
+        queryset = self.get_queryset().filter(place_type='ORIGIN')
+        return Response(self._summary(queryset, 'origin_id', 'origin__name'), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='monthly')
+    def monthly(self, request):
+        queryset = self.get_queryset().annotate(month=TruncMonth('entered_at'))
+        rows = self._summary(queryset, 'month', 'place_type')
+        rows.sort(key=lambda row: (row['month'], row['place_type']))
+        for row in rows:
+            row['month'] = row['month'].strftime('%Y-%m') if row['month'] else None
+        return Response(rows, status=status.HTTP_200_OK)
+
+class LogArchiveViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Archived ActivityLog/DeviceLog files written by the retention job
+    (see core.services.log_archive). /search/ scans them:
+    ?kind=activity|device, ?start_date=, ?end_date=, ?q= (free text),
+    ?action= (activity), ?vehicle= / ?status= (device), ?limit= (max 1000).
+    """
+    serializer_class = LogArchiveSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = LogArchive.objects.all()
+        if user.is_superuser:
+            organization_id = self.request.query_params.get('organization')
+            if not organization_id:
+                return queryset
+            if not organization_id.isdigit():
+                raise ValidationError({'error': 'organization must be an integer'})
+            return queryset.filter(organization_id=organization_id)
+        if not user.organization_id or user.role not in ['OWNER', 'ADMIN']:
+            return queryset.none()
+        return queryset.filter(organization_id=user.organization_id)
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        params = request.query_params
+        kind = (params.get('kind') or 'activity').upper()
+        if kind not in dict(LogArchive.KIND_CHOICES):
+            return Response({'error': 'kind must be activity or device'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(params.get('limit', 200)), 1000)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # parse_date returns None for a malformed value and raises for an impossible one (2024-13-45).
+            start_date = parse_date(params.get('start_date') or '')
+            end_date = parse_date(params.get('end_date') or '')
+        except ValueError:
+            start_date = end_date = None
+        if (params.get('start_date') and not start_date) or (params.get('end_date') and not end_date):
+            return Response({'error': 'start_date and end_date must be dates (YYYY-MM-DD)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        start = timezone.make_aware(datetime.combine(start_date, time.min)) if start_date else None
+        end = timezone.make_aware(datetime.combine(end_date, time.max)) if end_date else None
+
+        archives = self.get_queryset().filter(kind=kind)
+        if start_date:
+            archives = archives.filter(month__gte=start_date.replace(day=1))
+        if end_date:
+            archives = archives.filter(month__lte=end_date)
+
+        filter_params = ('action',) if kind == 'ACTIVITY' else ('vehicle', 'status')
+        filters = {field: params[field] for field in filter_params if params.get(field)}
+        if 'vehicle' in filters:
+            filters['vehicle_id'] = filters.pop('vehicle')
+
+        results = search_archives(
+            archives.order_by('-last_at'), start=start, end=end, text=params.get('q'), filters=filters, limit=limit,
+        )
+        return Response({'count': len(results), 'results': results}, status=status.HTTP_200_OK)
+
 class TraccarEventView(APIView):
     permission_classes = [] # Allow internal calls
 
     def post(self, request):
         try:
-            event = request.data.get('event', {})
-            device = request.data.get('device', {})
-            
-            if not event or not device:
-                return Response({'status': 'ignored'}, status=status.HTTP_200_OK)
-
-            traccar_id = device.get('uniqueId')
-            event_type = event.get('type')
-            server_time = event.get('eventTime') or event.get('serverTime') # Traccar timestamp
-            event_time = parse_datetime(server_time) if server_time else None
-            if not event_time:
-                event_time = timezone.now()
-
-            if not traccar_id:
-                 return Response({'status': 'no device id'}, status=status.HTTP_200_OK)
-
-            try:
-                vehicle = Vehicle.objects.get(gps_device_id=traccar_id)
-            except Vehicle.DoesNotExist:
-                return Response({'status': 'unknown vehicle'}, status=status.HTTP_200_OK)
-
-            # Handle OFFLINE
-            if event_type == 'deviceOffline':
-                vehicle.device_status = 'OFFLINE'
-                vehicle.device_status_changed_at = event_time
-                vehicle.save(update_fields=['device_status', 'device_status_changed_at'])
-                # Create Event Record
-                VehicleEvent.objects.create(
-                    vehicle=vehicle,
-                    event_type='OFFLINE',
-                    start_time=event_time, # Approximate start
-                    end_time=event_time, # Placeholder
-                    duration_minutes=0, # Unknown yet
-                    latitude=vehicle.last_latitude,
-                    longitude=vehicle.last_longitude
-                )
-                
-                # Log Activity
-                ActivityLog.objects.create(
-                    action='VEHICLE_OFFLINE',
-                    details={
-                        'organization_id': vehicle.organization_id,
-                        'vehicle': vehicle.license_plate,
-                        'vehicle_id': vehicle.id,
-                        'event_time': event_time.isoformat(),
-                    },
-                    user=None # System
-                )
-                
-                # Notify User
-                notify_vehicle_event(vehicle, 'VEHICLE_OFFLINE', timezone.now(), 0)
-
-            # Handle ONLINE
-            elif event_type == 'deviceOnline':
-                vehicle.device_status = 'ONLINE'
-                vehicle.device_status_changed_at = event_time
-                vehicle.save(update_fields=['device_status', 'device_status_changed_at'])
-                # Log Activity
-                ActivityLog.objects.create(
-                    action='VEHICLE_ONLINE',
-                    details={
-                        'organization_id': vehicle.organization_id,
-                        'vehicle': vehicle.license_plate,
-                        'vehicle_id': vehicle.id,
-                        'event_time': event_time.isoformat(),
-                    },
-                    user=None
-                )
-                
-                # Close any open OFFLINE events? 
-                # (Complex logic omitted for simplicity, but we log the return)
-            # Handle GEOFENCE ENTER/EXIT (Notifications + optional auto-arrival)
-            elif event_type in ['geofenceEnter', 'geofenceExit']:
-                geofence_id = event.get('geofenceId')
-                if not geofence_id:
-                    return Response({'status': 'ignored', 'reason': 'no_geofence_id'}, status=status.HTTP_200_OK)
-
-                origin = Origin.objects.filter(traccar_id=geofence_id).first()
-                customer = None
-                geofence_type = None
-                geofence_name = None
-                geofence_ref_id = None
-
-                if origin:
-                    geofence_type = 'origin' if origin.is_origin else 'drop'
-                    geofence_name = origin.name
-                    geofence_ref_id = origin.id
-                else:
-                    customer = Customer.objects.filter(traccar_id=geofence_id).first()
-                    if customer:
-                        geofence_type = 'customer'
-                        geofence_name = customer.name
-                        geofence_ref_id = customer.id
-
-                if not geofence_type:
-                    return Response({'status': 'ignored', 'reason': 'unknown_geofence'}, status=status.HTTP_200_OK)
-
-                action_label = 'entered' if event_type == 'geofenceEnter' else 'exited'
-                category = 'GEOFENCE_ENTER' if event_type == 'geofenceEnter' else 'GEOFENCE_EXIT'
-                geofence_label = geofence_type.capitalize()
-                message = f"Vehicle {vehicle.license_plate} {action_label} {geofence_label} geofence {geofence_name}."
-                event_key = event.get('id') or int(event_time.timestamp())
-                alert_key = f"{category}:{vehicle.id}:{geofence_id}:{event_key}"
-                watchers = User.objects.filter(
-                    organization=vehicle.organization,
-                    role__in=['OWNER', 'ADMIN'],
-                )
-
-                for watcher in watchers:
-                    if Notification.objects.filter(user=watcher, alert_key=alert_key).exists():
-                        continue
-                    Notification.objects.create(
-                        user=watcher,
-                        message=message,
-                        category=category,
-                        reference_id=str(geofence_id),
-                        alert_key=alert_key,
-                    )
-
-                ActivityLog.objects.create(
-                    action=category,
-                    details={
-                        'organization_id': vehicle.organization_id,
-                        'vehicle_id': vehicle.id,
-                        'vehicle': vehicle.license_plate,
-                        'geofence_id': geofence_id,
-                        'geofence_ref_id': geofence_ref_id,
-                        'geofence_name': geofence_name,
-                        'geofence_type': geofence_type,
-                        'event_time': event_time.isoformat(),
-                    },
-                    user=None,
-                    ip_address=request.META.get('REMOTE_ADDR')
-                )
-
-                if event_type == 'geofenceEnter' and origin and origin.is_origin:
-                    active_statuses = ['PLANNED', 'OTW']
-                    trip = Trip.objects.filter(
-                        vehicle=vehicle,
-                        status__in=active_statuses,
-                        origin_location=origin
-                    ).order_by('created_at').first()
-
-                    if trip:
-                        previous_status = trip.status
-                        if previous_status != 'ARRIVED':
-                            trip.status = 'ARRIVED'
-                            trip.save(update_fields=['status'])
-
-                        ActivityLog.objects.create(
-                            action='TRIP_ARRIVED_AUTO',
-                            details={
-                                'organization_id': vehicle.organization_id,
-                                'trip_id': trip.id,
-                                'vehicle': vehicle.license_plate,
-                                'origin': origin.name,
-                                'previous_status': previous_status,
-                                'message': f"Auto-detected arrival at {origin.name}",
-                            },
-                            user=None,
-                            ip_address=request.META.get('REMOTE_ADDR')
-                        )
-                
-            return Response({'status': 'processed'}, status=status.HTTP_200_OK)
+            result = handle_traccar_event(
+                request.data.get('event', {}),
+                request.data.get('device', {}),
+                ip_address=request.META.get('REMOTE_ADDR'),
+            )
+            return Response(result, status=status.HTTP_200_OK)
 
         except Exception as e:
             print(f"Traccar Event Error: {e}")
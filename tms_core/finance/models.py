@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from core.models import Customer, Organization
+from core.services.numbering import generate_invoice_number
 
 
 class Invoice(models.Model):
@@ -24,27 +25,9 @@ class Invoice(models.Model):
         return self.invoice_number or f"Invoice #{self.id}"
 
     def save(self, *args, **kwargs):
-        if not self.invoice_number:
-            self.invoice_number = self._generate_invoice_number()
-        super().save(*args, **kwargs)
-
-    @classmethod
-    def _generate_invoice_number(cls, for_date=None):
-        """
-        Format: INV-YYYY### (e.g., INV-2025001).
-        """
-        invoice_date = for_date or timezone.localdate()
-        prefix = f"INV-{invoice_date.year}"
-
-        last_invoice = (
-            cls.objects.filter(invoice_number__startswith=prefix)
-            .order_by('-created_at', '-id')
-            .first()
-        )
-        next_seq = 1
-        if last_invoice and last_invoice.invoice_number:
-            suffix = last_invoice.invoice_number.replace(prefix, '')
-            if suffix.isdigit():
-                next_seq = int(suffix) + 1
-
-        return f"{prefix}{next_seq:03d}"
+        if self.invoice_number:
+            return super().save(*args, **kwargs)
+        # Reserve the number in the insert's transaction so a failed save releases it.
+        with transaction.atomic():
+            self.invoice_number = generate_invoice_number()
+            super().save(*args, **kwargs)
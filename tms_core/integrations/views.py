@@ -4,6 +4,7 @@ from rest_framework import status, permissions
 from django.conf import settings
 from core.models import Vehicle, VehicleEvent, ActivityLog, DeviceLog
 from core.services.alerts import notify_vehicle_event
+from core.services.fleet import broadcast_vehicle_states
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 
@@ -64,6 +65,7 @@ class TraccarWebhookView(APIView):
 
             if update_fields:
                 vehicle.save(update_fields=update_fields)
+                broadcast_vehicle_states([vehicle])
 
             if status_changed:
                 DeviceLog.objects.create(
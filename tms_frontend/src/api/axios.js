@@ -24,6 +24,41 @@ const refreshAccessToken = async () => {
   return accessToken;
 };
 
+// Concurrent callers share one refresh request.
+export const refreshSession = () => {
+  if (!isRefreshing) {
+    isRefreshing = true;
+    refreshPromise = refreshAccessToken().finally(() => {
+      isRefreshing = false;
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
+const TOKEN_EXPIRY_MARGIN_MS = 30000;
+
+const tokenExpiresSoon = (token) => {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+    return !payload.exp || payload.exp * 1000 < Date.now() + TOKEN_EXPIRY_MARGIN_MS;
+  } catch (err) {
+    return false;
+  }
+};
+
+// Access token for query-string auth (EventSource, WebSocket), refreshed first
+// when it is about to expire. Resolves to null when logged out or refresh fails.
+export const getFreshAccessToken = async () => {
+  const token = localStorage.getItem('token');
+  if (!token || !tokenExpiresSoon(token)) return token;
+  try {
+    return await refreshSession();
+  } catch (err) {
+    return null;
+  }
+};
+
 // Interceptor to attach Auth Token
 api.interceptors.request.use(
   (config) => {
@@ -67,14 +102,7 @@ api.interceptors.response.use(
         if (refreshToken && config && !config._retry) {
           config._retry = true;
           try {
-            if (!isRefreshing) {
-              isRefreshing = true;
-              refreshPromise = refreshAccessToken().finally(() => {
-                isRefreshing = false;
-                refreshPromise = null;
-              });
-            }
-            const newAccessToken = await refreshPromise;
+            const newAccessToken = await refreshSession();
             config.headers = {
               ...(config.headers || {}),
               Authorization: `Bearer ${newAccessToken}`,
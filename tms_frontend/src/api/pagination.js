@@ -0,0 +1,27 @@
+import api from './axios';
+
+// Trips, vehicle position history, dwells, notifications and logs return
+// cursor pages ({ next, previous, results }); master data (vehicles,
+// drivers, customers, ...) is a plain array. fetchPage loads one page and
+// resolves to { rows, next }; pass `next` back as the url to continue.
+export const fetchPage = async (url, config = {}) => {
+  const response = await api.get(url, config);
+  if (Array.isArray(response.data)) return { rows: response.data, next: null };
+  return { rows: response.data?.results || [], next: response.data?.next || null };
+};
+
+// Follows `next` until the collection is complete and resolves like api.get,
+// with the rows in `data`. Only for sets kept small by their filter (e.g.
+// ?status=PLANNED or one driver's active trips); screens over a whole table
+// page with fetchPage instead.
+export const fetchAll = async (url, config = {}) => {
+  let response = await api.get(url, config);
+  if (Array.isArray(response.data)) return response;
+
+  const rows = [...(response.data?.results || [])];
+  while (response.data?.next) {
+    response = await api.get(response.data.next);
+    rows.push(...(response.data?.results || []));
+  }
+  return { ...response, data: rows };
+};
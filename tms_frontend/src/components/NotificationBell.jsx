@@ -1,15 +1,15 @@
 import React, { useEffect, useState } from 'react';
 import { Bell } from 'lucide-react';
 import api from '../api/axios';
+import { openEventStream } from '../utils/eventStream';
 
 const NotificationBell = () => {
   const [unread, setUnread] = useState(0);
 
   const fetchNotifications = async () => {
     try {
-      const res = await api.get('notifications/');
-      const count = (res.data || []).filter((n) => !n.is_read).length;
-      setUnread(count);
+      const res = await api.get('notifications/unread-count/');
+      setUnread(res.data?.unread || 0);
     } catch (err) {
       console.error('Failed to load notifications', err);
     }
@@ -26,8 +26,16 @@ const NotificationBell = () => {
 
   useEffect(() => {
     fetchNotifications();
-    const interval = setInterval(fetchNotifications, 15000);
-    return () => clearInterval(interval);
+    // Polls only while the stream is down.
+    const closeStream = openEventStream(
+      {
+        notification: (notif) => {
+          if (!notif.is_read) setUnread((count) => count + 1);
+        },
+      },
+      { poll: fetchNotifications, pollMs: 15000 },
+    );
+    return closeStream;
   }, []);
 
   return (
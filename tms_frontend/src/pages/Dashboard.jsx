@@ -1,5 +1,6 @@
-import React, { useEffect, useState, useCallback, useMemo, useRef } from 'react';
+import React, { useEffect, useState, useCallback, useMemo } from 'react';
 import api from '../api/axios';
+import { fetchPage } from '../api/pagination';
 import { Truck, MapPin, DollarSign, Users, Activity } from 'lucide-react';
 import { MapContainer, TileLayer, Marker, Popup, Circle, CircleMarker, Rectangle, Tooltip } from 'react-leaflet';
 import L from 'leaflet';
@@ -7,7 +8,7 @@ import 'leaflet/dist/leaflet.css';
 import { useAuth } from '../context/AuthContext';
 import DriverDashboard from './DriverDashboard';
 import VehicleAlertsPanel from '../components/VehicleAlertsPanel';
-import { startTraccarSocket } from '../utils/traccarSocket';
+import { openFleetSocket, applyFleetDeltas } from '../utils/fleetSocket';
 
 // Fix icons
 import icon from 'leaflet/dist/images/marker-icon.png';
@@ -118,7 +119,6 @@ const Dashboard = () => {
   const [vehicleUpdatedAt, setVehicleUpdatedAt] = useState(null);
   const [mapInstance, setMapInstance] = useState(null);
   const [socketStatus, setSocketStatus] = useState('connecting');
-  const deviceIdLookupRef = useRef({});
 
   const loadVehicles = useCallback(async () => {
     try {
@@ -168,14 +168,6 @@ const Dashboard = () => {
     loadCustomers();
   }, [loadVehicles, syncWithTraccar, loadOrigins, loadCustomers]);
 
-  const mapTraccarStatus = useCallback((rawStatus) => {
-    if (!rawStatus) return 'UNKNOWN';
-    const normalized = rawStatus.toString().toLowerCase();
-    if (normalized === 'online') return 'ONLINE';
-    if (normalized === 'offline') return 'OFFLINE';
-    return 'UNKNOWN';
-  }, []);
-
   const deriveGpsStatus = useCallback((vehicle) => {
     const direct = (vehicle.device_status || '').toUpperCase();
     if (direct === 'ONLINE' || direct === 'OFFLINE') return direct;
@@ -191,86 +183,27 @@ const Dashboard = () => {
     return (vehicle.computed_status || direct || 'UNKNOWN').toUpperCase();
   }, [offlineThresholdMinutes]);
 
-  const applyDeviceUpdates = useCallback((devicesPayload) => {
-    if (!devicesPayload || !Array.isArray(devicesPayload)) return;
-    setVehicles(prev => {
-      const updated = [...prev];
-      devicesPayload.forEach(dev => {
-        if (dev.id && dev.uniqueId) {
-          deviceIdLookupRef.current[dev.id] = dev.uniqueId;
-        }
-        if (!dev.uniqueId) return;
-        const idx = updated.findIndex(v => String(v.gps_device_id) === String(dev.uniqueId));
-        if (idx !== -1) {
-          const mappedStatus = mapTraccarStatus(dev.status);
-          updated[idx] = {
-            ...updated[idx],
-            device_status: mappedStatus,
-            computed_status: mappedStatus === 'OFFLINE' ? 'OFFLINE' : updated[idx].computed_status,
-            last_gps_sync: dev.lastUpdate || updated[idx].last_gps_sync,
-          };
-        }
-      });
-      return updated;
-    });
-    setVehicleUpdatedAt(new Date());
-  }, [mapTraccarStatus]);
-
-  const applyPositionUpdates = useCallback((positionsPayload) => {
-    if (!positionsPayload || !Array.isArray(positionsPayload)) return;
-    setVehicles(prev => {
-      const updated = [...prev];
-      positionsPayload.forEach(pos => {
-        const uniqueId = deviceIdLookupRef.current[pos.deviceId] || pos.uniqueId;
-        if (!uniqueId) return;
-        const idx = updated.findIndex(v => String(v.gps_device_id) === String(uniqueId));
-        if (idx === -1) return;
-        const kmh = (pos.speed || 0) * 1.852;
-        updated[idx] = {
-          ...updated[idx],
-          last_latitude: pos.latitude ?? updated[idx].last_latitude,
-          last_longitude: pos.longitude ?? updated[idx].last_longitude,
-          last_speed: kmh,
-          last_heading: pos.course ?? updated[idx].last_heading,
-          last_ignition: pos.attributes?.ignition ?? updated[idx].last_ignition,
-          last_gps_sync: pos.serverTime || pos.deviceTime || updated[idx].last_gps_sync,
-        };
-      });
-      return updated;
-    });
-    setVehicleUpdatedAt(new Date());
-  }, []);
-
   useEffect(() => {
-    const stopSocket = startTraccarSocket({
-      onStatus: setSocketStatus,
-      onPayload: (data) => {
-        if (data?.devices) applyDeviceUpdates(data.devices);
-        if (data?.positions) applyPositionUpdates(data.positions);
+    // Server-side fleet channel: compact deltas for the caller's organization.
+    return openFleetSocket(
+      (deltas) => {
+        setVehicles((prev) => applyFleetDeltas(prev, deltas));
+        setVehicleUpdatedAt(new Date());
       },
-      onError: () => {
-        // Refresh vehicles once when the socket fails so the UI stays current.
-        loadVehicles();
-        syncWithTraccar();
-      }
-    });
-
-    return () => {
-      if (typeof stopSocket === 'function') {
-        stopSocket();
-      }
-    };
-  }, [applyDeviceUpdates, applyPositionUpdates, loadVehicles, syncWithTraccar]);
+      { onStatus: setSocketStatus, onReconnect: loadVehicles },
+    );
+  }, [loadVehicles]);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [tripRes, driverRes] = await Promise.all([
-           api.get('trips/'),
-           api.get('drivers/')
+        const [countRes, recentRes, driverRes] = await Promise.all([
+           api.get('trips/status-counts/'),
+           fetchPage('trips/', { params: { page_size: 5, fields: 'id,status,surat_jalan_number,origin,destination,created_at' } }),
+           api.get('drivers/', { params: { fields: 'id' } })
         ]);
         
-        const activeTripsCount = tripRes.data.filter(t => ['OTW', 'ARRIVED'].includes(t.status)).length;
+        const activeTripsCount = (countRes.data.OTW || 0) + (countRes.data.ARRIVED || 0);
         const availableDriversCount = driverRes.data.length; // Simplified logic
         
         setStats(prev => ({
@@ -280,7 +213,7 @@ const Dashboard = () => {
           totalRevenue: '1.2B', 
         }));
 
-        setRecentTrips(tripRes.data.slice(0, 5));
+        setRecentTrips(recentRes.rows);
         
       } catch (error) {
         console.error("Failed to fetch dashboard data", error);
@@ -474,7 +407,7 @@ const Dashboard = () => {
                     <p className="text-xs uppercase text-slate-400">Socket</p>
                     <p className={`text-sm font-medium ${
                         socketStatus === 'connected' ? 'text-emerald-600' :
-                        socketStatus === 'error' ? 'text-rose-600' : 'text-slate-700'
+                        socketStatus === 'retrying' ? 'text-rose-600' : 'text-slate-700'
                     }`}>{socketStatus}</p>
                 </div>
                 <div className="ml-auto text-right">
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../api/axios';
+import { fetchAll } from '../api/pagination';
 import { Send, CheckSquare, Square, Truck, MapPin, Calendar, Search } from 'lucide-react';
 
 const Dispatcher = () => {
@@ -12,10 +13,8 @@ const Dispatcher = () => {
   const fetchPlannedTrips = async () => {
     setLoading(true);
     try {
-      const response = await api.get('trips/');
-      // Filter only PLANNED trips
-      const planned = response.data.filter(t => t.status === 'PLANNED');
-      setPlannedTrips(planned);
+      const response = await fetchAll('trips/', { params: { status: 'PLANNED' } });
+      setPlannedTrips(response.data);
       setSelectedTrips(new Set()); // Reset selection on refresh
     } catch (error) {
       console.error("Error fetching trips:", error);
@@ -1,10 +1,13 @@
 import React, { useEffect, useState } from 'react';
 import api from '../api/axios';
+import { fetchAll, fetchPage } from '../api/pagination';
 import { useAuth } from '../context/AuthContext';
 import { MapPin, Clock, CheckCircle, ChevronRight } from 'lucide-react';
 import TripDetails from './TripDetails';
 import FinishTripModal from '../components/FinishTripModal';
 
+const RECENT_HISTORY = 10;
+
 const DriverDashboard = () => {
     const { user } = useAuth();
     const [trips, setTrips] = useState([]);
@@ -15,9 +18,13 @@ const DriverDashboard = () => {
 
     const fetchTrips = async () => {
         try {
-            const response = await api.get('trips/'); 
-            const myTrips = response.data.filter(t => t.driver === user.id);
-            setTrips(myTrips);
+            // Every active trip, but only the latest page of history; the
+            // full history lives on the History screen.
+            const [active, history] = await Promise.all([
+                fetchAll('trips/', { params: { driver: user.id, status: 'PLANNED,OTW,ARRIVED' } }),
+                fetchPage('trips/', { params: { driver: user.id, status: 'COMPLETED,CANCELLED', page_size: RECENT_HISTORY } })
+            ]);
+            setTrips([...active.data, ...history.rows]);
         } catch (error) {
             console.error(error);
         } finally {
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import api from '../api/axios';
+import { fetchAll } from '../api/pagination';
 import { useAuth } from '../context/AuthContext';
 import { User, Plus, CirclePlus, X, Search, Trash2, Trash, Edit, Edit2, MapPin, Eye } from 'lucide-react';
 
@@ -36,7 +37,7 @@ const Drivers = () => {
     try {
       const [driversRes, tripsRes] = await Promise.all([
           api.get('drivers/'),
-          api.get('trips/')
+          fetchAll('trips/', { params: { status: 'PLANNED,OTW,ARRIVED', fields: 'id,status,driver,origin,destination' } })
       ]);
       setDrivers(driversRes.data);
       setTrips(tripsRes.data);
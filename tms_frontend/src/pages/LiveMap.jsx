@@ -1,9 +1,9 @@
-import React, { useEffect, useState, useRef, useCallback } from 'react';
+import React, { useEffect, useState, useCallback } from 'react';
 import { MapContainer, TileLayer, Marker, Popup, Circle, CircleMarker, Rectangle, Tooltip, useMap } from 'react-leaflet';
 import api from '../api/axios';
 import L from 'leaflet';
 import { Navigation, Search, Truck } from 'lucide-react';
-import { startTraccarSocket } from '../utils/traccarSocket';
+import { openFleetSocket, applyFleetDeltas } from '../utils/fleetSocket';
 
 // Fix icons
 import icon from 'leaflet/dist/images/marker-icon.png';
@@ -110,7 +110,6 @@ const LiveMap = () => {
   const [selectedVehicle, setSelectedVehicle] = useState(null);
   const [search, setSearch] = useState('');
   const [socketStatus, setSocketStatus] = useState('connecting');
-  const deviceIdLookupRef = useRef({});
   
   const fetchVehicles = useCallback(async () => {
     try {
@@ -139,72 +138,6 @@ const LiveMap = () => {
     }
   }, []);
 
-  const mapTraccarStatus = useCallback((rawStatus) => {
-    if (!rawStatus) return 'UNKNOWN';
-    const normalized = rawStatus.toString().toLowerCase();
-    if (normalized === 'online') return 'ONLINE';
-    if (normalized === 'offline') return 'OFFLINE';
-    return 'UNKNOWN';
-  }, []);
-
-  const deriveComputedStatus = useCallback((deviceStatus, speedKmh, ignition) => {
-    const normalized = (deviceStatus || '').toUpperCase();
-    if (normalized === 'OFFLINE') return 'OFFLINE';
-    if (speedKmh > 10) return 'MOVING';
-    if (ignition) return 'IDLE';
-    return 'STOPPED';
-  }, []);
-
-  const applyDeviceUpdates = useCallback((devicesPayload) => {
-    if (!devicesPayload || !Array.isArray(devicesPayload)) return;
-    setVehicles(prev => {
-      const updated = [...prev];
-      devicesPayload.forEach(dev => {
-        if (dev.id && dev.uniqueId) {
-          deviceIdLookupRef.current[dev.id] = dev.uniqueId;
-        }
-        if (!dev.uniqueId) return;
-        const idx = updated.findIndex(v => String(v.gps_device_id) === String(dev.uniqueId));
-        if (idx !== -1) {
-          const mappedStatus = mapTraccarStatus(dev.status);
-          updated[idx] = {
-            ...updated[idx],
-            device_status: mappedStatus,
-            computed_status: mappedStatus === 'OFFLINE' ? 'OFFLINE' : updated[idx].computed_status,
-            last_gps_sync: dev.lastUpdate || updated[idx].last_gps_sync,
-          };
-        }
-      });
-      return updated;
-    });
-  }, [mapTraccarStatus]);
-
-  const applyPositionUpdates = useCallback((positionsPayload) => {
-    if (!positionsPayload || !Array.isArray(positionsPayload)) return;
-    setVehicles(prev => {
-      const updated = [...prev];
-      positionsPayload.forEach(pos => {
-        const uniqueId = deviceIdLookupRef.current[pos.deviceId] || pos.uniqueId;
-        if (!uniqueId) return;
-        const idx = updated.findIndex(v => String(v.gps_device_id) === String(uniqueId));
-        if (idx === -1) return;
-        const kmh = (pos.speed || 0) * 1.852;
-        const ignition = pos.attributes?.ignition ?? updated[idx].last_ignition;
-        updated[idx] = {
-          ...updated[idx],
-          last_latitude: pos.latitude ?? updated[idx].last_latitude,
-          last_longitude: pos.longitude ?? updated[idx].last_longitude,
-          last_speed: kmh,
-          last_heading: pos.course ?? updated[idx].last_heading,
-          last_ignition: ignition,
-          last_gps_sync: pos.serverTime || pos.deviceTime || updated[idx].last_gps_sync,
-          computed_status: deriveComputedStatus(updated[idx].device_status, kmh, ignition),
-        };
-      });
-      return updated;
-    });
-  }, [deriveComputedStatus]);
-
   useEffect(() => {
     fetchVehicles();
     fetchOrigins();
@@ -217,24 +150,12 @@ const LiveMap = () => {
     };
     syncWithTraccar();
 
-    const stopSocket = startTraccarSocket({
-      onStatus: setSocketStatus,
-      onPayload: (data) => {
-        if (data?.devices) applyDeviceUpdates(data.devices);
-        if (data?.positions) applyPositionUpdates(data.positions);
-      },
-      onError: () => {
-        fetchVehicles();
-        syncWithTraccar();
-      }
-    });
-
-    return () => {
-      if (typeof stopSocket === 'function') {
-        stopSocket();
-      }
-    };
-  }, [applyDeviceUpdates, applyPositionUpdates, fetchVehicles, fetchOrigins, fetchCustomers]);
+    // Server-side fleet channel: compact deltas for the caller's organization.
+    return openFleetSocket(
+      (deltas) => setVehicles((prev) => applyFleetDeltas(prev, deltas)),
+      { onStatus: setSocketStatus, onReconnect: fetchVehicles },
+    );
+  }, [fetchVehicles, fetchOrigins, fetchCustomers]);
 
   const filteredVehicles = vehicles.filter(v => 
     v.license_plate.toLowerCase().includes(search.toLowerCase())
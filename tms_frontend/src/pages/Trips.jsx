@@ -1,9 +1,12 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import api from '../api/axios';
+import { fetchAll, fetchPage } from '../api/pagination';
 import { ClipboardList, ClipboardCheck, Plus, CirclePlus, X, Search, Trash2, Trash, Edit, Edit2, MapPin, ArrowRight } from 'lucide-react';
 
 const Trips = () => {
   const [trips, setTrips] = useState([]);
+  const [nextTrips, setNextTrips] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [loadError, setLoadError] = useState('');
   const [showModal, setShowModal] = useState(false);
@@ -69,6 +72,8 @@ const Trips = () => {
     return parseInt(value.replace(/\./g, '').replace(/,/g, ''), 10) || 0;
   };
 
+  const tripParams = (q) => (q && q.trim() ? { q: q.trim() } : {});
+
   const fetchData = async () => {
     setLoading(true);
     setLoadError('');
@@ -80,8 +85,11 @@ const Trips = () => {
       return [];
     };
 
-    const [tripsRes, vehRes, drvRes, custRes, originRes, routeRes] = await Promise.allSettled([
-      api.get('trips/'),
+    // The trip table pages (newest first); the busy sets only need the
+    // trips still holding a vehicle or driver.
+    const [tripsRes, busyRes, vehRes, drvRes, custRes, originRes, routeRes] = await Promise.allSettled([
+      fetchPage('trips/', { params: tripParams(search) }),
+      fetchAll('trips/', { params: { status: 'PLANNED,OTW,ARRIVED', fields: 'id,status,vehicle,driver' } }),
       api.get('vehicles/'),
       api.get('drivers/'),
       api.get('customers/'),
@@ -91,12 +99,21 @@ const Trips = () => {
 
     const errors = [];
 
-    const tripsData = tripsRes.status === 'fulfilled' ? unwrapList(tripsRes.value) : [];
-    if (tripsRes.status === 'rejected') {
+    if (tripsRes.status === 'fulfilled') {
+      setTrips(tripsRes.value.rows);
+      setNextTrips(tripsRes.value.next);
+    } else {
       console.error('Error fetching trips:', tripsRes.reason);
       errors.push('trips');
+      setTrips([]);
+      setNextTrips(null);
+    }
+
+    const activeTrips = busyRes.status === 'fulfilled' ? unwrapList(busyRes.value) : [];
+    if (busyRes.status === 'rejected') {
+      console.error('Error fetching active trips:', busyRes.reason);
+      errors.push('active trips');
     }
-    setTrips(tripsData);
 
     const vehiclesData = vehRes.status === 'fulfilled' ? unwrapList(vehRes.value) : [];
     if (vehRes.status === 'rejected') {
@@ -138,13 +155,11 @@ const Trips = () => {
     const busyD = new Set();
     const toId = (value) => (value && typeof value === 'object' ? value.id : value);
 
-    tripsData.forEach((t) => {
-      if (['PLANNED', 'OTW', 'ARRIVED'].includes(t.status)) {
-        const vehicleId = toId(t.vehicle);
-        const driverId = toId(t.driver);
-        if (vehicleId) busyV.add(vehicleId);
-        if (driverId) busyD.add(driverId);
-      }
+    activeTrips.forEach((t) => {
+      const vehicleId = toId(t.vehicle);
+      const driverId = toId(t.driver);
+      if (vehicleId) busyV.add(vehicleId);
+      if (driverId) busyD.add(driverId);
     });
     setBusyVehicles(busyV);
     setBusyDrivers(busyD);
@@ -164,6 +179,34 @@ const Trips = () => {
     fetchData();
   }, []);
 
+  const loadTrips = async (url, config) => {
+    try {
+      const page = await fetchPage(url, config);
+      setTrips((prev) => (config ? page.rows : [...prev, ...page.rows]));
+      setNextTrips(page.next);
+    } catch (error) {
+      console.error('Error fetching trips:', error);
+    }
+  };
+
+  const loadMoreTrips = async () => {
+    if (!nextTrips) return;
+    setLoadingMore(true);
+    await loadTrips(nextTrips);
+    setLoadingMore(false);
+  };
+
+  // Search runs server-side (?q=) so it covers trips beyond the loaded pages.
+  const searchMounted = useRef(false);
+  useEffect(() => {
+    if (!searchMounted.current) {
+      searchMounted.current = true;
+      return undefined;
+    }
+    const timer = setTimeout(() => loadTrips('trips/', { params: tripParams(search) }), 300);
+    return () => clearTimeout(timer);
+  }, [search]);
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -308,11 +351,6 @@ const Trips = () => {
       }
   };
 
-  const filtered = trips.filter(t => 
-    t.surat_jalan_number?.toLowerCase().includes(search.toLowerCase()) || 
-    t.origin.toLowerCase().includes(search.toLowerCase())
-  );
-
   return (
     <div className="p-6 h-full flex flex-col">
        <header className="flex justify-between items-center mb-6">
@@ -337,7 +375,7 @@ const Trips = () => {
           <div className="p-4 border-b border-slate-100 bg-slate-50/50">
              <div className="relative max-w-md">
                 <Search className="absolute left-3 top-1/2 -translate-y-1/2 text-slate-400" size={18} />
-                <input type="text" placeholder="Search SJ Number or Origin..." className="w-full pl-10 pr-4 py-2 rounded-lg border border-slate-300 outline-none text-sm"
+                <input type="text" placeholder="Search SJ Number, Route or Driver..." className="w-full pl-10 pr-4 py-2 rounded-lg border border-slate-300 outline-none text-sm"
                   value={search} onChange={e => setSearch(e.target.value)} />
              </div>
           </div>
@@ -353,7 +391,7 @@ const Trips = () => {
                 </tr>
               </thead>
               <tbody className="divide-y divide-slate-100">
-                {filtered.map((t) => (
+                {trips.map((t) => (
                   <tr key={t.id} className="hover:bg-slate-50">
                     <td className="p-4 font-medium text-slate-800">{t.surat_jalan_number || 'Pending'}</td>
                     <td className="p-4">
@@ -399,6 +437,14 @@ const Trips = () => {
                 ))}
               </tbody>
             </table>
+            {nextTrips && (
+              <div className="p-4 flex justify-center">
+                <button type="button" onClick={loadMoreTrips} disabled={loadingMore}
+                  className="px-4 py-2 rounded-lg border border-slate-300 text-sm font-medium text-slate-600 hover:bg-slate-50 disabled:opacity-50">
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
        </div>
 
@@ -33,7 +33,7 @@ const Users = () => {
 
   useEffect(() => {
     if (isSuperAdmin) {
-      api.get('organizations/').then(res => setOrganizations(res.data)).catch(err => console.error('Error fetching orgs', err));
+      api.get('organizations/', { params: { fields: 'id,name' } }).then(res => setOrganizations(res.data)).catch(err => console.error('Error fetching orgs', err));
     } else if (isOwner) {
       setForm((prev) => ({ ...prev, organization: authUser?.organization_id || '' }));
     }
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
 import api from '../../api/axios';
+import { openFleetSocket, applyFleetDeltas } from '../../utils/fleetSocket';
 import L from 'leaflet';
 import { Truck, Navigation, Search } from 'lucide-react';
 import 'leaflet/dist/leaflet.css';
@@ -46,8 +47,8 @@ const GlobalMap = () => {
 
   useEffect(() => {
     fetchAllVehicles();
-    const interval = setInterval(fetchAllVehicles, 10000); // 10s refresh
-    return () => clearInterval(interval);
+    // Live deltas replace the 10s full-list refresh.
+    return openFleetSocket((deltas) => setVehicles((prev) => applyFleetDeltas(prev, deltas)));
   }, []);
 
   const filteredVehicles = vehicles.filter(v => 
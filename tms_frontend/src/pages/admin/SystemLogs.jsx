@@ -1,16 +1,20 @@
 import React, { useState, useEffect } from 'react';
 import api from '../../api/axios';
+import { openEventStream } from '../../utils/eventStream';
 import { Search, RotateCw, Clock } from 'lucide-react';
 
 const SystemLogs = () => {
   const [logs, setLogs] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
   const [lastUpdated, setLastUpdated] = useState(new Date());
 
   const fetchLogs = async () => {
     try {
       const response = await api.get('logs/');
-      setLogs(response.data);
+      // Cursor pages: { next, previous, results }.
+      setLogs(response.data.results || []);
+      setNextPage(response.data.next);
       setLastUpdated(new Date());
       setLoading(false);
     } catch (error) {
@@ -18,10 +22,30 @@ const SystemLogs = () => {
     }
   };
 
+  const fetchOlderLogs = async () => {
+    if (!nextPage) return;
+    try {
+      const response = await api.get(nextPage);
+      setLogs((prev) => [...prev, ...response.data.results.filter((log) => !prev.some((l) => l.id === log.id))]);
+      setNextPage(response.data.next);
+    } catch (error) {
+      console.error("Failed to fetch older logs:", error);
+    }
+  };
+
   useEffect(() => {
     fetchLogs();
-    const interval = setInterval(fetchLogs, 3000); // Poll every 3 seconds
-    return () => clearInterval(interval);
+    // Polls only while the stream is down.
+    const closeStream = openEventStream(
+      {
+        activity: (log) => {
+          setLogs((prev) => (prev.some((l) => l.id === log.id) ? prev : [log, ...prev]));
+          setLastUpdated(new Date());
+        },
+      },
+      { poll: fetchLogs, pollMs: 3000 },
+    );
+    return closeStream;
   }, []);
 
   const getActionColor = (action) => {
@@ -89,6 +113,13 @@ const SystemLogs = () => {
             </tbody>
           </table>
         </div>
+        {nextPage && (
+          <div className="p-4 border-t border-slate-100 text-center">
+            <button onClick={fetchOlderLogs} className="text-sm text-blue-600 hover:underline">
+              Load older logs
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
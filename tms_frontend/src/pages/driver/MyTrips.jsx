@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../../api/axios';
+import { fetchAll } from '../../api/pagination';
 import { useAuth } from '../../context/AuthContext';
 import FinishTripModal from '../../components/FinishTripModal';
 import { MapPin, Calendar, Truck, CheckCircle, Clock, Map } from 'lucide-react';
@@ -17,7 +18,9 @@ const MyTrips = () => {
 
   const fetchTrips = async () => {
     try {
-      const response = await api.get('trips/');
+      const response = await fetchAll('trips/', {
+        params: { status: 'PLANNED,OTW,ARRIVED', ...(user?.id ? { driver: user.id } : {}) },
+      });
       const allTrips = Array.isArray(response.data) ? response.data : response.data?.results || [];
 
       const toId = (value) => (value && typeof value === 'object' ? value.id : value);
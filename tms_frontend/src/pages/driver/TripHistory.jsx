@@ -1,62 +1,57 @@
-import React, { useEffect, useMemo, useState } from 'react';
-import api from '../../api/axios';
+import React, { useEffect, useState } from 'react';
+import { fetchPage } from '../../api/pagination';
 import { useAuth } from '../../context/AuthContext';
 import { Calendar, Search, Truck, MapPin } from 'lucide-react';
 
-const HISTORY_STATUSES = new Set(['COMPLETED', 'SETTLED', 'CANCELLED']);
-
 const TripHistory = () => {
   const { user } = useAuth();
   const [trips, setTrips] = useState([]);
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
 
-  const toId = (value) => (value && typeof value === 'object' ? value.id : value);
+  const [next, setNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const historyParams = (q) => ({
+    status: 'COMPLETED,SETTLED,CANCELLED',
+    ...(user?.id ? { driver: user.id } : {}),
+    ...(q ? { q } : {}),
+  });
 
-  const fetchTrips = async () => {
+  const fetchTrips = async (q) => {
     setLoading(true);
     try {
-      const response = await api.get('trips/');
-      const allTrips = Array.isArray(response.data) ? response.data : response.data?.results || [];
-
-      const myTrips = allTrips.filter((t) => {
-        const driverId = user?.id;
-        const tripDriverId = toId(t.driver);
-        if (driverId) return tripDriverId === driverId;
-        return t.driver_name === user?.username || t.driverName === user?.username;
-      });
-
-      const historyTrips = myTrips
-        .filter((t) => HISTORY_STATUSES.has(t.status))
-        .sort((a, b) => {
-          const aDate = new Date(a.completed_at || a.created_at || 0).getTime();
-          const bDate = new Date(b.completed_at || b.created_at || 0).getTime();
-          return bDate - aDate;
-        });
-
-      setTrips(historyTrips);
+      const page = await fetchPage('trips/', { params: historyParams(q) });
+      setTrips(page.rows);
+      setNext(page.next);
     } catch (error) {
       console.error('Error fetching trip history:', error);
       setTrips([]);
+      setNext(null);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!next) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(next);
+      setTrips((prev) => [...prev, ...page.rows]);
+      setNext(page.next);
+    } catch (error) {
+      console.error('Error fetching trip history:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Search runs server-side (?q=) so it covers trips not loaded yet.
   useEffect(() => {
-    fetchTrips();
-  }, [user]);
-
-  const filteredTrips = useMemo(() => {
-    const q = search.trim().toLowerCase();
-    if (!q) return trips;
-    return trips.filter((t) => {
-      const sj = (t.surat_jalan_number || '').toLowerCase();
-      const origin = (t.origin || '').toLowerCase();
-      const destination = (t.destination || '').toLowerCase();
-      return sj.includes(q) || origin.includes(q) || destination.includes(q);
-    });
-  }, [trips, search]);
+    const timer = setTimeout(() => fetchTrips(search.trim()), search ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [user, search]);
 
   const formatCustomerLabel = (trip) => (
     Array.isArray(trip.customer_names) && trip.customer_names.length
@@ -64,7 +59,7 @@ const TripHistory = () => {
       : (trip.customer_name || 'Walk-in customer')
   );
 
-  if (loading) return <div className="p-6 text-center text-slate-500">Loading trip history...</div>;
+  if (loading && !trips.length && !search) return <div className="p-6 text-center text-slate-500">Loading trip history...</div>;
 
   return (
     <div className="p-4 md:p-6 max-w-4xl mx-auto space-y-6">
@@ -74,7 +69,7 @@ const TripHistory = () => {
           <p className="text-slate-500 text-sm">Completed and past trips</p>
         </div>
         <div className="bg-slate-100 text-slate-700 px-4 py-2 rounded-lg text-sm font-medium">
-          {trips.length} trip(s)
+          {trips.length}{next ? '+' : ''} trip(s)
         </div>
       </header>
 
@@ -92,14 +87,14 @@ const TripHistory = () => {
       </div>
 
       <div className="space-y-4">
-        {filteredTrips.length === 0 ? (
+        {trips.length === 0 ? (
           <div className="text-center py-12 bg-slate-50 rounded-xl border border-dashed border-slate-300">
             <Truck className="mx-auto h-12 w-12 text-slate-300 mb-3" />
             <h3 className="text-lg font-medium text-slate-600">No history yet</h3>
             <p className="text-slate-400 text-sm">Completed trips will appear here.</p>
           </div>
         ) : (
-          filteredTrips.map((trip) => (
+          trips.map((trip) => (
             <div key={trip.id} className="bg-white rounded-xl shadow-sm border border-slate-200 overflow-hidden">
               <div className="px-6 py-4 flex justify-between items-center bg-slate-50/50">
                 <div className="flex items-center gap-3">
@@ -137,6 +132,16 @@ const TripHistory = () => {
             </div>
           ))
         )}
+        {next && (
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="w-full py-2 rounded-lg border border-slate-300 text-sm font-medium text-slate-600 hover:bg-slate-50 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -35,7 +35,7 @@ const Invoices = () => {
 
   const fetchCustomers = async () => {
     try {
-      const res = await api.get('customers/');
+      const res = await api.get('customers/', { params: { fields: 'id,name' } });
       setCustomers(res.data);
     } catch (err) {
       console.error('Error fetching customers', err);
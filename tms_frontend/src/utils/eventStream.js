@@ -0,0 +1,91 @@
+import api, { getFreshAccessToken } from '../api/axios';
+
+const MAX_RETRY_MS = 60000;
+
+// Open the server-sent events stream for notifications and activity logs.
+// EventSource cannot send headers, so the access token travels as a query param.
+// A failed stream (e.g. 401 once the token expires) is closed and reopened with
+// a refreshed token and backoff; after `maxFailures` consecutive failures, or
+// without EventSource support, `poll` runs every `pollMs` until the stream is
+// back. `poll` also runs once on every reconnect to catch up on missed events.
+// Returns a function that closes the stream and stops polling.
+export const openEventStream = (
+  handlers = {},
+  { poll = null, pollMs = 15000, retryMs = 5000, maxFailures = 3 } = {},
+) => {
+  let source = null;
+  let closed = false;
+  let failures = 0;
+  let retryTimer = null;
+  let pollTimer = null;
+
+  const startPolling = () => {
+    if (!poll || pollTimer || closed) return;
+    pollTimer = setInterval(poll, pollMs);
+  };
+
+  const stopPolling = () => {
+    if (pollTimer) clearInterval(pollTimer);
+    pollTimer = null;
+  };
+
+  const scheduleReconnect = () => {
+    failures += 1;
+    if (failures >= maxFailures) startPolling();
+    const delay = Math.min(retryMs * 2 ** (failures - 1), MAX_RETRY_MS);
+    retryTimer = setTimeout(connect, delay);
+  };
+
+  const connect = async () => {
+    retryTimer = null;
+    if (closed) return;
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return;
+    }
+
+    const token = await getFreshAccessToken();
+    if (closed) return;
+    if (!token) {
+      // Not logged in (or refresh failed): polling goes through the axios 401 handling.
+      startPolling();
+      return;
+    }
+
+    const url = new URL('stream/', api.defaults.baseURL);
+    url.searchParams.set('token', token);
+    source = new EventSource(url.toString());
+
+    source.onopen = () => {
+      if (failures > 0 && poll) poll();
+      failures = 0;
+      stopPolling();
+    };
+    source.onerror = () => {
+      // EventSource gives up for good on HTTP errors; take over reconnecting.
+      if (source) source.close();
+      source = null;
+      if (!closed) scheduleReconnect();
+    };
+
+    Object.entries(handlers).forEach(([eventName, handler]) => {
+      source.addEventListener(eventName, (evt) => {
+        try {
+          handler(JSON.parse(evt.data));
+        } catch (err) {
+          console.error(`Failed to handle ${eventName} event`, err);
+        }
+      });
+    });
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    if (retryTimer) clearTimeout(retryTimer);
+    stopPolling();
+    if (source) source.close();
+    source = null;
+  };
+};
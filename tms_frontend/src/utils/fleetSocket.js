@@ -0,0 +1,77 @@
+import api, { getFreshAccessToken } from '../api/axios';
+
+// Subscribe to live vehicle-state deltas for the caller's organization
+// (super admins receive every organization). Reconnects with a fixed backoff,
+// refreshing the access token first when it is about to expire.
+// `onStatus` receives connecting/connected/retrying; `onReconnect` runs when a
+// dropped connection is back, so callers can reload what they missed.
+export const openFleetSocket = (onVehicles, { reconnectMs = 5000, onStatus, onReconnect } = {}) => {
+  let socket = null;
+  let closed = false;
+  let retryTimer = null;
+  let dropped = false;
+
+  const reportStatus = (status) => {
+    if (!closed && typeof onStatus === 'function') onStatus(status);
+  };
+
+  const connect = async () => {
+    retryTimer = null;
+    if (closed) return;
+    reportStatus('connecting');
+    const token = await getFreshAccessToken();
+    if (!token || closed) return;
+    const url = new URL('/ws/fleet/', api.defaults.baseURL);
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+    url.searchParams.set('token', token);
+
+    socket = new WebSocket(url.toString());
+    socket.onopen = () => {
+      reportStatus('connected');
+      if (dropped && typeof onReconnect === 'function') onReconnect();
+      dropped = false;
+    };
+    socket.onmessage = (evt) => {
+      try {
+        const data = JSON.parse(evt.data);
+        if (data.type === 'vehicles') onVehicles(data.vehicles || []);
+      } catch (err) {
+        console.error('Failed to parse fleet update', err);
+      }
+    };
+    socket.onclose = () => {
+      if (closed) return;
+      dropped = true;
+      reportStatus('retrying');
+      retryTimer = setTimeout(connect, reconnectMs);
+    };
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    if (retryTimer) clearTimeout(retryTimer);
+    if (socket) socket.close();
+  };
+};
+
+// Merge compact deltas ({id, lat, lon, speed, heading, status}) into vehicle records.
+// A delta means the server heard from the device unless it reports it OFFLINE.
+export const applyFleetDeltas = (vehicles, deltas) => {
+  if (!deltas.length) return vehicles;
+  const byId = new Map(deltas.map((d) => [d.id, d]));
+  return vehicles.map((v) => {
+    const d = byId.get(v.id);
+    if (!d) return v;
+    return {
+      ...v,
+      last_latitude: d.lat,
+      last_longitude: d.lon,
+      last_speed: d.speed,
+      last_heading: d.heading,
+      computed_status: d.status,
+      device_status: d.status === 'OFFLINE' ? 'OFFLINE' : 'ONLINE',
+    };
+  });
+};